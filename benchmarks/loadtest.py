@@ -0,0 +1,767 @@
+"""
+오프라인 부하 테스트 (Gemini 호출 없음)
+
+MCP 서버 Tool과 사용자 턴 처리 흐름(chatbot.turn.process_turn, Streamlit과 동일)을
+동시 사용자 N명으로 실행해 처리량, 지연시간, 프로세스별 메모리를 데이터 규모별로 측정합니다.
+
+- LLM: ScriptedChatModel (대화 상태만 보고 Tool 호출/응답을 결정하는 가짜 모델, 지연시간 설정 가능)
+- 임베딩: 로컬 해시 임베딩 (RAG_EMBEDDING_PROVIDER=local, --faiss-path 코퍼스 필요)
+- 데이터: big_data_set1_f.csv 형태를 늘린 합성 SET1/SET2/SET3 (MCP_DATA_DIR로 서버에 전달)
+
+측정 모드:
+- chat: 사용자 턴 전체 (가맹점 검색 → 번호 선택 → 패턴 분석 → 사례 검색 → 응답 스트리밍)
+- tools: LLM 없이 같은 순서로 Tool만 직접 호출
+- batch: analyze_merchant_patterns_batch로 가맹점 N곳씩 일괄 분석 (서버 프로세스 풀 확장성 측정)
+
+실행 예시:
+    # 로컬 해시 임베딩 코퍼스 준비 (1회)
+    python -m benchmarks.rag_benchmark --provider local --build-from ./faiss_db
+
+    # 가맹점 1천/1만 곳 × 24개월 합성 데이터에서 동시 사용자 1/4/16명
+    python -m benchmarks.loadtest run --merchants 1000 10000 --users 1 4 16
+
+    # LLM 지연시간 흉내 (첫 토큰 800ms, 토큰당 20ms)
+    python -m benchmarks.loadtest run --merchants 10000 --users 8 --llm-ttft-ms 800 --llm-token-ms 20
+
+    # 일괄 분석 처리량: 프로세스 풀 워커 0(스레드) / 4개 비교
+    python -m benchmarks.loadtest run --merchants 10000 --users 4 --mode batch --process-workers 0
+    python -m benchmarks.loadtest run --merchants 10000 --users 4 --mode batch --process-workers 4
+
+    # 합성 데이터만 생성 (가맹점 100만 곳 × 24개월 = SET2/SET3 각 2,400만 행)
+    python -m benchmarks.loadtest generate --merchants 1000000 --output ./benchmarks/synthetic/m1000000
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from benchmarks.rag_benchmark import DEFAULT_BENCH_PATH, DEFAULT_RESULTS_DIR, _git_commit, summarize_latency
+
+SOURCE_DATA_DIR = "./data"
+SET1_NAME = "big_data_set1_f.csv"
+SET2_NAME = "big_data_set2_f.csv"
+SET3_NAME = "big_data_set3_f.csv"
+PATTERN_RULES_NAME = "pattern_rules_declclose_v6.json"
+MANIFEST_NAME = "synthetic.json"
+
+DEFAULT_SYNTHETIC_DIR = os.path.join(os.path.dirname(__file__), "synthetic")
+DEFAULT_MONTHS = 24
+LAST_MONTH = 202412
+
+# 합성 데이터 생성 단위 (가맹점 수, 메모리 사용량 제한)
+GENERATE_CHUNK = 20000
+
+# 사용자 질문 형식 (ScriptedChatModel이 가맹점명을 다시 꺼낼 때 사용)
+QUERY_SUFFIX = " 마케팅 전략 추천해줘"
+
+# 사례 검색 쿼리 (ScriptedChatModel이 search_merchant_knowledge_batch에 전달)
+STRATEGY_QUERIES = ["재방문 고객 쿠폰 전략", "신규 고객 확보 SNS 홍보", "배달앱 리뷰 이벤트"]
+
+# batch 모드 요청 1건의 가맹점 수
+DEFAULT_BATCH_MERCHANTS = 50
+
+
+# ============================================
+# 합성 데이터
+# ============================================
+
+# SET2 구간형 컬럼 값 (0%에 가까울수록 상위)
+RANGE_BUCKETS = ["1_10%이하", "2_10-25%", "3_25-50%", "4_50-75%", "5_75-90%", "6_90%초과(하위 10% 이하)"]
+CANCEL_BUCKETS = [f"{i}_상위{i}구간" for i in range(1, 7)]
+RANGE_COLUMNS = ["MCT_OPE_MS_CN", "RC_M1_SAA", "RC_M1_TO_UE_CT", "RC_M1_UE_CUS_CN", "RC_M1_AV_NP_AT"]
+
+# SET2 수치형 컬럼: (시작값 최소, 최대, 월별 변동 표준편차, 값 범위 최소, 최대)
+SALES_WALKS = {
+    "DLV_SAA_RAT": (0.0, 60.0, 2.0, 0.0, 100.0),
+    "M1_SME_RY_SAA_RAT": (30.0, 300.0, 10.0, 0.0, 1000.0),
+    "M1_SME_RY_CNT_RAT": (30.0, 300.0, 10.0, 0.0, 1000.0),
+    "M12_SME_RY_SAA_PCE_RT": (1.0, 99.0, 4.0, 0.0, 100.0),
+    "M12_SME_BZN_SAA_PCE_RT": (1.0, 99.0, 4.0, 0.0, 100.0),
+    "M12_SME_RY_ME_MCT_RAT": (5.0, 25.0, 0.5, 0.0, 100.0),
+    "M12_SME_BZN_ME_MCT_RAT": (3.0, 20.0, 0.5, 0.0, 100.0),
+}
+
+CUSTOMER_SEGMENT_COLUMNS = [
+    f"M12_{gender}_{age}_RAT" for gender in ("MAL", "FME") for age in ("1020", "30", "40", "50", "60")
+]
+CUSTOMER_CHANNEL_COLUMNS = ["RC_M1_SHC_RSD_UE_CLN_RAT", "RC_M1_SHC_WP_UE_CLN_RAT", "RC_M1_SHC_FLP_UE_CLN_RAT"]
+
+
+def month_range(months: int, last: int = LAST_MONTH) -> List[int]:
+    """last(YYYYMM)로 끝나는 months개월 (오래된 순)"""
+    year, month = divmod(last, 100)
+    result = []
+    for _ in range(months):
+        result.append(year * 100 + month)
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return result[::-1]
+
+
+def merchant_ids(indices: np.ndarray, seed: int) -> List[str]:
+    """순번 → 10자리 16진수 가맹점 번호 (2^40 범위의 전단사 변환이라 중복 없음)"""
+    mixed = (indices.astype(np.uint64) * np.uint64(0x9E3779B1) + np.uint64(seed)) & np.uint64(0xFFFFFFFFFF)
+    return [f"{value:010X}" for value in mixed.tolist()]
+
+
+def _random_walk(rng: np.random.Generator, n: int, months: int, spec: Tuple[float, ...]) -> np.ndarray:
+    start_low, start_high, step, low, high = spec
+    walk = rng.uniform(start_low, start_high, (n, 1)) + np.cumsum(rng.normal(0, step, (n, months)), axis=1)
+    return np.round(np.clip(walk, low, high), 1).ravel()
+
+
+def _percentages(rng: np.random.Generator, rows: int, columns: int) -> np.ndarray:
+    return np.round(rng.dirichlet(np.ones(columns), size=rows) * 100, 1)
+
+
+def generate_dataset(
+    output_dir: str,
+    merchants: int,
+    months: int = DEFAULT_MONTHS,
+    seed: int = 0,
+    source_dir: str = SOURCE_DATA_DIR
+) -> Dict[str, Any]:
+    """
+    big_data_set1_f.csv를 merchants곳으로 늘리고 가맹점마다 months개월의 SET2/SET3 생성
+
+    - SET1: 원본 행을 순환 복제하고 ENCODED_MCT만 새로 부여 (가맹점명/주소/업종 분포 유지)
+    - SET2: 구간형 지표는 무작위, 수치형 지표는 월별 random walk (패턴 규칙의 up/down 조건이 고르게 매칭)
+    - SET3: 성별/연령대, 거주/직장/유동 비율은 합이 100인 무작위 비율
+    - 패턴 규칙 파일은 원본 복사
+
+    Returns:
+        Dict: manifest (생성 조건, 행 수, 소요 시간)
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+
+    base = pd.read_csv(os.path.join(source_dir, SET1_NAME), encoding="cp949", dtype=str)
+    ta_ym = np.array(month_range(months))
+
+    print(f"🏗️ 합성 데이터 생성: 가맹점 {merchants:,}곳 × {months}개월 → {output_dir}")
+
+    for start in range(0, merchants, GENERATE_CHUNK):
+        n = min(GENERATE_CHUNK, merchants - start)
+        indices = np.arange(start, start + n)
+        ids = merchant_ids(indices, seed)
+        rows = n * months
+        write = {"mode": "w" if start == 0 else "a", "header": start == 0, "index": False}
+
+        set1 = base.iloc[indices % len(base)].copy()
+        set1["ENCODED_MCT"] = ids
+        set1.to_csv(os.path.join(output_dir, SET1_NAME), encoding="cp949", **write)
+
+        mct = np.repeat(np.array(ids), months)
+        ym = np.tile(ta_ym, n)
+
+        set2 = pd.DataFrame({"ENCODED_MCT": mct, "TA_YM": ym})
+        for column in RANGE_COLUMNS:
+            set2[column] = np.array(RANGE_BUCKETS)[rng.integers(0, len(RANGE_BUCKETS), rows)]
+        set2["APV_CE_RAT"] = np.array(CANCEL_BUCKETS)[rng.integers(0, len(CANCEL_BUCKETS), rows)]
+        for column, spec in SALES_WALKS.items():
+            set2[column] = _random_walk(rng, n, months, spec)
+        set2.to_csv(os.path.join(output_dir, SET2_NAME), encoding="cp949", **write)
+
+        set3 = pd.DataFrame({"ENCODED_MCT": mct, "TA_YM": ym})
+        set3[CUSTOMER_SEGMENT_COLUMNS] = _percentages(rng, rows, len(CUSTOMER_SEGMENT_COLUMNS))
+        revisit = np.round(rng.uniform(0, 60, rows), 2)
+        set3["MCT_UE_CLN_REU_RAT"] = revisit
+        set3["MCT_UE_CLN_NEW_RAT"] = np.round(rng.uniform(0, 100 - revisit), 2)
+        set3[CUSTOMER_CHANNEL_COLUMNS] = _percentages(rng, rows, len(CUSTOMER_CHANNEL_COLUMNS))
+        set3.to_csv(os.path.join(output_dir, SET3_NAME), encoding="utf-8", **write)
+
+        print(f"  {start + n:,}/{merchants:,}곳")
+
+    shutil.copyfile(os.path.join(source_dir, PATTERN_RULES_NAME), os.path.join(output_dir, PATTERN_RULES_NAME))
+
+    manifest = {
+        "merchants": merchants,
+        "months": months,
+        "seed": seed,
+        "set1_rows": merchants,
+        "set2_rows": merchants * months,
+        "set3_rows": merchants * months,
+        "bytes": sum(
+            os.path.getsize(os.path.join(output_dir, name))
+            for name in (SET1_NAME, SET2_NAME, SET3_NAME)
+        ),
+        "generate_seconds": round(time.perf_counter() - started, 1),
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ 생성 완료 ({manifest['bytes'] / 1e6:.0f}MB, {manifest['generate_seconds']}초)")
+    return manifest
+
+
+def ensure_dataset(merchants: int, months: int, seed: int, root: str = DEFAULT_SYNTHETIC_DIR) -> Tuple[str, Dict]:
+    """같은 조건으로 생성된 합성 데이터가 있으면 재사용"""
+    output_dir = os.path.join(root, f"m{merchants}_t{months}_s{seed}")
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return output_dir, json.load(f)
+    return output_dir, generate_dataset(output_dir, merchants, months, seed)
+
+
+# ============================================
+# 가짜 LLM
+# ============================================
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    대화의 마지막 메시지만 보고 다음 행동을 정하는 결정적 가짜 모델
+
+    - 사용자 질문 "<가맹점명> 마케팅 전략 추천해줘" → search_merchant
+    - 검색 1건/select_merchant 결과 → analyze_merchant_pattern
+    - 검색 여러 건 → 후보 번호 선택 요청 (다음 턴 "1번"은 번호 선택 빠른 경로로 처리)
+    - 패턴 분석 결과 → search_merchant_knowledge_batch
+    - 그 외 → answer_tokens개 토큰의 최종 응답
+
+    상태를 갖지 않으므로 동시 사용자 간에 하나의 인스턴스를 공유할 수 있습니다.
+    """
+
+    ttft_ms: float = 0.0
+    token_ms: float = 0.0
+    answer_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _decide(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+
+        if isinstance(last, HumanMessage):
+            name = str(last.content).removesuffix(QUERY_SUFFIX).strip()
+            return self._tool_call("search_merchant", {"merchant_name": name})
+
+        if isinstance(last, ToolMessage):
+            try:
+                result = json.loads(last.content)
+            except (TypeError, ValueError):
+                result = {}
+            result = result if isinstance(result, dict) else {}
+
+            if result.get("found") and (
+                last.name == "select_merchant"
+                or (last.name == "search_merchant" and result.get("result_type") == "single")
+            ):
+                return self._tool_call("analyze_merchant_pattern", {"encoded_mct": result["data"]["encoded_mct"]})
+
+            if last.name == "search_merchant" and result.get("result_type") == "multiple":
+                lines = [f"{i}. {c.get('name')} ({c.get('location')})" for i, c in enumerate(result["data"][:10], start=1)]
+                return AIMessage(content="여러 가맹점이 검색되었습니다. 번호를 선택해주세요.\n" + "\n".join(lines))
+
+            if last.name == "analyze_merchant_pattern" and result.get("found"):
+                return self._tool_call("search_merchant_knowledge_batch", {"queries": STRATEGY_QUERIES})
+
+        words = [f"전략{i}" for i in range(self.answer_tokens)]
+        return AIMessage(content="# 마케팅 전략\n" + " ".join(words))
+
+    def _tool_call(self, name: str, args: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"scripted-{os.urandom(6).hex()}"}])
+
+    def _chunks(self, message: AIMessage) -> List[AIMessageChunk]:
+        if message.tool_calls:
+            return [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ])]
+        return [AIMessageChunk(content=token) for token in message.content.split(" ")]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._decide(messages)
+        time.sleep((self.ttft_ms + self.token_ms * (len(self._chunks(message)) - 1)) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        for i, chunk in enumerate(self._chunks(self._decide(messages))):
+            time.sleep((self.ttft_ms if i == 0 else self.token_ms) / 1000)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # 이벤트 루프를 막지 않도록 asyncio.sleep으로 지연 (동시 사용자 Agent가 같은 루프에서 실행)
+        for i, chunk in enumerate(self._chunks(self._decide(messages))):
+            await asyncio.sleep((self.ttft_ms if i == 0 else self.token_ms) / 1000)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+
+# ============================================
+# 프로세스 메모리 (/proc)
+# ============================================
+
+def process_memory(pid: int) -> Dict[str, float]:
+    """
+    프로세스 메모리 (MB)
+    - rss: 현재 상주 메모리, peak_rss: 최대 상주 메모리 (/proc/<pid>/status)
+    - pss: 공유 페이지를 나눠 계산한 메모리 (/proc/<pid>/smaps_rollup, fork 공유 반영)
+    """
+    memory: Dict[str, float] = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key = "rss" if line.startswith("VmRSS:") else "peak_rss"
+                    memory[key] = round(int(line.split()[1]) / 1024, 1)
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def child_pids(pid: int) -> List[int]:
+    """pid의 모든 하위 프로세스 (MCP 서버 프로세스 등)"""
+    parents: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # comm에 공백/괄호가 있을 수 있으므로 마지막 ')' 뒤에서 ppid 추출
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    children, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        found = [child for child, ppid in parents.items() if ppid == parent]
+        children.extend(found)
+        frontier.extend(found)
+    return sorted(children)
+
+
+def memory_snapshot() -> Dict[str, Any]:
+    return {
+        "client": process_memory(os.getpid()),
+        "servers": [{"pid": pid, **process_memory(pid)} for pid in child_pids(os.getpid())],
+    }
+
+
+# ============================================
+# 시뮬레이션 사용자
+# ============================================
+
+def run_chat_user(runtime, names: List[str], turns: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """사용자 1명이 turns턴 대화 (Streamlit과 같은 process_turn 사용)"""
+    from langchain_core.messages import SystemMessage
+
+    from chatbot.history import MerchantState
+    from chatbot.prompts import GREETING, SYSTEM_PROMPT
+    from chatbot.turn import NullStatus, process_turn
+
+    messages: List[BaseMessage] = [SystemMessage(content=SYSTEM_PROMPT), AIMessage(content=GREETING)]
+    merchant_state = MerchantState()
+    samples = []
+
+    for _ in range(turns):
+        query = "1번" if merchant_state.candidates else rng.choice(names) + QUERY_SUFFIX
+        messages.append(HumanMessage(content=query))
+
+        result: Dict[str, Any] = {}
+        started = time.perf_counter()
+        first_token_at = None
+        sample: Dict[str, Any] = {"query": query}
+        try:
+            for _token in process_turn(runtime, merchant_state, list(messages), NullStatus(), result):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+        except Exception as e:
+            sample["error"] = f"{type(e).__name__}: {e}"
+
+        sample.update({
+            "turn_ms": (time.perf_counter() - started) * 1000,
+            "first_token_ms": (first_token_at - started) * 1000 if first_token_at else None,
+            "tool_calls": result.get("metrics", {}).get("tool_calls", 0),
+            "fast_path": result.get("fast_path", False),
+            "history_tokens": result.get("history_tokens"),
+        })
+        samples.append(sample)
+        messages.append(AIMessage(content=result.get("reply") or ""))
+
+    return samples
+
+
+def run_tool_user(runtime, names: List[str], turns: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """사용자 1명이 turns번 Tool 순서(검색 → 선택 → 분석 → 사례 검색)를 LLM 없이 직접 호출"""
+    samples = []
+
+    def call(name: str, arguments: Dict[str, Any], timings: Dict[str, float]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = json.loads(runtime.run_tool(name, arguments))
+        timings[name] = (time.perf_counter() - started) * 1000
+        return result
+
+    for _ in range(turns):
+        name = rng.choice(names)
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        sample: Dict[str, Any] = {"query": name}
+        try:
+            found = call("search_merchant", {"merchant_name": name}, timings)
+            if found.get("result_type") == "multiple":
+                found = call("select_merchant", {"index": 1, "merchant_name": name}, timings)
+            if found.get("found"):
+                call("analyze_merchant_pattern", {"encoded_mct": found["data"]["encoded_mct"]}, timings)
+                call("search_merchant_knowledge_batch", {"queries": STRATEGY_QUERIES}, timings)
+        except Exception as e:
+            sample["error"] = f"{type(e).__name__}: {e}"
+
+        sample.update({
+            "turn_ms": (time.perf_counter() - started) * 1000,
+            "tool_calls": len(timings),
+            "tool_ms": timings,
+        })
+        samples.append(sample)
+
+    return samples
+
+
+def run_batch_user(runtime, codes: List[str], turns: int, rng: random.Random,
+                   batch_size: int = DEFAULT_BATCH_MERCHANTS) -> List[Dict[str, Any]]:
+    """사용자 1명이 turns번 가맹점 batch_size곳을 analyze_merchant_patterns_batch로 일괄 분석"""
+    samples = []
+
+    for _ in range(turns):
+        arguments = {"encoded_mcts": rng.sample(codes, min(batch_size, len(codes)))}
+        started = time.perf_counter()
+        sample: Dict[str, Any] = {"query": f"batch×{len(arguments['encoded_mcts'])}"}
+        try:
+            result = json.loads(runtime.run_tool("analyze_merchant_patterns_batch", arguments))
+            if result.get("result_type") == "error":
+                raise RuntimeError(result.get("message"))
+            sample["merchants"] = result["count"]
+        except Exception as e:
+            sample["error"] = f"{type(e).__name__}: {e}"
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        sample.update({
+            "turn_ms": elapsed_ms,
+            "tool_calls": 1,
+            "tool_ms": {"analyze_merchant_patterns_batch": elapsed_ms},
+        })
+        samples.append(sample)
+
+    return samples
+
+
+def run_level(runtime, names: List[str], users: int, turns: int, mode: str, seed: int,
+              batch_size: int = DEFAULT_BATCH_MERCHANTS) -> Dict[str, Any]:
+    """동시 사용자 users명이 각각 turns턴 실행 → 처리량/지연시간 요약 (batch 모드의 names는 가맹점 코드)"""
+    if mode == "batch":
+        user_fn = functools.partial(run_batch_user, batch_size=batch_size)
+    else:
+        user_fn = run_chat_user if mode == "chat" else run_tool_user
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=users, thread_name_prefix="loadtest-user") as executor:
+        futures = [
+            executor.submit(user_fn, runtime, names, turns, random.Random(seed * 1000 + user))
+            for user in range(users)
+        ]
+        samples = [sample for future in futures for sample in future.result()]
+    wall_seconds = time.perf_counter() - started
+
+    ok = [s for s in samples if "error" not in s]
+    summary: Dict[str, Any] = {
+        "users": users,
+        "turns": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_turns_per_s": round(len(ok) / wall_seconds, 3),
+        "throughput_tool_calls_per_s": round(sum(s["tool_calls"] for s in ok) / wall_seconds, 3),
+        "latency_ms": {"turn": summarize_latency([s["turn_ms"] for s in ok])},
+    }
+
+    if mode == "chat":
+        summary["latency_ms"]["first_token"] = summarize_latency(
+            [s["first_token_ms"] for s in ok if s["first_token_ms"] is not None]
+        )
+        summary["fast_path_turns"] = sum(1 for s in ok if s["fast_path"])
+        summary["max_history_tokens"] = max((s["history_tokens"] or 0 for s in ok), default=0)
+    else:
+        if mode == "batch":
+            summary["throughput_merchants_per_s"] = round(sum(s["merchants"] for s in ok) / wall_seconds, 3)
+        for tool in sorted({name for s in ok for name in s["tool_ms"]}):
+            summary["latency_ms"][tool] = summarize_latency([s["tool_ms"][tool] for s in ok if tool in s["tool_ms"]])
+
+    first_errors = sorted({s["error"] for s in samples if "error" in s})[:3]
+    if first_errors:
+        summary["error_samples"] = first_errors
+
+    summary["memory_mb"] = memory_snapshot()
+    return summary
+
+
+# ============================================
+# 실행
+# ============================================
+
+@contextlib.contextmanager
+def redirect_output(log_path: Optional[str]):
+    """
+    stdout/stderr를 파일로 돌림 (fd 단위: 이 안에서 시작한 MCP 서버 프로세스의 로그도 포함)
+    log_path가 None이면 그대로 출력
+    """
+    if log_path is None:
+        yield
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    log_fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (*saved, log_fd):
+            os.close(fd)
+
+
+def load_merchant_names(data_dir: str, sample_size: int, seed: int) -> List[str]:
+    """사용자 질문에 쓸 가맹점명 (SET1에서 무작위 추출)"""
+    names = pd.read_csv(os.path.join(data_dir, SET1_NAME), encoding="cp949", usecols=["MCT_NM"])["MCT_NM"].dropna()
+    return names.sample(min(sample_size, len(names)), random_state=seed).tolist()
+
+
+def load_merchant_codes(data_dir: str) -> List[str]:
+    """batch 모드에서 분석할 가맹점 코드 (SET1 전체)"""
+    codes = pd.read_csv(os.path.join(data_dir, SET1_NAME), encoding="cp949", usecols=["ENCODED_MCT"])["ENCODED_MCT"]
+    return codes.dropna().tolist()
+
+
+def run_dataset(args: argparse.Namespace, data_dir: str, manifest: Dict, log_path: Optional[str]) -> Dict[str, Any]:
+    """데이터셋 1개: 서버 시작(데이터 로드) → 동시 사용자 수별 측정"""
+    from chatbot.mcp_pool import MCPSessionPool
+    from chatbot.runtime import ChatRuntime, build_server_params
+    from chatbot.tool_cache import ToolResultCache
+    from chatbot.report_cache import ReportCache
+    from chatbot.prompts import SYSTEM_PROMPT, prompt_hash
+
+    os.environ["MCP_DATA_DIR"] = os.path.abspath(data_dir)
+    names = load_merchant_codes(data_dir) if args.mode == "batch" else load_merchant_names(data_dir, args.name_sample, args.seed)
+
+    llm = ScriptedChatModel(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, answer_tokens=args.answer_tokens)
+
+    print(f"\n🚀 서버 시작: {data_dir} (세션 {args.pool_size}개)")
+    with redirect_output(log_path):
+        started = time.perf_counter()
+        pool = MCPSessionPool(build_server_params("offline", command=args.server_command), size=args.pool_size)
+        startup_seconds = time.perf_counter() - started
+
+    try:
+        runtime = ChatRuntime(
+            llm,
+            pool,
+            ToolResultCache() if args.cache else None,
+            # 서비스용 리포트 캐시/요청 기록과 섞이지 않도록 결과 디렉토리에 별도 파일 사용
+            ReportCache(
+                os.path.join(args.output_dir, "loadtest_reports.sqlite"), prompt_hash(SYSTEM_PROMPT), "scripted"
+            ) if args.cache else None
+        )
+
+        # 세션마다 1턴씩 실행해 RAG 인덱스 로드 등 첫 호출 비용 제외
+        with redirect_output(log_path):
+            warmup = run_level(runtime, names, args.pool_size, 1, args.mode, args.seed, args.batch_size)
+        print(f"  준비 완료 {startup_seconds:.1f}초 (워밍업 {warmup['wall_seconds']:.1f}초, 오류 {warmup['errors']})")
+
+        levels = []
+        for users in args.users:
+            with redirect_output(log_path):
+                level = run_level(runtime, names, users, args.turns, args.mode, args.seed + users, args.batch_size)
+            levels.append(level)
+            print_level(level, args.mode)
+    finally:
+        with redirect_output(log_path):
+            pool.close()
+
+    return {
+        "data_dir": data_dir,
+        "dataset": manifest,
+        "startup_seconds": round(startup_seconds, 3),
+        "memory_after_startup_mb": warmup["memory_mb"],
+        "levels": levels,
+    }
+
+
+def main(argv: List[str] = None) -> Dict:
+    args = parse_args(argv)
+
+    if args.command == "generate":
+        return generate_dataset(args.output, args.merchants[0], args.months, args.seed)
+
+    # chatbot/rag 모듈이 import 시점에 읽는 환경변수를 먼저 설정 (서버 프로세스에도 전달됨)
+    os.environ["RAG_EMBEDDING_PROVIDER"] = "local"
+    os.environ["RAG_FAISS_PATH"] = os.path.abspath(args.faiss_path)
+    os.environ["RAG_SEMANTIC_CACHE"] = "0"
+    os.environ.setdefault("TRACE_EXPORT", "none")
+    if args.process_workers is not None:
+        os.environ["MCP_PROCESS_WORKERS"] = args.process_workers
+
+    from rag.vectorstore.faiss_client import has_index
+
+    if not has_index(args.faiss_path):
+        print(f"❌ {args.faiss_path}에 인덱스 없음 (python -m benchmarks.rag_benchmark --provider local --build-from ./faiss_db)")
+        sys.exit(1)
+
+    datasets = [(data_dir, {"source": data_dir}) for data_dir in args.data_dir]
+    datasets += [ensure_dataset(merchants, args.months, args.seed) for merchants in args.merchants]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    run_name = f"loadtest_{args.mode}_{time.strftime('%Y%m%d_%H%M%S')}"
+    log_path = None if args.verbose else os.path.join(args.output_dir, f"{run_name}.log")
+    if log_path:
+        print(f"📝 서버/클라이언트 로그: {log_path}")
+
+    result = {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "mode": args.mode,
+            "users": args.users,
+            "turns_per_user": args.turns,
+            "pool_size": args.pool_size,
+            "cache": args.cache,
+            "llm_ttft_ms": args.llm_ttft_ms,
+            "llm_token_ms": args.llm_token_ms,
+            "answer_tokens": args.answer_tokens,
+            "cpu_count": os.cpu_count(),
+            "process_workers": os.environ.get("MCP_PROCESS_WORKERS", "auto"),
+            "batch_size": args.batch_size if args.mode == "batch" else None,
+        },
+        "datasets": [run_dataset(args, data_dir, manifest, log_path) for data_dir, manifest in datasets],
+    }
+
+    output_path = os.path.join(args.output_dir, f"{run_name}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print_summary(result)
+    print(f"\n💾 결과 저장: {output_path}")
+    return result
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="오프라인 부하 테스트 (가짜 LLM + 로컬 임베딩 + 합성 데이터)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="합성 SET1/SET2/SET3 생성")
+    generate.add_argument("--merchants", type=int, nargs=1, required=True, help="가맹점 수")
+    generate.add_argument("--output", required=True, help="출력 디렉토리 (MCP_DATA_DIR로 사용)")
+
+    run = commands.add_parser("run", help="동시 사용자 부하 테스트")
+    run.add_argument("--merchants", type=int, nargs="*", default=[],
+                     help="합성 데이터 가맹점 수 목록 (없으면 생성, benchmarks/synthetic/에 재사용)")
+    run.add_argument("--data-dir", nargs="*", default=[], help="기존 데이터 디렉토리 목록 (예: ./data)")
+    run.add_argument("--users", type=int, nargs="+", default=[1, 4, 16], help="동시 사용자 수 목록")
+    run.add_argument("--turns", type=int, default=5, help="사용자당 턴 수")
+    run.add_argument("--mode", choices=("chat", "tools", "batch"), default="chat",
+                     help="chat: 사용자 턴 전체, tools: Tool만, batch: 가맹점 일괄 분석")
+    run.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_MERCHANTS, help="batch 모드 요청 1건의 가맹점 수")
+    run.add_argument("--process-workers", default=None,
+                     help="서버 프로세스 풀 워커 수 (MCP_PROCESS_WORKERS, auto | 0 | N, 기본값: 서버 설정)")
+    run.add_argument("--pool-size", type=int, default=int(os.environ.get("MCP_POOL_SIZE", "2")),
+                     help="MCP 세션(서버 프로세스) 수")
+    run.add_argument("--server-command", default="python mcp_server.py", help="MCP 서버 실행 명령")
+    run.add_argument("--faiss-path", default=DEFAULT_BENCH_PATH, help="로컬 해시 임베딩 코퍼스")
+    run.add_argument("--llm-ttft-ms", type=float, default=0.0, help="가짜 LLM 첫 토큰 지연 (ms)")
+    run.add_argument("--llm-token-ms", type=float, default=0.0, help="가짜 LLM 토큰당 지연 (ms)")
+    run.add_argument("--answer-tokens", type=int, default=200, help="가짜 LLM 최종 응답 토큰 수")
+    run.add_argument("--name-sample", type=int, default=500, help="질문에 쓸 가맹점명 수")
+    run.add_argument("--cache", action="store_true", help="Tool 결과/전략 리포트 캐시를 켠 상태로 측정 (기본값: 끔)")
+    run.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR, help="결과 JSON 저장 디렉토리")
+    run.add_argument("--verbose", action="store_true", help="서버/클라이언트 로그를 파일 대신 화면에 출력")
+
+    for command in (generate, run):
+        command.add_argument("--months", type=int, default=DEFAULT_MONTHS, help="가맹점당 월 수")
+        command.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and not (args.merchants or args.data_dir):
+        parser.error("--merchants 또는 --data-dir을 지정하세요.")
+    return args
+
+
+# ============================================
+# 출력
+# ============================================
+
+def _memory_line(memory: Dict[str, Any]) -> str:
+    servers = memory["servers"]
+    server_rss = sum(s.get("rss", 0) for s in servers)
+    server_pss = sum(s.get("pss", 0) for s in servers)
+    return (
+        f"client rss={memory['client'].get('rss', 0):.0f}MB  "
+        f"server×{len(servers)} rss={server_rss:.0f}MB pss={server_pss:.0f}MB"
+    )
+
+
+def print_level(level: Dict[str, Any], mode: str) -> None:
+    turn = level["latency_ms"]["turn"]
+    line = (
+        f"  users={level['users']:<3d} {level['throughput_turns_per_s']:7.2f} turns/s  "
+        f"turn p50={turn.get('p50', 0):.0f} p95={turn.get('p95', 0):.0f} p99={turn.get('p99', 0):.0f}ms"
+    )
+    if mode == "batch":
+        line += f"  {level.get('throughput_merchants_per_s', 0):.1f} merchants/s"
+    if mode == "chat" and level["latency_ms"]["first_token"].get("n"):
+        line += f"  ttft p95={level['latency_ms']['first_token']['p95']:.0f}ms"
+    if level["errors"]:
+        line += f"  ❌ 오류 {level['errors']}"
+    print(line)
+
+
+def print_summary(result: Dict) -> None:
+    run = result["run"]
+    print(f"\n📊 부하 테스트 ({run['mode']}, 세션 {run['pool_size']}개, CPU {run['cpu_count']}개, "
+          f"프로세스 풀 {run['process_workers']})")
+
+    for dataset in result["datasets"]:
+        info = dataset["dataset"]
+        label = f"가맹점 {info['merchants']:,}곳 × {info['months']}개월" if "merchants" in info else info["source"]
+        print(f"\n[{label}] 서버 준비 {dataset['startup_seconds']:.1f}초")
+        print(f"  시작 직후  {_memory_line(dataset['memory_after_startup_mb'])}")
+        for level in dataset["levels"]:
+            print_level(level, run["mode"])
+            print(f"             {_memory_line(level['memory_mb'])}")
+            for tool, summary in level["latency_ms"].items():
+                if tool not in ("turn", "first_token") and summary.get("n"):
+                    print(f"             {tool:34s} p50={summary['p50']:.1f} p95={summary['p95']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
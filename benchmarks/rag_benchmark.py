@@ -0,0 +1,397 @@
+"""
+RAG 검색 품질/지연시간 벤치마크
+
+고정된 쿼리셋(benchmarks/queries.json, 정답 영상 링크 라벨)으로
+search_context의 검색 품질과 단계별 지연시간을 측정해 JSON으로 저장합니다.
+
+측정 항목:
+- 품질 (검색 방식별): recall@k, MRR
+- hit rate: 정답 문서가 유사도 임계값(0.7) 이상으로 검색된 쿼리 비율
+- 지연시간 p50/p95/p99: load(벡터스토어 로드), embed(쿼리 임베딩),
+  vector_search(임베딩 제외 FAISS 검색 + 문서 조회), search_<mode>(search_context 전체)
+
+실행 예시:
+    # 오프라인: 로컬 해시 임베딩으로 코퍼스를 다시 임베딩해 측정
+    python -m benchmarks.rag_benchmark --provider local --build-from ./faiss_db
+
+    # Gemini 임베딩 + 캐시 (처음 1회만 API 호출, 이후 오프라인 재실행 가능)
+    python -m benchmarks.rag_benchmark --provider cached --build-from ./faiss_db
+
+    # 이전 결과와 비교
+    python -m benchmarks.rag_benchmark --provider local --baseline benchmarks/results/<이전>.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_QUERIES_PATH = os.path.join(os.path.dirname(__file__), "queries.json")
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_BENCH_PATH = "./faiss_db_bench"
+
+DEFAULT_K = (1, 5, 10)
+DEFAULT_THRESHOLD = 0.7
+PERCENTILES = (50, 95, 99)
+
+# 코퍼스 재임베딩 배치 크기
+BUILD_BATCH_SIZE = 256
+
+# baseline 비교 시 출력할 지표
+HEADLINE_METRICS = ("recall@5", "recall@10", "mrr")
+
+
+def main(argv: List[str] = None) -> Dict:
+    args = parse_args(argv)
+
+    # rag 모듈이 import 시점에 읽는 환경변수를 먼저 설정
+    os.environ["RAG_EMBEDDING_PROVIDER"] = args.provider
+    os.environ["RAG_FAISS_PATH"] = args.faiss_path
+    # 반복 측정이 캐시 적중으로 왜곡되지 않도록 기본적으로 시맨틱 캐시 비활성화
+    os.environ["RAG_SEMANTIC_CACHE"] = "1" if args.semantic_cache else "0"
+
+    from rag.vectorstore.faiss_client import has_index
+
+    build_seconds = None
+    if args.build_from:
+        build_seconds = build_corpus(args.build_from, args.faiss_path)
+    elif not has_index(args.faiss_path):
+        print(f"❌ {args.faiss_path}에 인덱스 없음 (--build-from으로 코퍼스를 먼저 생성하세요)")
+        sys.exit(1)
+
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)["queries"]
+
+    result = run_benchmark(args, queries)
+    result["run"]["build_seconds"] = build_seconds
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(
+        args.output_dir,
+        f"rag_{args.provider}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print_summary(result)
+    if args.baseline:
+        print_comparison(result, args.baseline)
+
+    print(f"\n💾 결과 저장: {output_path}")
+    return result
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RAG 검색 품질/지연시간 벤치마크")
+    parser.add_argument("--provider", default="local", choices=("gemini", "cached", "local"),
+                        help="임베딩 provider (기본값: local, 오프라인 실행)")
+    parser.add_argument("--faiss-path", default=DEFAULT_BENCH_PATH,
+                        help="측정 대상 벡터스토어 디렉토리")
+    parser.add_argument("--build-from", default=None,
+                        help="이 벡터스토어의 문서를 --provider로 다시 임베딩해 --faiss-path에 코퍼스 생성")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES_PATH, help="쿼리셋 JSON")
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_K), help="recall@k의 k 목록")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="유사도 임계값")
+    parser.add_argument("--modes", nargs="+", default=["vector", "lexical", "hybrid"],
+                        help="측정할 search_mode 목록")
+    parser.add_argument("--repeat", type=int, default=5, help="지연시간 측정 반복 횟수")
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="시맨틱 캐시를 켠 상태로 측정 (기본값: 끔)")
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR, help="결과 JSON 저장 디렉토리")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    return parser.parse_args(argv)
+
+
+# ============================================
+# 코퍼스 생성
+# ============================================
+
+def build_corpus(source_path: str, target_path: str) -> float:
+    """
+    source_path 벡터스토어의 문서를 현재 provider로 다시 임베딩해 target_path에 저장
+
+    Returns:
+        소요 시간 (초)
+    """
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    from rag.vectorstore.embeddings import get_embeddings
+    from rag.vectorstore.faiss_client import (
+        LEGACY_DOCSTORE_NAME,
+        load_legacy_docstore,
+        resolve_index_path,
+        save_vectorstore,
+    )
+    from rag.vectorstore.sqlite_docstore import DOCSTORE_NAME, SQLiteDocstore
+
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        raise ValueError("--build-from과 --faiss-path는 서로 다른 디렉토리여야 합니다.")
+
+    started = time.perf_counter()
+
+    # source_path는 읽기만 함 (이전 형식이어도 마이그레이션하지 않음)
+    source_docstore_path = os.path.join(resolve_index_path(source_path), DOCSTORE_NAME)
+    if os.path.exists(source_docstore_path):
+        source = SQLiteDocstore(source_docstore_path)
+        documents = [doc for _, doc in source.iter_documents()]
+        source.close()
+    elif os.path.exists(os.path.join(source_path, LEGACY_DOCSTORE_NAME)):
+        docstore, index_to_docstore_id = load_legacy_docstore(source_path)
+        documents = [docstore.search(index_to_docstore_id[i]) for i in sorted(index_to_docstore_id)]
+        documents = [doc for doc in documents if not isinstance(doc, str)]
+    else:
+        raise FileNotFoundError(f"{source_path}에 docstore가 없습니다.")
+
+    print(f"🏗️ 코퍼스 생성: {len(documents)}개 문서 → {target_path}")
+
+    embeddings = get_embeddings(task_type="retrieval_document")
+    vectorstore = None
+
+    for i in range(0, len(documents), BUILD_BATCH_SIZE):
+        batch = documents[i:i + BUILD_BATCH_SIZE]
+        texts = [doc.page_content for doc in batch]
+        text_embeddings = list(zip(texts, embeddings.embed_documents(texts)))
+        metadatas = [doc.metadata for doc in batch]
+
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(
+                text_embeddings,
+                embeddings,
+                metadatas=metadatas,
+                distance_strategy=DistanceStrategy.COSINE
+            )
+        else:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+
+    save_vectorstore(vectorstore, target_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ 코퍼스 생성 완료 ({elapsed:.1f}초)")
+    return elapsed
+
+
+# ============================================
+# 측정
+# ============================================
+
+def run_benchmark(args: argparse.Namespace, queries: List[Dict]) -> Dict:
+    from rag.services.search import search_context, search_vectors, load_documents
+    from rag.vectorstore.embeddings import get_embeddings
+    from rag.vectorstore.faiss_client import get_vectorstore, load_vectorstore
+
+    max_k = max(args.k)
+    embeddings = get_embeddings()
+
+    # 1. 로드 (디스크 → 벡터스토어)
+    load_ms = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        loaded = load_vectorstore(args.faiss_path, embeddings)
+        load_ms.append(_elapsed_ms(started))
+        loaded.docstore.close()
+
+    vectorstore = get_vectorstore()
+    num_docs = vectorstore.index.ntotal
+
+    # 2. 쿼리 임베딩
+    embed_ms = []
+    query_vectors = []
+    for query in queries:
+        for r in range(args.repeat):
+            started = time.perf_counter()
+            vector = vectorstore._embed_query(query["query"])
+            embed_ms.append(_elapsed_ms(started))
+        query_vectors.append(vector)
+
+    query_vectors = np.array(query_vectors, dtype=np.float32)
+
+    # 3. 벡터 검색 (임베딩 제외) + 임계값 기준 hit rate
+    vector_search_ms = []
+    threshold_hits = []
+    for query, vector in zip(queries, query_vectors):
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = search_vectors(vectorstore, vector[None, :], max_k, 0.0)[0]
+            docs = load_documents(vectorstore, [position for position, _ in hits])
+            vector_search_ms.append(_elapsed_ms(started))
+
+        relevant = set(query["relevant_video_links"])
+        threshold_hits.append(any(
+            score >= args.threshold and docs.get(position) is not None
+            and docs[position].metadata.get("video_link") in relevant
+            for position, score in hits
+        ))
+
+    latency = {
+        "load": summarize_latency(load_ms),
+        "embed": summarize_latency(embed_ms),
+        "vector_search": summarize_latency(vector_search_ms),
+    }
+
+    # 4. search_context 전체 (검색 방식별 품질 + 지연시간)
+    quality = {}
+    per_query = {query["id"]: {"query": query["query"]} for query in queries}
+
+    for mode in args.modes:
+        mode_ms = []
+        rankings = []
+        for query in queries:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                _, docs = search_context(
+                    query["query"],
+                    similarity_threshold=args.threshold,
+                    fetch_k=max_k,
+                    search_mode=mode
+                )
+                mode_ms.append(_elapsed_ms(started))
+
+            ranked_links = [doc.metadata.get("video_link") for doc in docs]
+            rankings.append(ranked_links)
+            per_query[query["id"]][mode] = {
+                "retrieved": len(docs),
+                "first_relevant_rank": _first_relevant_rank(ranked_links, query["relevant_video_links"])
+            }
+
+        latency[f"search_{mode}"] = summarize_latency(mode_ms)
+        quality[mode] = quality_metrics(rankings, queries, args.k)
+
+    return {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "provider": args.provider,
+            "faiss_path": args.faiss_path,
+            "index_type": _index_type(args.faiss_path),
+            "num_docs": num_docs,
+            "num_queries": len(queries),
+            "k": args.k,
+            "threshold": args.threshold,
+            "repeat": args.repeat,
+            "semantic_cache": args.semantic_cache,
+        },
+        "quality": quality,
+        f"hit_rate@{args.threshold}": float(np.mean(threshold_hits)) if threshold_hits else 0.0,
+        "latency_ms": latency,
+        "per_query": per_query,
+    }
+
+
+def quality_metrics(rankings: List[List[str]], queries: List[Dict], ks: List[int]) -> Dict[str, float]:
+    """
+    recall@k: 정답 영상 중 상위 k개 문서에 포함된 영상 비율 (쿼리 평균)
+    mrr: 첫 정답 문서 순위의 역수 평균 (없으면 0)
+    """
+    metrics = {}
+
+    for k in ks:
+        recalls = []
+        for ranked_links, query in zip(rankings, queries):
+            relevant = set(query["relevant_video_links"])
+            recalls.append(len(relevant & set(ranked_links[:k])) / len(relevant))
+        metrics[f"recall@{k}"] = float(np.mean(recalls))
+
+    reciprocal_ranks = []
+    for ranked_links, query in zip(rankings, queries):
+        rank = _first_relevant_rank(ranked_links, query["relevant_video_links"])
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    metrics["mrr"] = float(np.mean(reciprocal_ranks))
+
+    return metrics
+
+
+def summarize_latency(samples_ms: List[float]) -> Dict[str, float]:
+    """지연시간 요약 (ms): p50/p95/p99, 평균, 표본 수"""
+    if not samples_ms:
+        return {"n": 0}
+
+    summary = {f"p{p}": round(float(np.percentile(samples_ms, p)), 3) for p in PERCENTILES}
+    summary["mean"] = round(float(np.mean(samples_ms)), 3)
+    summary["n"] = len(samples_ms)
+    return summary
+
+
+def _first_relevant_rank(ranked_links: List[str], relevant_links: List[str]):
+    relevant = set(relevant_links)
+    for rank, link in enumerate(ranked_links, start=1):
+        if link in relevant:
+            return rank
+    return None
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _index_type(faiss_path: str) -> str:
+    from rag.vectorstore.faiss_client import resolve_index_path
+
+    report_path = os.path.join(resolve_index_path(faiss_path), "index_report.json")
+    if os.path.exists(report_path):
+        with open(report_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("index_type", "flat")
+    return "flat"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================
+# 출력
+# ============================================
+
+def print_summary(result: Dict) -> None:
+    run = result["run"]
+    threshold = run["threshold"]
+
+    print(f"\n📊 RAG 벤치마크 ({run['provider']}, {run['index_type']}, 문서 {run['num_docs']}개, 쿼리 {run['num_queries']}개)")
+
+    print("\n[품질]")
+    for mode, metrics in result["quality"].items():
+        values = "  ".join(f"{name}={value:.3f}" for name, value in metrics.items())
+        print(f"  {mode:8s} {values}")
+    print(f"  hit_rate@{threshold} = {result[f'hit_rate@{threshold}']:.3f}")
+
+    print("\n[지연시간 ms]")
+    for stage, summary in result["latency_ms"].items():
+        print(f"  {stage:16s} p50={summary['p50']:.2f}  p95={summary['p95']:.2f}  p99={summary['p99']:.2f}")
+
+
+def print_comparison(result: Dict, baseline_path: str) -> None:
+    """이전 결과 대비 주요 지표 변화 출력"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\n[baseline 대비: {baseline['run'].get('timestamp')} ({baseline['run'].get('git_commit')})]")
+
+    for mode, metrics in result["quality"].items():
+        before = baseline.get("quality", {}).get(mode, {})
+        changes = [
+            f"{name} {before[name]:.3f}→{metrics[name]:.3f}"
+            for name in HEADLINE_METRICS
+            if name in metrics and name in before
+        ]
+        if changes:
+            print(f"  {mode:8s} " + "  ".join(changes))
+
+    for stage, summary in result["latency_ms"].items():
+        before = baseline.get("latency_ms", {}).get(stage)
+        if before and "p95" in before:
+            print(f"  {stage:16s} p95 {before['p95']:.2f}→{summary['p95']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+대화 히스토리 관리 (토큰 예산)
+- 매 턴 전체 대화를 다시 보내면 프롬프트 크기와 LLM 지연이 턴마다 증가
+- 최근 턴은 원문 그대로, 오래된 턴은 짧은 요약으로 대체해 토큰 예산 안으로 유지
+- 시스템 프롬프트는 원문 유지, 요약과 현재 가맹점 정보는 시스템 메시지 뒤에 덧붙임
+  (Gemini는 SystemMessage를 맨 앞 1개만 허용)
+- 현재 가맹점 정보는 Tool 결과(search/select/analyze)에서 구조화해 보관 (MerchantState)
+"""
+
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from chatbot.runtime import message_text
+
+# 시스템 프롬프트를 제외한 대화 부분의 토큰 예산 (추정치 기준)
+HISTORY_TOKEN_BUDGET = int(os.environ.get("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+
+# 원문 그대로 유지할 최근 턴 수 (현재 질문 제외)
+KEEP_RECENT_TURNS = int(os.environ.get("CHAT_HISTORY_KEEP_TURNS", "2"))
+
+# 턴 요약 최대 길이 (문자)
+SUMMARY_QUERY_CHARS = 100
+SUMMARY_ANSWER_CHARS = 300
+
+# 시스템 메시지에 표시할 최대 후보 수
+MAX_PROMPT_CANDIDATES = 10
+
+# 메시지 1개당 역할/구분자 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+# ============================================
+# 토큰 추정
+# ============================================
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 추정 (API 호출 없음)
+
+    영문/숫자/기호는 약 4자당 1토큰, 한글 등 비ASCII 문자는 약 1.5자당 1토큰으로 계산합니다.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def estimate_message_tokens(messages: List[BaseMessage]) -> int:
+    return sum(estimate_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+# ============================================
+# 현재 가맹점 상태
+# ============================================
+
+@dataclass
+class MerchantState:
+    """Tool 결과에서 추출한 현재 대화 대상 가맹점 정보"""
+    encoded_mct: str = ""
+    name: str = ""
+    location: str = ""
+    business_type: str = ""
+    business_detail: str = ""
+    pattern_type: str = ""
+    severity_label: str = ""
+    strategy_type: str = ""
+    latest_metrics: Dict[str, Any] = field(default_factory=dict)
+    # 마지막 search_merchant 결과가 여러 개일 때의 후보 목록과 검색 조건 (번호 선택용)
+    # 후보의 index는 전체 결과 순번, 다음 페이지(cursor) 결과는 이어 붙임
+    candidates: List[Dict[str, Any]] = field(default_factory=list)
+    candidate_query: str = ""
+    candidate_filters: Dict[str, str] = field(default_factory=dict)
+    candidate_count: int = 0
+
+    def update_from_tool(self, tool_name: str, content: str) -> bool:
+        """
+        Tool 결과(JSON 문자열)로 상태 갱신
+
+        Returns:
+            bool: 상태가 갱신되었는지 여부
+        """
+        try:
+            result = json.loads(content)
+        except (TypeError, ValueError):
+            return False
+        if not isinstance(result, dict) or not result.get("found"):
+            return False
+
+        if tool_name == "search_merchant" and result.get("result_type") == "single":
+            self._set_merchant(result["data"])
+            self._clear_candidates()
+            return True
+
+        if tool_name == "search_merchant" and result.get("result_type") == "multiple":
+            query = result.get("merchant_name") or ""
+            filters = {
+                key: result[key]
+                for key in ("location", "business_type")
+                if result.get(key)
+            }
+            page = list(result.get("data") or [])
+            if query != self.candidate_query or filters != self.candidate_filters:
+                self.candidates = []
+            known = {candidate.get("index") for candidate in self.candidates}
+            self.candidates.extend(candidate for candidate in page if candidate.get("index") not in known)
+            self.candidate_query = query
+            self.candidate_filters = filters
+            self.candidate_count = result.get("count") or len(self.candidates)
+            return True
+
+        if tool_name == "select_merchant":
+            self._set_merchant(result["data"])
+            self._clear_candidates()
+            return True
+
+        if tool_name == "analyze_merchant_pattern":
+            context = result.get("merchant_context") or {}
+            self._set_merchant({"encoded_mct": result.get("encoded_mct"), **context})
+
+            pattern = result.get("pattern") or {}
+            severity = result.get("severity") or {}
+            self.pattern_type = pattern.get("pattern_type") or ""
+            self.severity_label = severity.get("label") or ""
+            self.strategy_type = severity.get("strategy_type") or ""
+            self.latest_metrics = context.get("latest_metrics") or {}
+            return True
+
+        return False
+
+    def candidate(self, index: int) -> Optional[Dict[str, Any]]:
+        """전체 결과 순번(1부터)으로 후보 조회 (아직 받지 않은 페이지면 None)"""
+        for position, candidate in enumerate(self.candidates, start=1):
+            if candidate.get("index", position) == index:
+                return candidate
+        return None
+
+    def _clear_candidates(self) -> None:
+        self.candidates, self.candidate_query = [], ""
+        self.candidate_filters, self.candidate_count = {}, 0
+
+    def _set_merchant(self, data: Dict[str, Any]) -> None:
+        encoded_mct = data.get("encoded_mct") or ""
+        if encoded_mct != self.encoded_mct:
+            # 다른 가맹점으로 바뀌면 이전 분석 결과는 버림
+            self.pattern_type = self.severity_label = self.strategy_type = ""
+            self.latest_metrics = {}
+
+        self.encoded_mct = encoded_mct
+        self.name = data.get("name") or ""
+        self.location = data.get("location") or ""
+        self.business_type = data.get("business_type") or ""
+        self.business_detail = data.get("business_detail") or ""
+
+    def to_prompt(self) -> str:
+        """시스템 메시지에 덧붙일 텍스트 (가맹점/후보가 없으면 빈 문자열)"""
+        sections = []
+
+        if self.encoded_mct:
+            lines = [
+                "# 현재 가맹점 (이전 Tool 결과)",
+                f"- ENCODED_MCT: {self.encoded_mct}",
+                f"- 가맹점명: {self.name}",
+                f"- 위치: {self.location}",
+                f"- 업종: {self.business_type}",
+            ]
+            if self.business_detail:
+                lines.append(f"- 상권: {self.business_detail}")
+            if self.pattern_type or self.severity_label:
+                lines.append(f"- 패턴: {self.pattern_type or '없음'} ({self.severity_label}, 전략 유형: {self.strategy_type})")
+            if self.latest_metrics:
+                metrics = ", ".join(f"{key}={value}" for key, value in self.latest_metrics.items())
+                lines.append(f"- 최신 지표: {metrics}")
+            sections.append("\n".join(lines))
+
+        if self.candidates:
+            condition = ", ".join(f"{key}={value}" for key, value in self.candidate_filters.items())
+            lines = [f"# 가맹점 후보 (search_merchant 검색어: {self.candidate_query}{', ' + condition if condition else ''})"]
+            lines.extend(
+                f"{c.get('index', i)}. {c.get('name')} ({c.get('location')}, {c.get('business_type')})"
+                for i, c in enumerate(self.candidates[:MAX_PROMPT_CANDIDATES], start=1)
+            )
+            remaining = max(self.candidate_count, len(self.candidates)) - min(len(self.candidates), MAX_PROMPT_CANDIDATES)
+            if remaining > 0:
+                lines.append(f"... 외 {remaining}개")
+            sections.append("\n".join(lines))
+
+        return "\n\n".join(sections)
+
+
+# ============================================
+# 히스토리 압축
+# ============================================
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+
+def summarize_turn(turn: List[BaseMessage]) -> str:
+    """
+    한 턴(사용자 질문 + AI 응답)을 한 줄 요약으로 변환 (LLM 호출 없음)
+
+    AI 응답은 마크다운 제목/굵은 글씨 줄만 모아 개요로 사용합니다.
+    제목이 없으면 응답 앞부분을 사용합니다.
+    """
+    query = " ".join(message_text(m) for m in turn if isinstance(m, HumanMessage))
+    answer = "\n".join(message_text(m) for m in turn if isinstance(m, AIMessage))
+
+    outline = [
+        line.strip().lstrip("#").strip().strip("*").strip()
+        for line in answer.splitlines()
+        if line.strip().startswith(("#", "**"))
+    ]
+    answer_summary = " / ".join(item for item in outline if item) or answer
+
+    return (
+        f"- 사용자: {_truncate(query, SUMMARY_QUERY_CHARS)}\n"
+        f"  답변 개요: {_truncate(answer_summary, SUMMARY_ANSWER_CHARS)}"
+    )
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """HumanMessage마다 새 턴 시작 (첫 질문 전 인사말은 별도 턴)"""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact_history(
+    messages: List[BaseMessage],
+    merchant_state: Optional[MerchantState] = None,
+    budget: int = HISTORY_TOKEN_BUDGET,
+    keep_recent_turns: int = KEEP_RECENT_TURNS
+) -> List[BaseMessage]:
+    """
+    토큰 예산에 맞춰 Agent에 보낼 메시지 구성
+
+    - 시스템 프롬프트: 원문 유지 (예산에서 제외)
+    - 현재 질문이 포함된 마지막 턴: 항상 원문 유지
+    - 그 이전 최근 턴: keep_recent_turns개까지 예산 안에서 원문 유지
+    - 나머지 오래된 턴: 요약으로 대체, 요약도 예산을 넘으면 오래된 것부터 생략
+    - 현재 가맹점 정보(merchant_state): 시스템 메시지에 추가
+
+    Args:
+        messages: SystemMessage를 포함한 전체 대화 (마지막은 현재 사용자 질문)
+        merchant_state: 현재 가맹점 상태
+
+    Returns:
+        List[BaseMessage]: [SystemMessage(시스템 프롬프트 + 요약 + 가맹점 정보), 최근 턴..., 현재 질문]
+    """
+    system_prompt = ""
+    if messages and isinstance(messages[0], SystemMessage):
+        system_prompt = message_text(messages[0])
+        messages = messages[1:]
+
+    turns = _split_turns(messages)
+    current, previous = turns[-1:], turns[:-1]
+
+    state_prompt = merchant_state.to_prompt() if merchant_state else ""
+    remaining = budget - estimate_message_tokens([m for turn in current for m in turn]) - estimate_tokens(state_prompt)
+
+    # 최근 턴부터 원문 유지
+    kept: List[List[BaseMessage]] = []
+    while previous and len(kept) < keep_recent_turns:
+        tokens = estimate_message_tokens(previous[-1])
+        if tokens > remaining:
+            break
+        kept.insert(0, previous.pop())
+        remaining -= tokens
+
+    # 나머지는 요약 (최근 것부터 예산 안에서)
+    summaries: List[str] = []
+    omitted = 0
+    for turn in reversed(previous):
+        if not any(isinstance(m, HumanMessage) for m in turn):
+            continue  # 첫 인사말
+        summary = summarize_turn(turn) if not omitted else ""
+        tokens = estimate_tokens(summary)
+        if omitted or tokens > remaining:
+            omitted += 1
+            continue
+        summaries.insert(0, summary)
+        remaining -= tokens
+
+    sections = [system_prompt.rstrip()]
+    if summaries or omitted:
+        header = "# 이전 대화 요약 (오래된 순)"
+        if omitted:
+            header += f"\n- (더 오래된 대화 {omitted}턴 생략)"
+        sections.append(header + "\n" + "\n".join(summaries))
+    if state_prompt:
+        sections.append(state_prompt)
+
+    compacted: List[BaseMessage] = [SystemMessage(content="\n\n".join(s for s in sections if s))]
+    for turn in kept + current:
+        compacted.extend(turn)
+
+    if previous:
+        print(
+            f"🧾 히스토리 압축: ~{estimate_message_tokens(messages)} → "
+            f"~{budget - remaining} 토큰 (원문 {len(kept) + len(current)}턴, 요약 {len(summaries)}턴)"
+        )
+
+    return compacted
@@ -0,0 +1,399 @@
+"""
+MCP 세션 풀
+- MCP 서버 프로세스 + ClientSession + Tool 목록을 한 번 만들고 계속 재사용
+- 백그라운드 이벤트 루프 스레드 하나에서 모든 세션과 Agent 실행을 처리
+  (Streamlit rerun 스레드는 run()으로 코루틴을 제출하고 결과만 기다림)
+- 오래 쉬었던 세션은 사용 전 ping으로 상태 확인, 죽은 세션은 자동 재시작
+- 세션 여러 개를 풀로 관리해 동시 사용자 요청을 병렬 처리
+- 한 Agent 단계의 Tool 호출 여러 개는 쉬고 있는 다른 세션(서버 프로세스)에 나눠 동시 실행
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+
+import anyio
+from langchain_core.tools import BaseTool, StructuredTool
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from observability.tracing import TRACE_CONTEXT_ARG, attach, current_traceparent, span
+
+T = TypeVar("T")
+
+# stdio: 서버 프로세스 실행 파라미터 / http: 공유 서버 URL (예: "http://127.0.0.1:8000/mcp")
+ServerParams = Union[StdioServerParameters, str]
+
+# 세션이 더 이상 쓸 수 없음을 뜻하는 예외 (서버 프로세스 종료, 파이프 끊김)
+CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, BrokenPipeError)
+
+# 동시에 유지할 MCP 세션(서버 프로세스) 수
+MCP_POOL_SIZE = int(os.environ.get("MCP_POOL_SIZE", "2"))
+
+# 마지막 사용 후 이 시간(초)이 지난 세션은 사용 전 ping (기본값 0: 매번 ping, stdio 왕복 약 1ms)
+HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_HEALTH_CHECK_INTERVAL", "0"))
+PING_TIMEOUT = 5.0
+
+# 동시 Tool 호출을 쉬는 세션에 분배 (CPU 1개면 프로세스를 나눠도 이득이 없어 기본값 off)
+ROUTE_TOOL_CALLS = os.environ.get("MCP_ROUTE_TOOL_CALLS", "1" if (os.cpu_count() or 1) > 1 else "0") != "0"
+
+# Agent에 노출하지 않는 내부용 Tool (데이터 버전 조회)
+SERVER_INFO_TOOL = "get_server_info"
+INTERNAL_TOOLS = (SERVER_INFO_TOOL, "server_stats")
+
+# 서버 프로세스 시작(데이터 로드 포함) / 종료 대기 시간
+START_TIMEOUT = 120.0
+STOP_TIMEOUT = 10.0
+
+
+def _client_tool(tool: StructuredTool, worker_id: int) -> StructuredTool:
+    """
+    서버 Tool의 숨은 trace_context 인자를 LLM에 보이는 스키마에서 제거하고,
+    호출 시 현재 traceparent로 채워 서버 span을 이 요청에 연결
+    """
+    schema = tool.args_schema
+    if not isinstance(schema, dict) or TRACE_CONTEXT_ARG not in schema.get("properties", {}):
+        return tool
+
+    visible_schema = {
+        **schema,
+        "properties": {key: value for key, value in schema["properties"].items() if key != TRACE_CONTEXT_ARG},
+        "required": [key for key in schema.get("required", []) if key != TRACE_CONTEXT_ARG],
+    }
+    call = tool.coroutine
+
+    async def traced_call(**arguments):
+        with span(f"mcp.{tool.name}", worker_id=worker_id):
+            return await call(**arguments, **{TRACE_CONTEXT_ARG: current_traceparent()})
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=visible_schema,
+        coroutine=traced_call,
+        response_format=tool.response_format,
+        metadata=tool.metadata,
+    )
+
+
+class MCPWorker:
+    """
+    MCP 서버 프로세스 1개와 세션 1개 (server_params가 URL이면 공유 HTTP 서버에 대한 세션 1개)
+
+    stdio_client / ClientSession 컨텍스트는 같은 task 안에서 열고 닫아야 하므로
+    _serve() task가 세션을 열어 둔 채 종료 신호를 기다립니다.
+    """
+
+    def __init__(self, server_params: ServerParams, worker_id: int):
+        self.server_params = server_params
+        self.worker_id = worker_id
+        self.session: Optional[ClientSession] = None
+        self.tools: List[Any] = []
+        # get_server_info 결과 (data_version, rules_version, rag_version), 서버가 지원하지 않으면 빈 dict
+        self.server_info: Dict[str, Any] = {}
+        self.server_info_at = 0.0
+        self._has_server_info = False
+        self.started_at: Optional[float] = None
+        self.last_used = 0.0
+        # 이 세션에서 실행 중인 Tool 호출 수 (route_tools 분배용)
+        self.in_flight = 0
+        self._stop_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        # 서버 프로세스 시작 + 데이터 로드 + initialize + Tool 로드
+        with span("mcp.start_session", worker_id=self.worker_id):
+            ready = asyncio.get_running_loop().create_future()
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.create_task(self._serve(ready), name=f"mcp-worker-{self.worker_id}")
+            await asyncio.wait_for(ready, START_TIMEOUT)
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        from langchain_mcp_adapters.tools import load_mcp_tools
+
+        try:
+            async with self._connect() as streams:
+                read, write = streams[0], streams[1]
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    tools = await load_mcp_tools(session)
+                    self.tools = [
+                        _client_tool(tool, self.worker_id)
+                        for tool in tools
+                        if tool.name not in INTERNAL_TOOLS
+                    ]
+                    self._has_server_info = any(tool.name == SERVER_INFO_TOOL for tool in tools)
+                    self.session = session
+                    await self.refresh_server_info()
+                    self.started_at = time.monotonic()
+                    self.last_used = self.started_at
+                    ready.set_result(None)
+
+                    await self._stop_event.wait()
+        except BaseException as e:
+            if not ready.done():
+                if isinstance(e, asyncio.CancelledError):
+                    ready.cancel()
+                else:
+                    ready.set_exception(e)
+            else:
+                print(f"⚠️ MCP 세션 {self.worker_id} 종료: {e!r}")
+        finally:
+            self.session = None
+
+    def _connect(self):
+        if isinstance(self.server_params, str):
+            # HTTP 클라이언트(httpx)가 연결을 keep-alive로 재사용
+            return streamablehttp_client(self.server_params)
+        return stdio_client(self.server_params)
+
+    async def ping(self) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), PING_TIMEOUT)
+            return True
+        except Exception as e:
+            print(f"⚠️ MCP 세션 {self.worker_id} ping 실패: {e!r}")
+            return False
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """이 세션의 Tool 실행 (langchain Tool 결과 형식: (content, artifact))"""
+        tool = next(tool for tool in self.tools if tool.name == name)
+        self.in_flight += 1
+        try:
+            return await tool.coroutine(**arguments)
+        finally:
+            self.in_flight -= 1
+
+    async def refresh_server_info(self, max_age: float = 0.0) -> Dict[str, Any]:
+        """서버 데이터 버전 조회 (마지막 조회 후 max_age초 이내면 이전 결과 사용)"""
+        if not self._has_server_info or time.monotonic() - self.server_info_at < max_age:
+            return self.server_info
+
+        try:
+            result = await self.session.call_tool(SERVER_INFO_TOOL, {})
+            self.server_info = json.loads(result.content[0].text)
+        except CONNECTION_ERRORS:
+            raise
+        except Exception as e:
+            print(f"⚠️ MCP 세션 {self.worker_id} 서버 정보 조회 실패: {e!r}")
+            self.server_info = {}
+        # 서버가 아직 데이터를 로드 중이면(data_version 없음) 다음 조회 때 다시 확인
+        self.server_info_at = time.monotonic() if self.server_info.get("data_version") else 0.0
+        return self.server_info
+
+    async def stop(self) -> None:
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(self._task, STOP_TIMEOUT)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+        self.session = None
+
+
+class MCPSessionPool:
+    """
+    MCP 세션 풀 (스레드 안전)
+
+    사용 예시:
+        pool = MCPSessionPool(server_params)
+        result = pool.run(lambda worker: agent_for(worker.tools).ainvoke(...))
+    """
+
+    def __init__(self, server_params: ServerParams, size: int = MCP_POOL_SIZE):
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.restarts = 0
+
+        self._workers: Dict[int, MCPWorker] = {}
+        self._idle: Optional[asyncio.Queue] = None
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-pool", daemon=True)
+        self._thread.start()
+
+        try:
+            self._submit(self._start_all()).result()
+        except BaseException:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            raise
+
+        atexit.register(self.close)
+
+    # ============================================
+    # 외부 스레드용 API
+    # ============================================
+
+    def run(self, fn: Callable[[MCPWorker], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        풀의 세션 하나를 빌려 fn(worker)를 백그라운드 루프에서 실행하고 결과 반환
+
+        fn 안의 모든 비동기 작업(Agent 실행, Tool 호출)은 세션과 같은 루프에서 실행됩니다.
+        """
+        return self.submit(fn).result(timeout)
+
+    def submit(self, fn: Callable[[MCPWorker], Awaitable[T]]) -> "concurrent.futures.Future[T]":
+        """
+        run()의 non-blocking 버전 (결과는 concurrent.futures.Future로 받음)
+
+        호출 스레드의 현재 span을 백그라운드 루프의 실행에 이어 붙입니다.
+        """
+        if self._closed:
+            raise RuntimeError("MCP 세션 풀이 종료되었습니다.")
+        return self._submit(self._run(fn, current_traceparent()))
+
+    def route_tools(self, owner: MCPWorker) -> List[BaseTool]:
+        """
+        owner 세션의 Tool을 "동시 호출은 쉬는 세션에 분배"하도록 감싸서 반환
+
+        Agent 한 단계에서 Tool 호출 여러 개가 동시에 실행되면(ToolNode는 asyncio.gather로 실행)
+        첫 호출은 owner 세션에서, 나머지는 풀에서 쉬고 있는 세션을 빌려 실행합니다.
+        서버 프로세스가 달라 CPU 작업(pandas, BM25)도 실제로 병렬 처리됩니다.
+        쉬는 세션이 없으면 owner 세션에 함께 요청합니다 (세션 내 요청 다중화).
+        """
+        if self.size == 1 or not ROUTE_TOOL_CALLS:
+            return owner.tools
+
+        return [
+            StructuredTool(
+                name=tool.name,
+                description=tool.description,
+                args_schema=tool.args_schema,
+                coroutine=functools.partial(self._call_routed, owner, tool.name),
+                response_format=tool.response_format,
+                metadata=tool.metadata,
+            )
+            for tool in owner.tools
+        ]
+
+    def status(self) -> List[Dict[str, Any]]:
+        """세션별 상태 (표시/모니터링용)"""
+        now = time.monotonic()
+        return [
+            {
+                "worker_id": worker.worker_id,
+                "alive": worker.alive,
+                "tools": len(worker.tools),
+                "uptime_seconds": round(now - worker.started_at, 1) if worker.started_at else None,
+                "idle_seconds": round(now - worker.last_used, 1) if worker.last_used else None,
+            }
+            for worker in self._workers.values()
+        ]
+
+    def close(self) -> None:
+        """모든 MCP 서버 프로세스 종료 및 백그라운드 루프 정지"""
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self._submit(self._stop_all()).result(STOP_TIMEOUT * 2)
+        except Exception as e:
+            print(f"⚠️ MCP 세션 풀 종료 중 오류: {e!r}")
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _submit(self, coro: Awaitable[T]):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # ============================================
+    # 백그라운드 루프 내부
+    # ============================================
+
+    async def _start_all(self) -> None:
+        self._idle = asyncio.Queue()
+
+        workers = [MCPWorker(self.server_params, worker_id) for worker_id in range(self.size)]
+        try:
+            await asyncio.gather(*(worker.start() for worker in workers))
+        except BaseException:
+            await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+            raise
+
+        for worker in workers:
+            self._workers[worker.worker_id] = worker
+            self._idle.put_nowait(worker)
+
+        print(f"✅ MCP 세션 풀 준비 완료: {self.size}개 세션, Tool {len(workers[0].tools)}개")
+
+    async def _stop_all(self) -> None:
+        await asyncio.gather(*(worker.stop() for worker in self._workers.values()), return_exceptions=True)
+
+    async def _run(self, fn: Callable[[MCPWorker], Awaitable[T]], traceparent: str = "") -> T:
+        with attach(traceparent):
+            return await self._run_attached(fn)
+
+    async def _run_attached(self, fn: Callable[[MCPWorker], Awaitable[T]]) -> T:
+        worker = await self._acquire()
+        try:
+            return await fn(worker)
+        except CONNECTION_ERRORS:
+            # 서버 프로세스/파이프가 끊긴 세션은 종료 → 다음 사용 시 재시작
+            await worker.stop()
+            raise
+        finally:
+            worker.last_used = time.monotonic()
+            self._idle.put_nowait(worker)
+
+    async def _call_routed(self, owner: MCPWorker, name: str, **arguments) -> Any:
+        helper = None
+        if owner.in_flight > 0:
+            try:
+                helper = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+
+        if helper is None:
+            return await owner.call_tool(name, arguments)
+
+        try:
+            if helper.alive:
+                return await helper.call_tool(name, arguments)
+        except CONNECTION_ERRORS:
+            # 빌린 세션이 끊겼으면 종료 (다음 _acquire에서 재시작) 후 owner에서 실행
+            await helper.stop()
+        finally:
+            helper.last_used = time.monotonic()
+            self._idle.put_nowait(helper)
+
+        return await owner.call_tool(name, arguments)
+
+    async def _acquire(self) -> MCPWorker:
+        worker = await self._idle.get()
+
+        try:
+            idle_seconds = time.monotonic() - worker.last_used
+            if not worker.alive or (idle_seconds >= HEALTH_CHECK_INTERVAL and not await worker.ping()):
+                worker = await self._restart(worker)
+        except BaseException:
+            # 재시작 실패: 다음 요청에서 다시 시도하도록 풀에 되돌림
+            self._idle.put_nowait(worker)
+            raise
+
+        return worker
+
+    async def _restart(self, worker: MCPWorker) -> MCPWorker:
+        print(f"🔄 MCP 세션 {worker.worker_id} 재시작")
+        await worker.stop()
+
+        replacement = MCPWorker(self.server_params, worker.worker_id)
+        await replacement.start()
+
+        self._workers[worker.worker_id] = replacement
+        self.restarts += 1
+        return replacement
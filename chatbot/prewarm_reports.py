@@ -0,0 +1,101 @@
+"""
+전략 리포트 캐시 미리 생성 (배치)
+- 많이 조회된 가맹점(ReportCache 요청 기록 기준) 또는 지정한 가맹점의 리포트를 미리 생성
+- 현재 버전 리포트가 이미 있으면 건너뜀 → 월별 데이터/규칙/프롬프트 변경 후 다시 실행하면 변경분만 생성
+- 가맹점마다 analyze_merchant_pattern을 직접 호출하고, Agent(LLM)는 전략 수립 단계부터 실행
+
+사용 예시:
+    python -m chatbot.prewarm_reports --top 50
+    python -m chatbot.prewarm_reports --merchants 761947ABD9 A1B2C3D4E5
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from chatbot.history import MerchantState, compact_history
+from chatbot.prompts import SYSTEM_PROMPT
+from chatbot.runtime import ChatRuntime, create_runtime
+
+DEFAULT_TOP_MERCHANTS = 20
+
+
+def prewarm_merchant(runtime: ChatRuntime, encoded_mct: str) -> str:
+    """
+    가맹점 1곳의 리포트 생성 후 캐시에 저장
+
+    Returns:
+        str: "cached" (이미 있음) | "stored" (새로 저장) | "skipped" (분석 실패/저장 불가)
+    """
+    if runtime.report_cache.get(encoded_mct, runtime.server_info()) is not None:
+        return "cached"
+
+    analyze_args = {"encoded_mct": encoded_mct}
+    analyze_result = runtime.run_tool("analyze_merchant_pattern", analyze_args)
+
+    merchant_state = MerchantState()
+    if not merchant_state.update_from_tool("analyze_merchant_pattern", analyze_result):
+        print(f"⚠️ 패턴 분석 실패: {encoded_mct} → {json.loads(analyze_result).get('message')}")
+        return "skipped"
+
+    tool_call = {"name": "analyze_merchant_pattern", "args": analyze_args, "id": f"prewarm-{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+    messages = compact_history(
+        [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=f"{merchant_state.name} 마케팅 전략 추천해줘")],
+        merchant_state
+    ) + [
+        AIMessage(content="", tool_calls=[tool_call]),
+        ToolMessage(content=analyze_result, name=tool_call["name"], tool_call_id=tool_call["id"]),
+    ]
+
+    report = runtime.run_agent(messages)
+    if not isinstance(report, str) or not runtime.store_report(encoded_mct, report):
+        return "skipped"
+    return "stored"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="가맹점 전략 리포트 캐시 미리 생성")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--top", type=int, default=DEFAULT_TOP_MERCHANTS, help="요청이 많은 가맹점 N곳")
+    target.add_argument("--merchants", nargs="+", metavar="ENCODED_MCT", help="생성할 가맹점 목록")
+    args = parser.parse_args(argv)
+
+    google_api_key = os.environ.get("GOOGLE_API_KEY")
+    if not google_api_key:
+        parser.error("GOOGLE_API_KEY 환경변수를 설정해주세요.")
+
+    runtime = create_runtime(google_api_key)
+    try:
+        if runtime.report_cache is None:
+            parser.error("리포트 캐시가 꺼져 있습니다 (CHAT_REPORT_CACHE=0).")
+
+        merchants = args.merchants or runtime.report_cache.top_merchants(args.top)
+        if not merchants:
+            print("요청 기록이 없습니다. --merchants로 가맹점을 지정해주세요.")
+            return
+
+        print(f"🔥 리포트 미리 생성: {len(merchants)}곳 (버전: {runtime.server_info()})")
+        counts = {"cached": 0, "stored": 0, "skipped": 0}
+        for i, encoded_mct in enumerate(merchants, start=1):
+            started = time.perf_counter()
+            try:
+                outcome = prewarm_merchant(runtime, encoded_mct)
+            except Exception as e:
+                print(f"❌ [{i}/{len(merchants)}] {encoded_mct}: {e}")
+                outcome = "skipped"
+            else:
+                print(f"  [{i}/{len(merchants)}] {encoded_mct}: {outcome} ({time.perf_counter() - started:.1f}초)")
+            counts[outcome] += 1
+
+        print(f"✅ 완료: 새로 생성 {counts['stored']} · 기존 {counts['cached']} · 실패 {counts['skipped']}")
+    finally:
+        runtime.pool.close()
+
+
+if __name__ == "__main__":
+    main()
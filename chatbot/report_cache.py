@@ -0,0 +1,154 @@
+"""
+가맹점 전략 리포트 캐시
+- 가맹점 1곳의 전체 전략 답변(LLM 생성)을 SQLite에 저장해 같은 가맹점 재요청 시 바로 반환
+- 키: (ENCODED_MCT, 데이터 버전, 패턴 규칙 버전, 시스템 프롬프트 해시, 모델)
+  - 월별 데이터/규칙 파일/프롬프트/모델 중 하나라도 바뀌면 키가 달라져 자동 무효화
+  - 서버가 버전을 알려주지 않으면(get_server_info 미지원) 캐시 사용 안 함
+- 가맹점별 요청 횟수를 함께 기록 → prewarm_reports.py가 많이 조회된 가맹점부터 미리 생성
+- 전략 리포트 요청(is_report_request, 번호 선택 빠른 경로)만 조회/저장
+  → "재방문율 추이만 보여줘" 같은 좁은 질문의 답변은 리포트로 저장/반환하지 않음
+
+CHAT_REPORT_CACHE=0이면 사용 안 함
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+REPORT_CACHE_ENABLED = os.environ.get("CHAT_REPORT_CACHE", "1") != "0"
+REPORT_CACHE_PATH = os.environ.get("CHAT_REPORT_CACHE_PATH", "./.cache/reports.sqlite")
+
+# 전략 리포트 요청 표현 ("마케팅 전략 추천해줘", "홍보 방안 알려줘" 등)
+_REPORT_PATTERN = re.compile(r"전략|(?:마케팅|홍보|매출|고객).*(?:추천|방안|제안|어떻게)")
+
+# 일부만 묻는 질문 ("배달 전략만 알려줘", "추이만 보여줘") → 전체 리포트와 답이 다름
+_NARROW_PATTERN = re.compile(r"\S만\s*(?:보여|알려|말해|추천|정리|비교)|추이|비교|몇\s*(?:개|명|%)")
+
+
+def is_report_request(text: str) -> bool:
+    """가맹점 전체 전략 리포트를 요청하는 질문인지 (리포트 캐시 조회/저장 대상)"""
+    text = text or ""
+    return bool(_REPORT_PATTERN.search(text)) and not _NARROW_PATTERN.search(text)
+
+
+class ReportCache:
+    """
+    전략 리포트 캐시 (스레드 안전, Streamlit 세션 간 공유)
+
+    사용 예시:
+        cache = ReportCache(REPORT_CACHE_PATH, prompt_hash(SYSTEM_PROMPT), LLM_MODEL)
+        report = cache.get("ABC123", server_info)
+        if report is None:
+            cache.put("ABC123", server_info, generate_report())
+    """
+
+    def __init__(self, path: str, prompt_hash: str, model: str):
+        self.path = path
+        self.prompt_hash = prompt_hash
+        self.model = model
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                key TEXT PRIMARY KEY,
+                encoded_mct TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                rules_version TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                report TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS reports_by_merchant ON reports (encoded_mct);
+            CREATE TABLE IF NOT EXISTS requests (
+                encoded_mct TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                last_requested_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _versions(self, server_info: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        data_version = server_info.get("data_version")
+        rules_version = server_info.get("rules_version")
+        if not data_version or not rules_version:
+            return None
+        return data_version, rules_version
+
+    def _key(self, encoded_mct: str, versions: Tuple[str, str]) -> str:
+        raw = "\n".join((encoded_mct, *versions, self.prompt_hash, self.model))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, encoded_mct: str, server_info: Dict[str, Any]) -> Optional[str]:
+        """현재 버전의 리포트 반환 (없거나 버전을 모르면 None)"""
+        versions = self._versions(server_info)
+        if versions is None:
+            return None
+
+        key = self._key(encoded_mct, versions)
+        with self._lock:
+            row = self._conn.execute("SELECT report FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE reports SET hits = hits + 1 WHERE key = ?", (key,))
+            self._conn.commit()
+            self.stats["hits"] += 1
+        return row[0]
+
+    def put(self, encoded_mct: str, server_info: Dict[str, Any], report: str) -> bool:
+        """
+        리포트 저장 (같은 가맹점의 이전 버전 리포트는 삭제)
+
+        Returns:
+            bool: 저장 여부 (버전을 모르거나 빈 리포트면 False)
+        """
+        versions = self._versions(server_info)
+        if versions is None or not report.strip():
+            return False
+
+        key = self._key(encoded_mct, versions)
+        with self._lock:
+            self._conn.execute("DELETE FROM reports WHERE encoded_mct = ? AND key != ?", (encoded_mct, key))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reports "
+                "(key, encoded_mct, data_version, rules_version, prompt_hash, model, report, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, encoded_mct, *versions, self.prompt_hash, self.model, report, time.time())
+            )
+            self._conn.commit()
+            self.stats["stores"] += 1
+        return True
+
+    def record_request(self, encoded_mct: str) -> None:
+        """가맹점 리포트 요청 1회 기록 (pre-warm 대상 선정용)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO requests (encoded_mct, count, last_requested_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(encoded_mct) DO UPDATE SET count = count + 1, last_requested_at = excluded.last_requested_at",
+                (encoded_mct, time.time())
+            )
+            self._conn.commit()
+
+    def top_merchants(self, limit: int) -> List[str]:
+        """요청이 많은 가맹점 순으로 ENCODED_MCT 목록"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT encoded_mct FROM requests ORDER BY count DESC, last_requested_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,324 @@
+"""
+챗봇 런타임
+- LLM + MCP 세션 풀 + 세션별 ReAct Agent를 묶어 한 번만 생성
+- Streamlit에서는 st.cache_resource로 감싸 rerun/사용자 간에 공유
+- 대화 메시지는 호출 시 인자로 전달 (백그라운드 스레드에서 st.session_state 접근 금지)
+- stream_agent(): Tool 진행 상황과 응답 토큰을 순서대로 전달 (st.write_stream용)
+- MCP_SERVER_URL 설정 시 서버 프로세스 대신 공유 HTTP MCP 서버에 접속
+- Tool 결과는 ToolResultCache를 거쳐 같은 인자 재호출 시 재사용 (CHAT_TOOL_CACHE=0이면 사용 안 함)
+- 가맹점 전략 리포트는 ReportCache에 데이터/규칙/프롬프트/모델 버전별로 저장 (CHAT_REPORT_CACHE=0이면 사용 안 함)
+"""
+
+import os
+import queue
+import sys
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from mcp import StdioServerParameters
+
+from chatbot.mcp_pool import MCPSessionPool, MCPWorker, ServerParams
+from chatbot.prompts import SYSTEM_PROMPT, prompt_hash
+from chatbot.report_cache import REPORT_CACHE_ENABLED, REPORT_CACHE_PATH, ReportCache
+from chatbot.tool_cache import SERVER_INFO_MAX_AGE, TOOL_CACHE_ENABLED, ToolResultCache
+from observability.tracing import Span, end_span, span, start_span
+
+LLM_MODEL = "gemini-2.5-flash"
+LLM_TEMPERATURE = 0.7
+
+# MCP 서버 실행 명령 (MCP_SERVER_COMMAND로 변경 가능, 예: "python mcp_server.py")
+MCP_SERVER_COMMAND = os.environ.get("MCP_SERVER_COMMAND", "uv run python mcp_server.py")
+
+# 공유 HTTP MCP 서버 주소 (설정 시 서버 프로세스를 직접 띄우지 않고 접속, 예: "http://127.0.0.1:8000/mcp")
+MCP_SERVER_URL = os.environ.get("MCP_SERVER_URL", "")
+
+# MCP 서버 프로세스에 그대로 전달할 환경변수 접두사
+FORWARDED_ENV_PREFIXES = ("RAG_", "FAISS_", "MCP_", "TRACE_")
+
+# Agent 1회 실행 최대 대기 시간 (초)
+AGENT_TIMEOUT = float(os.environ.get("AGENT_TIMEOUT", "300"))
+
+
+@dataclass
+class AgentEvent:
+    """stream_agent() 이벤트"""
+    kind: str  # "tool_start" | "tool_end" | "token" | "done"
+    text: str = ""
+    tool_name: str = ""
+    data: Any = None
+
+
+_STREAM_END = object()
+
+
+def message_text(message: BaseMessage) -> str:
+    """메시지/청크의 텍스트 (content가 part 리스트인 경우 text part만)"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+        if isinstance(part, str) or part.get("type") == "text"
+    )
+
+
+class LLMSpanHandler(BaseCallbackHandler):
+    """LLM 호출마다 span 기록 (첫 토큰 시간, 토큰 사용량 포함)"""
+
+    # async 실행에서도 루프 안에서 바로 호출 → 현재 span(contextvars)을 부모로 사용
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[Any, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        self._spans[run_id] = start_span(
+            "llm.call",
+            model=params.get("model") or params.get("model_name"),
+            messages=sum(len(batch) for batch in messages)
+        )
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        s = self._spans.get(run_id)
+        if s is not None and "first_token_ms" not in s.attributes:
+            s.set(first_token_ms=round((time.perf_counter() - s._started) * 1000, 1))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        s = self._spans.pop(run_id, None)
+        if s is None:
+            return
+        try:
+            usage = response.generations[0][0].message.usage_metadata or {}
+            s.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+        except (AttributeError, IndexError):
+            pass
+        end_span(s)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        s = self._spans.pop(run_id, None)
+        if s is not None:
+            end_span(s, error)
+
+
+class ChatRuntime:
+    """공유 MCP 세션 풀 위에서 Agent를 실행"""
+
+    def __init__(
+        self,
+        llm,
+        pool: MCPSessionPool,
+        tool_cache: Optional[ToolResultCache] = None,
+        report_cache: Optional[ReportCache] = None
+    ):
+        self.llm = llm
+        self.pool = pool
+        self.tool_cache = tool_cache
+        self.report_cache = report_cache
+        # 세션(worker)별 Agent 캐시 (세션 재시작 시 새 Tool로 다시 생성)
+        self._agents: "weakref.WeakKeyDictionary[MCPWorker, tuple]" = weakref.WeakKeyDictionary()
+
+    def _agent_for(self, worker: MCPWorker):
+        return self._tools_and_agent(worker)[1]
+
+    def _tools_and_agent(self, worker: MCPWorker):
+        entry = self._agents.get(worker)
+        if entry is None:
+            from langgraph.prebuilt import create_react_agent
+
+            # 동시 Tool 호출은 풀의 다른 세션에 분배, 그 위에 결과 캐시
+            tools = self.pool.route_tools(worker)
+            if self.tool_cache is not None:
+                tools = self.tool_cache.wrap_tools(worker, tools)
+            entry = (tools, create_react_agent(self.llm, tools))
+            self._agents[worker] = entry
+        return entry
+
+    def run_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        """
+        LLM 없이 Tool 1개 직접 실행 (Agent와 같은 캐시를 거침)
+
+        Returns:
+            str: Tool 결과 텍스트 (ToolMessage content와 동일)
+        """
+        async def invoke(worker: MCPWorker) -> str:
+            tools, _ = self._tools_and_agent(worker)
+            tool = next(tool for tool in tools if tool.name == name)
+            with span(f"tool.{name}", worker_id=worker.worker_id):
+                return await tool.ainvoke(arguments)
+
+        return self.pool.run(invoke, timeout=AGENT_TIMEOUT)
+
+    def server_info(self) -> Dict[str, Any]:
+        """서버 데이터/규칙/RAG 버전 (get_server_info, 최대 SERVER_INFO_MAX_AGE초 전 조회 결과)"""
+        async def refresh(worker: MCPWorker) -> Dict[str, Any]:
+            return await worker.refresh_server_info(SERVER_INFO_MAX_AGE)
+
+        return self.pool.run(refresh, timeout=AGENT_TIMEOUT)
+
+    def cached_report(self, encoded_mct: str) -> Optional[str]:
+        """
+        현재 버전의 가맹점 전략 리포트 (요청 횟수도 함께 기록)
+
+        Returns:
+            str: 캐시된 리포트
+            None: 캐시 미사용/없음 (Agent로 새로 생성)
+        """
+        if self.report_cache is None or not encoded_mct:
+            return None
+        self.report_cache.record_request(encoded_mct)
+        with span("report_cache.get", encoded_mct=encoded_mct) as cache_span:
+            report = self.report_cache.get(encoded_mct, self.server_info())
+            cache_span.set(hit=report is not None)
+        if report is not None:
+            print(f"♻️ 전략 리포트 캐시 사용: {encoded_mct}")
+        return report
+
+    def store_report(self, encoded_mct: str, report: str) -> bool:
+        """Agent가 생성한 가맹점 전략 리포트 저장"""
+        if self.report_cache is None or not encoded_mct:
+            return False
+        stored = self.report_cache.put(encoded_mct, self.server_info(), report)
+        if stored:
+            print(f"💾 전략 리포트 캐시 저장: {encoded_mct}")
+        return stored
+
+    def run_agent(self, messages: List[BaseMessage]) -> str:
+        """
+        대화 메시지로 Agent 실행 후 마지막 AI 응답 반환
+
+        Args:
+            messages: SystemMessage를 포함한 전체 대화 (호출 스레드에서 복사해 전달)
+        """
+        async def invoke(worker: MCPWorker) -> str:
+            with span("agent.run", worker_id=worker.worker_id, messages=len(messages)):
+                agent_response = await self._agent_for(worker).ainvoke(
+                    {"messages": messages},
+                    config={"callbacks": [LLMSpanHandler()]}
+                )
+
+            print("✅ Agent 실행 완료")
+            print("Agent Response = ", agent_response)
+
+            return agent_response["messages"][-1].content
+
+        return self.pool.run(invoke, timeout=AGENT_TIMEOUT)
+
+    def stream_agent(self, messages: List[BaseMessage]) -> Iterator[AgentEvent]:
+        """
+        Agent 실행을 스트리밍 (호출 스레드에서 순회하는 sync generator)
+
+        백그라운드 루프에서 agent.astream(stream_mode=["messages", "updates"])을 실행하고
+        이벤트를 thread-safe queue로 넘겨 받습니다.
+
+        Yields:
+            AgentEvent
+            - "tool_start": Agent가 Tool 호출 결정 (tool_name, data=args)
+            - "tool_end": Tool 실행 완료 (tool_name, data=결과 텍스트)
+            - "token": LLM 텍스트 토큰 (text)
+            - "done": 실행 완료 (text=최종 응답, data=지표: ttft_seconds, total_seconds, tool_calls)
+        """
+        events: "queue.Queue" = queue.Queue()
+        started = time.perf_counter()
+
+        async def stream(worker: MCPWorker) -> None:
+            agent = self._agent_for(worker)
+            final_text = ""
+            first_token_at = None
+            tool_calls = 0
+
+            with span("agent.stream", worker_id=worker.worker_id, messages=len(messages)) as agent_span:
+                async for mode, data in agent.astream(
+                    {"messages": messages},
+                    stream_mode=["messages", "updates"],
+                    config={"callbacks": [LLMSpanHandler()]}
+                ):
+                    if mode == "messages":
+                        chunk, metadata = data
+                        text = message_text(chunk)
+                        if isinstance(chunk, AIMessageChunk) and text:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                            events.put(AgentEvent("token", text=text))
+                        continue
+
+                    for node, update in data.items():
+                        for message in (update or {}).get("messages", []):
+                            if isinstance(message, AIMessage) and message.tool_calls:
+                                for tool_call in message.tool_calls:
+                                    tool_calls += 1
+                                    events.put(AgentEvent("tool_start", tool_name=tool_call["name"], data=tool_call["args"]))
+                            elif isinstance(message, AIMessage):
+                                final_text = message_text(message)
+                            elif isinstance(message, ToolMessage):
+                                events.put(AgentEvent("tool_end", tool_name=message.name or "", data=message_text(message)))
+
+                metrics = {
+                    "ttft_seconds": round(first_token_at - started, 3) if first_token_at else None,
+                    "total_seconds": round(time.perf_counter() - started, 3),
+                    "tool_calls": tool_calls,
+                }
+                agent_span.set(**metrics)
+
+            print(f"✅ Agent 스트리밍 완료: {metrics}")
+            events.put(AgentEvent("done", text=final_text, data=metrics))
+
+        future = self.pool.submit(stream)
+        future.add_done_callback(lambda f: events.put(_STREAM_END))
+
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=AGENT_TIMEOUT)
+                except queue.Empty:
+                    raise TimeoutError(f"Agent 응답이 {AGENT_TIMEOUT:.0f}초 동안 없습니다.")
+                if event is _STREAM_END:
+                    break
+                yield event
+
+            # 실행 중 예외가 있으면 호출 스레드에서 다시 발생
+            future.result()
+        finally:
+            # 소비자가 중간에 멈추면(Streamlit rerun 등) 백그라운드 실행도 취소
+            future.cancel()
+
+
+def build_server_params(google_api_key: str, command: Optional[str] = None) -> ServerParams:
+    """MCP 서버 접속 정보 (MCP_SERVER_URL이 있으면 URL, 없으면 서버 프로세스 실행 파라미터)"""
+    if MCP_SERVER_URL and command is None:
+        return MCP_SERVER_URL
+
+    executable, *args = (command or MCP_SERVER_COMMAND).split()
+    if executable == "python":
+        executable = sys.executable
+
+    env = {"GOOGLE_API_KEY": google_api_key}
+    env.update({
+        key: value
+        for key, value in os.environ.items()
+        if key.startswith(FORWARDED_ENV_PREFIXES)
+    })
+
+    return StdioServerParameters(command=executable, args=args, env=env)
+
+
+def create_runtime(google_api_key: str) -> ChatRuntime:
+    """LLM과 MCP 세션 풀을 생성 (MCP 서버 프로세스 시작 + 데이터 로드 + Tool 로드 1회)"""
+    # Gemini/LangGraph는 import가 무거워(1초 이상) 실제로 만들 때 import → 화면 첫 표시 지연 방지
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    llm = ChatGoogleGenerativeAI(
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        api_key=google_api_key
+    )
+
+    pool = MCPSessionPool(build_server_params(google_api_key))
+    tool_cache = ToolResultCache() if TOOL_CACHE_ENABLED else None
+    report_cache = ReportCache(REPORT_CACHE_PATH, prompt_hash(SYSTEM_PROMPT), LLM_MODEL) if REPORT_CACHE_ENABLED else None
+    return ChatRuntime(llm, pool, tool_cache, report_cache)
@@ -0,0 +1,105 @@
+"""
+가맹점 번호 선택 빠른 경로
+- search_merchant 결과가 여러 개일 때 사용자가 "2번", "두 번째" 등으로 답하면
+  LLM을 거치지 않고 select_merchant → analyze_merchant_pattern을 직접 호출
+- Tool 호출/결과는 AIMessage(tool_calls) + ToolMessage로 대화에 넣어
+  Agent(LLM)는 전략 수립 단계부터 시작
+"""
+
+import json
+import re
+import uuid
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from chatbot.history import MerchantState
+from chatbot.runtime import ChatRuntime
+
+# 번호/서수 뒤에 올 수 있는 표현 ("2번 가맹점으로 할게요", "두 번째 분석해줘" 등)
+_SELECTION_SUFFIX = (
+    r"\s*(?:가맹점|가게|매장)?"
+    r"\s*(?:이요|요|이에요|입니다|으로|로)?"
+    r"\s*(?:선택|분석)?\s*(?:할게요|해\s*주세요|해줘|해요)?"
+    r"\s*[.!~]*\s*$"
+)
+_NUMBER_PATTERN = re.compile(r"^\s*(\d{1,3})\s*(?:번째|번)?" + _SELECTION_SUFFIX)
+_ORDINAL_PATTERN = re.compile(r"^\s*(첫|두|세|네|다섯|여섯|일곱|여덟|아홉|열)\s*(?:번째|째)" + _SELECTION_SUFFIX)
+
+_ORDINALS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+
+
+def parse_selection(text: str) -> Optional[int]:
+    """
+    번호 선택 답변이면 번호(1부터) 반환, 아니면 None
+
+    Examples:
+        parse_selection("2번")  # 2
+        parse_selection("3번 가맹점으로 할게요")  # 3
+        parse_selection("두 번째요")  # 2
+        parse_selection("2번 가맹점 매출이 왜 줄었어?")  # None (LLM 처리)
+    """
+    match = _NUMBER_PATTERN.match(text)
+    if match:
+        return int(match.group(1))
+
+    match = _ORDINAL_PATTERN.match(text)
+    if match:
+        return _ORDINALS[match.group(1)]
+
+    return None
+
+
+def select_candidate(runtime: ChatRuntime, merchant_state: MerchantState, text: str) -> Optional[List[BaseMessage]]:
+    """
+    번호 선택 답변을 Tool 직접 호출로 처리
+
+    Args:
+        runtime: 공유 챗봇 런타임
+        merchant_state: 현재 가맹점 상태 (후보 목록 포함, Tool 결과로 갱신됨)
+        text: 사용자 입력
+
+    Returns:
+        List[BaseMessage]: 현재 질문 뒤에 붙일 [AIMessage(tool_calls), ToolMessage...]
+        None: 빠른 경로를 쓸 수 없음 (후보 없음, 번호 범위 밖, 선택 결과 불일치 → LLM 처리)
+    """
+    if not merchant_state.candidates:
+        return None
+
+    index = parse_selection(text)
+    candidate = merchant_state.candidate(index) if index is not None else None
+    if candidate is None:
+        return None
+
+    select_args = {"index": index, "merchant_name": merchant_state.candidate_query, **merchant_state.candidate_filters}
+    select_result = runtime.run_tool("select_merchant", select_args)
+
+    # 검색 이후 데이터가 바뀌었다면 순번이 다를 수 있음
+    selected = json.loads(select_result)
+    if not selected.get("found") or selected["data"].get("encoded_mct") != candidate.get("encoded_mct"):
+        print(f"⚠️ 번호 선택 빠른 경로 사용 불가: {index}번 → {selected.get('message')}")
+        return None
+
+    analyze_args = {"encoded_mct": candidate["encoded_mct"]}
+    analyze_result = runtime.run_tool("analyze_merchant_pattern", analyze_args)
+
+    calls = [
+        ("select_merchant", select_args, select_result),
+        ("analyze_merchant_pattern", analyze_args, analyze_result),
+    ]
+    for name, _, result in calls:
+        merchant_state.update_from_tool(name, result)
+
+    tool_calls = [
+        {"name": name, "args": args, "id": f"fast-{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+        for name, args, _ in calls
+    ]
+    print(f"⚡ 번호 선택 빠른 경로: {index}번 → {candidate['encoded_mct']}")
+
+    return [
+        AIMessage(content="", tool_calls=tool_calls),
+        *(
+            ToolMessage(content=result, name=name, tool_call_id=tool_call["id"])
+            for (name, _, result), tool_call in zip(calls, tool_calls)
+        ),
+    ]
@@ -0,0 +1,156 @@
+"""
+MCP Tool 결과 캐시 (클라이언트)
+- 같은 Tool을 같은 인자로 다시 호출하면 stdio 왕복/서버 재계산 없이 캐시 결과 반환
+- 키: (Tool 이름, 인자 JSON, 버전)
+  - 서버가 get_server_info로 데이터 버전을 알려주면 버전 기준으로 전역 공유 (세션 재시작 후에도 유효)
+  - 버전을 모르면 MCP 세션 단위로만 사용 (세션 재시작 시 무효)
+- Tool별 정책 (캐시 여부, 버전 종류, 만료 시간), 최대 개수 초과 시 LRU
+- 오류 결과는 캐시하지 않음
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from chatbot.mcp_pool import MCPWorker
+
+TOOL_CACHE_ENABLED = os.environ.get("CHAT_TOOL_CACHE", "1") != "0"
+TOOL_CACHE_MAX_ENTRIES = int(os.environ.get("CHAT_TOOL_CACHE_SIZE", "256"))
+
+# 서버 버전 재조회 간격 (초, RAG 인덱스 교체 반영용)
+SERVER_INFO_MAX_AGE = 30.0
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """Tool별 캐시 정책"""
+    version_keys: Tuple[str, ...]  # 결과가 의존하는 server_info 키: "data_version" | "rules_version" | "rag_version"
+    ttl_seconds: float
+
+
+# 결과가 인자와 데이터 버전에만 의존하는 Tool만 캐시 (목록에 없는 Tool은 캐시 안 함)
+TOOL_CACHE_POLICIES: Dict[str, ToolCachePolicy] = {
+    "search_merchant": ToolCachePolicy(("data_version",), 3600),
+    "select_merchant": ToolCachePolicy(("data_version",), 3600),
+    "analyze_merchant_pattern": ToolCachePolicy(("data_version", "rules_version"), 3600),
+    "analyze_merchant_patterns_batch": ToolCachePolicy(("data_version", "rules_version"), 3600),
+    "get_merchant_timeseries": ToolCachePolicy(("data_version",), 3600),
+    "search_merchant_knowledge": ToolCachePolicy(("rag_version",), 600),
+    "search_merchant_knowledge_batch": ToolCachePolicy(("rag_version",), 600),
+}
+
+
+def _is_error_result(content: Any) -> bool:
+    """캐시하면 안 되는 결과 (데이터 미로드, 검색 오류 등)"""
+    try:
+        result = json.loads(content) if isinstance(content, str) else None
+    except ValueError:
+        return False
+    return isinstance(result, dict) and (result.get("result_type") == "error" or "error" in result)
+
+
+class ToolResultCache:
+    """
+    Tool 결과 캐시 (스레드 안전, 여러 MCP 세션이 공유)
+
+    사용 예시:
+        cache = ToolResultCache()
+        agent = create_react_agent(llm, cache.wrap_tools(worker))
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, ToolCachePolicy]] = None,
+        max_entries: int = TOOL_CACHE_MAX_ENTRIES
+    ):
+        self.policies = TOOL_CACHE_POLICIES if policies is None else policies
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key → (만료 시각, 결과)
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def wrap_tools(self, worker: MCPWorker, tools: Optional[List[BaseTool]] = None) -> List[BaseTool]:
+        """
+        Tool 목록을 캐시를 거치는 Tool로 감싸서 반환 (정책 없는 Tool은 그대로)
+
+        Args:
+            worker: 버전 조회에 사용할 세션
+            tools: 감쌀 Tool 목록 (None이면 worker.tools)
+        """
+        return [
+            self._wrap(tool, worker, self.policies[tool.name]) if tool.name in self.policies else tool
+            for tool in (worker.tools if tools is None else tools)
+        ]
+
+    def _wrap(self, tool: StructuredTool, worker: MCPWorker, policy: ToolCachePolicy) -> StructuredTool:
+        async def cached_call(**arguments):
+            key = (
+                tool.name,
+                json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str),
+                await self._version(worker, policy)
+            )
+
+            cached = self.get(key)
+            if cached is not None:
+                print(f"♻️ Tool 캐시 사용: {tool.name}")
+                return cached
+
+            result = await tool.coroutine(**arguments)
+            content, _ = result
+            if not _is_error_result(content):
+                self.put(key, result, policy.ttl_seconds)
+            return result
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=cached_call,
+            response_format=tool.response_format,
+            metadata=tool.metadata,
+        )
+
+    async def _version(self, worker: MCPWorker, policy: ToolCachePolicy) -> str:
+        server_info = await worker.refresh_server_info(SERVER_INFO_MAX_AGE)
+        versions = [server_info.get(key) for key in policy.version_keys]
+        if all(versions):
+            return "|".join(f"{key}:{version}" for key, version in zip(policy.version_keys, versions))
+        # 버전을 알 수 없으면 현재 MCP 세션에서만 사용
+        return f"session:{worker.worker_id}:{worker.started_at}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
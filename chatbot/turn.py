@@ -0,0 +1,140 @@
+"""
+사용자 턴 처리 (Streamlit UI와 부하 테스트가 공유)
+- 번호 선택 빠른 경로 → 히스토리 압축 → Agent 스트리밍 → 전략 리포트 캐시 조회/저장
+- UI 의존성 없음: 진행 상황은 status(st.status와 같은 write/update 메서드)로 전달
+"""
+
+import time
+from typing import Any, Dict, Iterator, List
+
+from langchain_core.messages import BaseMessage
+
+from chatbot.history import MerchantState, compact_history, estimate_message_tokens
+from chatbot.report_cache import is_report_request
+from chatbot.runtime import ChatRuntime
+from chatbot.selection import select_candidate
+from observability.tracing import span
+
+# Tool 진행 상황 표시용 이름
+TOOL_LABELS = {
+    "search_merchant": "가맹점 검색",
+    "select_merchant": "가맹점 선택",
+    "analyze_merchant_pattern": "가맹점 패턴 분석",
+    "analyze_merchant_patterns_batch": "가맹점 패턴 일괄 분석",
+    "get_merchant_timeseries": "월별 추이 조회",
+    "search_merchant_knowledge": "마케팅 사례 검색",
+    "search_merchant_knowledge_batch": "마케팅 사례 일괄 검색",
+}
+
+
+class NullStatus:
+    """진행 상황을 표시하지 않는 status (부하 테스트/배치용)"""
+
+    def write(self, *args, **kwargs) -> None:
+        pass
+
+    def update(self, **kwargs) -> None:
+        pass
+
+
+def process_turn(
+    runtime: ChatRuntime,
+    merchant_state: MerchantState,
+    messages: List[BaseMessage],
+    status: Any,
+    result: Dict[str, Any]
+) -> Iterator[str]:
+    """
+    사용자 입력 1턴을 처리하는 generator
+    공유 MCP 세션 풀의 세션 하나를 빌려 Agent를 스트리밍 실행
+    대화 히스토리는 토큰 예산에 맞춰 압축해서 전달 (오래된 턴은 요약)
+    후보 번호 선택 답변("2번")은 select/analyze Tool을 직접 호출하고 LLM은 전략 수립부터 실행
+    전략 리포트 요청(번호 선택 빠른 경로 또는 "전략 추천" 질문)에서 가맹점 1곳의 패턴 분석이 끝난 시점에
+    같은 버전의 전략 리포트가 캐시에 있으면 Agent를 멈추고 캐시 반환 (다른 질문은 캐시 조회/저장 안 함)
+    Agent가 이미 토큰을 스트리밍한 뒤라면 화면과 저장되는 답변이 같도록 캐시를 쓰지 않고 끝까지 생성
+
+    Args:
+        runtime: 공유 챗봇 런타임
+        merchant_state: 대화별 가맹점 상태 (Tool 결과로 갱신됨)
+        messages: SystemMessage를 포함한 전체 대화 (마지막은 현재 사용자 질문)
+        status: 진행 상황 표시 (write(text), update(label=...))
+        result: 최종 응답/지표(첫 토큰 시간 등)를 저장할 dict
+
+    Yields:
+        str: 응답 토큰 (도착하는 대로)
+    """
+    print("\n" + "=" * 60)
+    print("🤖 Agent 실행 중...")
+    print("=" * 60)
+
+    started = time.perf_counter()
+
+    def serve_cached(report, tool_calls):
+        elapsed = round(time.perf_counter() - started, 3)
+        status.write("♻️ 저장된 전략 리포트 사용")
+        result["reply"] = report
+        result["report_cache_hit"] = True
+        result["metrics"] = {"ttft_seconds": elapsed, "total_seconds": elapsed, "tool_calls": tool_calls}
+
+    # 요청 전체를 하나의 trace로 기록 (MCP Tool/RAG 구간은 서버에서 자식 span으로 기록)
+    with span("ui.turn", query=messages[-1].content[:100]) as turn_span:
+        result["trace_id"] = turn_span.trace_id
+
+        # 이번 턴에서 패턴 분석한 가맹점 (1곳일 때만 리포트 캐시 조회/저장)
+        analyzed = set()
+
+        # 번호 선택 빠른 경로 (LLM 왕복 없이 Tool 직접 호출)
+        fast_path = select_candidate(runtime, merchant_state, messages[-1].content)
+        report_intent = bool(fast_path) or is_report_request(messages[-1].content)
+        if fast_path:
+            status.write(f"⚡ {merchant_state.name} 선택 및 패턴 분석 완료")
+            result["fast_path"] = True
+            analyzed.add(merchant_state.encoded_mct)
+
+            report = runtime.cached_report(merchant_state.encoded_mct)
+            if report is not None:
+                serve_cached(report, len(fast_path[0].tool_calls))
+                yield report
+                return
+
+        agent_messages = compact_history(messages, merchant_state) + (fast_path or [])
+        result["history_tokens"] = estimate_message_tokens(agent_messages)
+
+        events = runtime.stream_agent(agent_messages)
+        tool_calls = 0
+        # 이미 화면에 토큰을 보냈으면 캐시 리포트로 바꾸지 않음 (화면과 저장되는 답변이 달라지므로)
+        streamed = False
+        for event in events:
+            if event.kind == "tool_start":
+                tool_calls += 1
+                label = TOOL_LABELS.get(event.tool_name, event.tool_name)
+                status.update(label=f"🔧 {label} 중...")
+                status.write(f"🔧 {label} (`{event.tool_name}`)")
+                if event.tool_name == "analyze_merchant_pattern":
+                    analyzed.add((event.data or {}).get("encoded_mct"))
+            elif event.kind == "tool_end":
+                status.write(f"✅ {TOOL_LABELS.get(event.tool_name, event.tool_name)} 완료")
+                merchant_state.update_from_tool(event.tool_name, event.data)
+
+                if (
+                    report_intent
+                    and not streamed
+                    and event.tool_name == "analyze_merchant_pattern"
+                    and analyzed == {merchant_state.encoded_mct}
+                ):
+                    report = runtime.cached_report(merchant_state.encoded_mct)
+                    if report is not None:
+                        # 남은 Tool 호출/LLM 생성은 취소
+                        events.close()
+                        serve_cached(report, tool_calls)
+                        yield report
+                        return
+            elif event.kind == "token":
+                streamed = streamed or bool(event.text)
+                yield event.text
+            elif event.kind == "done":
+                result["reply"] = event.text
+                result["metrics"] = event.data
+
+        if report_intent and analyzed == {merchant_state.encoded_mct} and result.get("reply"):
+            runtime.store_report(merchant_state.encoded_mct, result["reply"])
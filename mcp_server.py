@@ -4,19 +4,40 @@ MCP Server for Merchant Marketing Analysis
 - Tool 2: select_merchant - 여러 검색 결과 중 특정 가맹점 선택
 - Tool 3: search_merchant_knowledge - RAG 기반 마케팅 근거 검색
 - Tool 4: analyze_merchant_pattern - 패턴 분석 (전략 제공 안 함)
+- Tool 5: search_merchant_knowledge_batch - 여러 전략의 RAG 근거 일괄 검색
+- Tool 6: get_server_info - 데이터/RAG 인덱스 버전 (클라이언트 캐시 무효화용)
+- Tool 7: get_merchant_timeseries - 가맹점 월별 매출/고객 추이 (컬럼형 압축 응답)
+- Tool 8: server_stats - Tool 호출 수/지연시간/오류, 데이터 행 수, 메모리 (모니터링용)
+- Tool 9: analyze_merchant_patterns_batch - 여러 가맹점 패턴 일괄 분석 (프로세스 풀에 분산)
 """
+import os
 import sys
-import pandas as pd
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import inspect
 import json
+import math
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
 from fastmcp.server import FastMCP
 
+from observability.metrics import METRICS_FILE, METRICS_FILE_INTERVAL, MetricsRegistry, process_rss_bytes
+from observability.startup import StartupReport, process_uptime
+from observability.tracing import TRACE_CONTEXT_ARG, attach, current_traceparent, set_service_name, traced, span
+
 # ============================================
 # 전역 변수 및 경로 설정
 # ============================================
 
-DATA_DIR = Path("./data")
+# 데이터 디렉토리 (MCP_DATA_DIR로 변경 가능, 예: 부하 테스트용 합성 데이터)
+DATA_DIR = Path(os.environ.get("MCP_DATA_DIR", "./data"))
 PATTERN_RULES_PATH = DATA_DIR / "pattern_rules_declclose_v6.json"
 
 # CSV 파일 경로
@@ -24,12 +45,100 @@ SET1_PATH = DATA_DIR / "big_data_set1_f.csv"
 SET2_PATH = DATA_DIR / "big_data_set2_f.csv"
 SET3_PATH = DATA_DIR / "big_data_set3_f.csv"
 
-# 전역 DataFrame
-DF_SET1: Optional[pd.DataFrame] = None
-DF_SET2: Optional[pd.DataFrame] = None
-DF_SET3: Optional[pd.DataFrame] = None
+# 전역 DataFrame (pandas는 load_all_data에서 import → 서버 시작 시간 단축)
+DF_SET1: Optional["pd.DataFrame"] = None
+DF_SET2: Optional["pd.DataFrame"] = None
+DF_SET3: Optional["pd.DataFrame"] = None
 PATTERN_RULES: Optional[List[Dict]] = None
 
+# 가맹점별 최근 월별 데이터 월 (ENCODED_MCT → TA_YM, 검색 결과 정렬용, load_all_data에서 설정)
+LATEST_TA_YM: Optional["pd.Series"] = None
+
+# 로드한 데이터/패턴 규칙 파일 버전 (파일 수정 시각·크기 기반, load_all_data에서 설정)
+DATA_VERSION: str = ""
+RULES_VERSION: str = ""
+
+# 데이터 로드 시각, 로드한 데이터 파일의 최신 수정 시각 (epoch 초, 데이터 나이 지표용)
+DATA_LOADED_AT: float = 0.0
+DATA_MODIFIED_AT: float = 0.0
+
+# RAG 응답 모드: compact(기본값, tips만) | full(tips + 표시용 context 문자열)
+RAG_RESPONSE_MODE = os.environ.get("RAG_RESPONSE_MODE", "compact")
+
+# 가맹점 Tool 응답 모드: compact(기본값, NaN 제외 + float 반올림 + 월별 데이터는 컬럼형) | full(원본 그대로)
+# Tool 호출 시 response_format 인자로 호출별 선택 가능
+RESPONSE_MODES = ("compact", "full")
+MERCHANT_RESPONSE_MODE = os.environ.get("MERCHANT_RESPONSE_MODE", "compact")
+COMPACT_FLOAT_DIGITS = int(os.environ.get("MERCHANT_FLOAT_DIGITS", "2"))
+
+# get_merchant_timeseries 기본 조회 개월 수 (최근 N개월)
+DEFAULT_TIMESERIES_MONTHS = 6
+
+# search_merchant 여러 개 검색 시 한 번에 반환할 후보 수 (기본값/최대값), 지역/업종 facet 값 개수
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 30
+MAX_FACET_VALUES = 8
+
+# 시작 모드 (MCP_STARTUP 또는 --startup)
+# - background (기본값): 요청을 먼저 받기 시작하고 데이터 로드는 백그라운드 (데이터 Tool은 로드 완료까지 대기)
+# - eager: 데이터를 모두 로드한 뒤 요청을 받음
+# 두 모드 모두 RAG 스택(import, FAISS/BM25 인덱스, 임베딩 클라이언트)은 백그라운드에서 미리 준비
+STARTUP_MODES = ("background", "eager")
+MCP_STARTUP = os.environ.get("MCP_STARTUP", "background")
+RAG_PREWARM = os.environ.get("MCP_RAG_PREWARM", "1") != "0"
+
+# CPU 작업(pandas 조회, 패턴 규칙 매칭)을 실행할 프로세스 풀 (MCP_PROCESS_WORKERS 또는 --process-workers)
+# - auto (기본값): CPU 코어 수 (HTTP 모드는 코어 수 / HTTP 워커 수)
+# - 0: 풀 없이 스레드에서 실행 / N: 워커 N개
+# 워커는 데이터 로드 후 fork → 읽기 전용 DataFrame/패턴 규칙을 copy-on-write로 공유 (워커가 2개 미만이면 풀 없음)
+PROCESS_WORKERS = os.environ.get("MCP_PROCESS_WORKERS", "auto")
+
+# 요청별 제한 시간 (초, 0이면 제한 없음, 초과 시 오류 응답)
+TOOL_TIMEOUT = float(os.environ.get("MCP_TOOL_TIMEOUT", "30"))
+BATCH_TOOL_TIMEOUT = float(os.environ.get("MCP_BATCH_TOOL_TIMEOUT", "120"))
+
+# 데이터 로드 대기 제한 시간 (초, 0이면 제한 없음, 초과 시 "데이터가 로드되지 않았습니다" 응답)
+# 대기 시간은 MCP_TOOL_TIMEOUT에 포함하지 않음
+DATA_WAIT_TIMEOUT = float(os.environ.get("MCP_DATA_WAIT_TIMEOUT", "120"))
+
+# 프로세스 풀에서 실행할 함수 (이름 → 함수, 워커에는 이름과 인자만 전달)
+PROCESS_TASKS: Dict[str, Callable] = {}
+
+# start_process_pool에서 설정 (None이면 스레드에서 실행)
+PROCESS_POOL: Optional[concurrent.futures.ProcessPoolExecutor] = None
+PROCESS_POOL_WORKERS = 0
+_PROCESS_POOL_LOCK = threading.Lock()
+
+# 프로세스 풀 fork 완료 여부 (풀을 만들지 않으면 처음부터 set)
+# RAG 스택(임베딩 gRPC 클라이언트, 검색 스레드)은 fork 뒤에만 초기화 → 자식이 잠긴 lock을 물려받지 않음
+PROCESS_POOL_FORKED = threading.Event()
+PROCESS_POOL_FORKED.set()
+_STDIN_DETACH_REGISTERED = False
+
+# load_all_data 완료 여부 (실패해도 set → 데이터 Tool은 "데이터 없음" 응답)
+DATA_READY = threading.Event()
+
+# 시작 단계별 경과 시간 (프로세스 시작 기준, get_server_info의 startup으로 확인)
+STARTUP = StartupReport()
+
+# 런타임 지표 (server_stats Tool, HTTP /metrics, MCP_METRICS_FILE)
+METRICS = MetricsRegistry()
+METRICS.counter("mcp_tool_calls_total", "Tool 호출 수 (status: ok | error | exception)")
+METRICS.histogram("mcp_tool_latency_seconds", "Tool 실행 시간 (초, 데이터 로드 대기 포함)")
+METRICS.gauge("mcp_tool_in_flight", "실행 중인 Tool 호출 수")
+METRICS.counter("mcp_rag_errors_total", "RAG 검색 실패 수 (Tool은 빈 결과 + error로 응답)")
+METRICS.gauge("mcp_dataset_rows", "로드한 데이터 행 수")
+METRICS.gauge("mcp_dataset_memory_bytes", "로드한 DataFrame 메모리 (object 컬럼은 참조 크기만)")
+METRICS.gauge("mcp_data_age_seconds", "로드한 데이터 파일의 마지막 수정 후 경과 시간 (초)")
+METRICS.gauge("mcp_data_loaded_timestamp_seconds", "데이터 로드 시각 (epoch 초)")
+METRICS.gauge("mcp_cache_entries", "캐시 항목 수")
+METRICS.counter("mcp_cache_events_total", "캐시 적중/미적중/제거 수")
+METRICS.gauge("mcp_process_resident_memory_bytes", "프로세스 RSS (바이트)")
+METRICS.gauge("mcp_uptime_seconds", "프로세스 시작 후 경과 시간 (초)")
+METRICS.gauge("mcp_process_pool_workers", "CPU 작업 프로세스 풀 워커 수 (0이면 스레드에서 실행)")
+METRICS.counter("mcp_tool_timeouts_total", "제한 시간 초과로 오류 응답한 요청 수")
+METRICS.counter("mcp_process_pool_broken_total", "워커 비정상 종료로 프로세스 풀을 닫은 횟수 (이후 스레드에서 실행)")
+
 # MCP 서버 초기화
 mcp = FastMCP(
     "MerchantMarketingAnalysis",
@@ -41,7 +150,7 @@ mcp = FastMCP(
     ### 1. search_merchant
     가맹점명으로 가맹점 검색 (부분 일치 지원)
     - 1개 검색: 즉시 가맹점 정보 반환
-    - 여러 개 검색: select_merchant로 선택 필요
+    - 여러 개 검색: 관련도 순으로 최대 limit개 + 지역/업종 facets, select_merchant로 선택 필요
 
     ### 2. select_merchant
     여러 검색 결과 중 특정 가맹점 선택
@@ -54,14 +163,32 @@ mcp = FastMCP(
     - 패턴 데이터만 제공 (전략은 LLM이 직접 수립)
 
     ### 4. search_merchant_knowledge
-    RAG 기반 마케팅 사례 검색 (유사도 0.7 이상)
+    RAG 기반 마케팅 사례 검색 (유사도 0.7 이상 + 키워드 BM25로 재정렬)
     - LLM이 수립한 전략과 유사한 실제 사례 검색
     - 유사한 내용이 없으면 빈 결과 반환
 
+    ### 5. search_merchant_knowledge_batch
+    여러 전략/컨셉의 마케팅 사례를 한 번에 검색
+    - 쿼리 리스트를 받아 1회 임베딩 + 1회 검색
+    - 여러 쿼리에 중복된 팁은 한 번만 반환 (tip_id로 참조)
+
+    ### 6. get_server_info
+    데이터/RAG 인덱스 버전 조회 (클라이언트 Tool 결과 캐시용, 분석에는 사용하지 않음)
+
+    ### 7. get_merchant_timeseries
+    가맹점 월별 매출/고객 추이 조회 (필요한 컬럼과 최근 N개월만)
+    - 추이 근거가 필요할 때만 호출 (최신 값은 search_merchant/select_merchant의 latest_data 사용)
+    - compact 응답: {"columns": [...], "values": [[컬럼별 월 값], ...]}
+
+    ### 8. analyze_merchant_patterns_batch
+    여러 가맹점 패턴 일괄 분석 (포트폴리오/여러 지점 비교용, 최대 200곳)
+    - 패턴 유형별 집계(summary) + 가맹점별 analyze_merchant_pattern 결과
+
     ## Tool 관계
-    - analyze_merchant_pattern 호출 전 반드시 search_merchant 또는 select_merchant 실행 필요
+    - analyze_merchant_pattern, get_merchant_timeseries 호출 전 반드시 search_merchant 또는 select_merchant 실행 필요
     - encoded_mct는 search_merchant 결과에서 추출
-    - select_merchant: index(번호)와 merchant_name(검색어) 필수
+    - select_merchant: index(번호)와 merchant_name(검색어) 필수, 검색 시 사용한 location/business_type도 그대로 전달
+    - 검색 결과가 많으면(count > data 개수) facets로 지역/업종을 좁히거나 next_cursor로 다음 페이지 조회
 
     ## 데이터 소스
     - SET1: 가맹점 기본 정보
@@ -73,16 +200,221 @@ mcp = FastMCP(
 )
 
 
+set_service_name("mcp-server")
+
+
 def debug_log(msg):
     print(msg, file=sys.stderr, flush=True)
 
+
+def run_in_thread(func):
+    """
+    sync Tool 함수를 async Tool로 변환 (pandas 조회 등 CPU 작업을 스레드에서 실행)
+
+    이벤트 루프를 블로킹하지 않으므로 다른 Tool 호출과 동시에 처리됩니다.
+    functools.wraps로 시그니처/docstring을 유지해 Tool 스키마는 그대로입니다.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return wrapper
+
+
+def process_task(func):
+    """프로세스 풀에서 실행할 함수 등록 (dispatch(함수 이름)으로 실행)"""
+    PROCESS_TASKS[func.__name__] = func
+    return func
+
+
+def _run_process_task(task: str, traceparent: str, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+    """프로세스 풀 워커 진입점 (요청의 trace를 이어받아 등록된 함수 실행)"""
+    with attach(traceparent):
+        return PROCESS_TASKS[task](*args, **kwargs)
+
+
+async def dispatch(task: str, args: Tuple = (), kwargs: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Any:
+    """
+    등록된 함수를 프로세스 풀에서 실행 (풀이 없으면 스레드에서 실행)
+
+    - timeout초(기본값 MCP_TOOL_TIMEOUT, 0이면 제한 없음)를 넘기면 asyncio.TimeoutError (이미 실행 중인 작업은 끝까지 실행되고 결과는 버림)
+    - 실행 중 워커가 비정상 종료하면 풀을 닫고 BrokenProcessPool (이후 요청은 스레드에서 실행)
+    """
+    kwargs = kwargs or {}
+    pool = PROCESS_POOL
+    future = None
+    if pool is not None:
+        try:
+            future = asyncio.wrap_future(pool.submit(_run_process_task, task, current_traceparent(), args, kwargs))
+        except BrokenProcessPool:
+            close_broken_process_pool(pool)
+    if future is None:
+        future = asyncio.to_thread(PROCESS_TASKS[task], *args, **kwargs)
+
+    if timeout is None:
+        timeout = TOOL_TIMEOUT
+    try:
+        return await asyncio.wait_for(future, timeout or None)
+    except BrokenProcessPool:
+        close_broken_process_pool(pool)
+        raise
+
+
+def _failed_result(task: str, error: Exception, timeout: float) -> Dict[str, Any]:
+    """제한 시간 초과/워커 비정상 종료 시 오류 응답"""
+    if isinstance(error, asyncio.TimeoutError):
+        METRICS.inc("mcp_tool_timeouts_total", tool=task)
+        debug_log(f"⏱️ {task} 제한 시간 초과 ({timeout:g}초)")
+        return {
+            "found": False,
+            "result_type": "error",
+            "error": "timeout",
+            "message": f"요청 처리 시간이 제한 시간({timeout:g}초)을 초과했습니다."
+        }
+
+    debug_log(f"❌ {task} 실행 중 워커 프로세스 종료: {error!r}")
+    return {
+        "found": False,
+        "result_type": "error",
+        "error": "worker_failed",
+        "message": "분석 처리 중 오류가 발생했습니다. 다시 시도해주세요."
+    }
+
+
+def run_in_process(func):
+    """
+    sync Tool 함수를 프로세스 풀에서 실행하는 async Tool로 변환 (CPU 작업용, run_in_thread 대신 사용)
+
+    여러 요청의 pandas 조회/규칙 매칭이 GIL에 묶이지 않고 워커 수만큼 동시에 실행됩니다.
+    풀이 없으면(시작 직후, MCP_PROCESS_WORKERS=0) run_in_thread와 같이 스레드에서 실행합니다.
+    """
+    process_task(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        timeout = TOOL_TIMEOUT
+        if timeout and not DATA_READY.is_set():
+            # requires_data의 로드 대기(최대 DATA_WAIT_TIMEOUT초)는 제한 시간에서 제외
+            timeout = timeout + DATA_WAIT_TIMEOUT if DATA_WAIT_TIMEOUT else 0
+        try:
+            return await dispatch(func.__name__, args, kwargs, timeout=timeout)
+        except (asyncio.TimeoutError, BrokenProcessPool) as e:
+            return _failed_result(func.__name__, e, timeout)
+
+    return wrapper
+
+
+def traced_tool(func):
+    """
+    Tool 실행을 span과 지표(호출 수, 지연시간, 오류)로 기록 (async Tool 함수용, run_in_thread/run_in_process 위에 적용)
+
+    클라이언트가 숨은 인자 trace_context(traceparent)를 보내면 그 요청의 자식 span이 됩니다.
+    trace_context는 Tool 스키마에 선택 인자로 추가되며, 클라이언트가 LLM에 보이는 스키마에서 제거합니다.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        trace_context = kwargs.pop(TRACE_CONTEXT_ARG, "")
+        started = time.perf_counter()
+        status = "exception"
+        METRICS.inc("mcp_tool_in_flight", tool=func.__name__)
+        try:
+            with attach(trace_context), span(f"tool.{func.__name__}", arguments=kwargs):
+                result = await func(*args, **kwargs)
+            status = "error" if _is_error_result(result) else "ok"
+            return result
+        finally:
+            METRICS.inc("mcp_tool_in_flight", -1, tool=func.__name__)
+            METRICS.inc("mcp_tool_calls_total", tool=func.__name__, status=status)
+            METRICS.observe("mcp_tool_latency_seconds", time.perf_counter() - started, tool=func.__name__)
+
+    wrapper.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter(TRACE_CONTEXT_ARG, inspect.Parameter.KEYWORD_ONLY, default="", annotation=str)
+    ])
+    wrapper.__annotations__ = {**func.__annotations__, TRACE_CONTEXT_ARG: str}
+    return wrapper
+
+
+def _is_error_result(result: Any) -> bool:
+    """오류 응답 (데이터 미로드, RAG 검색 실패 등)"""
+    return isinstance(result, dict) and (result.get("result_type") == "error" or "error" in result)
+
+
+def requires_data(func):
+    """
+    데이터 로드 완료까지 기다린 뒤 실행 (sync Tool 함수용, run_in_thread/run_in_process 아래에 적용)
+
+    background 시작 모드에서 로드 중에 들어온 요청은 이벤트 루프가 아닌 워커 스레드에서 대기합니다.
+    DATA_WAIT_TIMEOUT초 안에 로드가 끝나지 않으면 "데이터가 로드되지 않았습니다" 오류 응답을 반환합니다.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not wait_for_data(func.__name__):
+            return data_not_loaded_result()
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def wait_for_data(name: str) -> bool:
+    """데이터 로드 완료까지 최대 DATA_WAIT_TIMEOUT초 대기 (제한 시간 초과면 False)"""
+    if DATA_READY.is_set():
+        return True
+
+    debug_log(f"⏳ 데이터 로드 대기: {name}")
+    if DATA_READY.wait(DATA_WAIT_TIMEOUT or None):
+        return True
+
+    debug_log(f"⏱️ 데이터 로드 대기 시간 초과 ({DATA_WAIT_TIMEOUT:g}초): {name}")
+    return False
+
+
+def data_not_loaded_result() -> Dict[str, Any]:
+    return {
+        "found": False,
+        "result_type": "error",
+        "message": "데이터가 로드되지 않았습니다."
+    }
+
 # ============================================
 # 초기화 함수
 # ============================================
 
+def file_version(paths: List[Path]) -> str:
+    """파일 수정 시각·크기 기반 버전 문자열 (없는 파일은 제외)"""
+    parts = [
+        f"{path.name}:{path.stat().st_mtime_ns}:{path.stat().st_size}"
+        for path in paths
+        if path.exists()
+    ]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16] if parts else ""
+
+
+@traced()
 def load_all_data() -> bool:
-    """전역 DataFrame 로드"""
-    global DF_SET1, DF_SET2, DF_SET3, PATTERN_RULES
+    """
+    전역 DataFrame 로드
+
+    예외가 나도 DATA_READY를 set하므로 대기 중인 데이터 Tool은 멈추지 않고 응답합니다.
+    """
+    try:
+        return _load_data_files()
+    except Exception as e:
+        debug_log(f"❌ 데이터 로딩 중 오류: {e!r}")
+        return False
+    finally:
+        DATA_READY.set()
+
+
+def _load_data_files() -> bool:
+    """SET1/SET2/SET3, PATTERN_RULES 로드 및 데이터 버전 계산"""
+    import pandas as pd
+
+    global DF_SET1, DF_SET2, DF_SET3, PATTERN_RULES, LATEST_TA_YM, DATA_VERSION, RULES_VERSION
+    global DATA_LOADED_AT, DATA_MODIFIED_AT
 
     debug_log("\n=== 데이터 로딩 시작 ===")
 
@@ -122,6 +454,9 @@ def load_all_data() -> bool:
         debug_log(f"❌ SET3 로드 실패: {e}")
         DF_SET3 = None
 
+    # 가맹점별 최근 데이터 월 (검색 결과 정렬용)
+    LATEST_TA_YM = DF_SET2.groupby("ENCODED_MCT")["TA_YM"].max() if DF_SET2 is not None else None
+
     # PATTERN_RULES 로드
     try:
         if PATTERN_RULES_PATH.exists():
@@ -135,7 +470,13 @@ def load_all_data() -> bool:
         debug_log(f"❌ PATTERN_RULES 로드 실패: {e}")
         PATTERN_RULES = None
 
-    debug_log("=== 데이터 로딩 완료 ===\n")
+    DATA_VERSION = file_version([SET1_PATH, SET2_PATH, SET3_PATH])
+    RULES_VERSION = file_version([PATTERN_RULES_PATH])
+    DATA_LOADED_AT = time.time()
+    DATA_MODIFIED_AT = max((path.stat().st_mtime for path in (SET1_PATH, SET2_PATH, SET3_PATH) if path.exists()), default=0.0)
+
+    debug_log(f"=== 데이터 로딩 완료 (데이터 버전: {DATA_VERSION}, 규칙 버전: {RULES_VERSION}) ===\n")
+    STARTUP.mark("data_loaded")
 
     # 최소 SET1만 있으면 OK
     return DF_SET1 is not None
@@ -145,14 +486,21 @@ def load_all_data() -> bool:
 # 헬퍼 함수
 # ============================================
 
-def search_merchants_by_name(partial_name: str, location: str = None, business_type: str = None) -> List[Dict[str, Any]]:
+@traced()
+def rank_merchants(partial_name: str, location: str = None, business_type: str = None) -> Optional["pd.DataFrame"]:
     """
-    가맹점명 부분 검색 (위치, 업종 필터링 지원)
+    가맹점명 부분 검색 (위치, 업종 필터링 지원) + 관련도 순 정렬
+
+    정렬 기준 (search_merchant와 select_merchant가 같은 순번을 쓰도록 항상 같은 순서):
+    1. 가맹점명: 일치(마스킹 * 제외) → 앞부분 일치 → 부분 일치
+    2. 위치 (location이 있을 때): 시군구/상권 일치 → 주소만 일치
+    3. 데이터 최신성: 최근 월별 데이터(SET2 TA_YM)가 최근인 가맹점 먼저
+    4. 가맹점명, ENCODED_MCT
     """
-    debug_log("search_merchants_by_name 함수 실행")
+    debug_log("rank_merchants 함수 실행")
 
     if DF_SET1 is None:
-        return []
+        return None
 
     # 가맹점명 부분 일치
     matched = DF_SET1[DF_SET1['MCT_NM'].str.contains(partial_name, na=False, case=False, regex=False)]
@@ -165,33 +513,107 @@ def search_merchants_by_name(partial_name: str, location: str = None, business_t
     if business_type:
         matched = matched[matched['HPSN_MCT_ZCD_NM'].str.contains(business_type, na=False, case=False, regex=False)]
 
-    if matched.empty:
-        return []
+    # 중복 제거
+    matched = matched.drop_duplicates("ENCODED_MCT")
+
+    names = matched['MCT_NM'].fillna("").str.lower()
+    query = partial_name.lower()
+    name_rank = (names.str.rstrip("*") != query).astype(int) + (~names.str.startswith(query)).astype(int)
+
+    if location:
+        area_match = (
+            matched['MCT_SIGUNGU_NM'].str.contains(location, na=False, case=False, regex=False)
+            | matched['HPSN_MCT_BZN_CD_NM'].str.contains(location, na=False, case=False, regex=False)
+        )
+        location_rank = (~area_match).astype(int)
+    else:
+        location_rank = 0
+
+    latest_ym = matched['ENCODED_MCT'].map(LATEST_TA_YM).fillna(0) if LATEST_TA_YM is not None else 0
+
+    ranked = matched.assign(_name_rank=name_rank, _location_rank=location_rank, _latest_ym=latest_ym).sort_values(
+        ["_name_rank", "_location_rank", "_latest_ym", "MCT_NM", "ENCODED_MCT"],
+        ascending=[True, True, False, True, True],
+        kind="mergesort"
+    )
+
+    debug_log(f"검색 결과: {len(ranked)}개")
+    return ranked
+
+
+def _candidate(row: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """검색 후보 1건 (index는 정렬 순번, 1부터 시작)"""
+    return {
+        'encoded_mct': row['ENCODED_MCT'],
+        'name': row['MCT_NM'],
+        'location': row['MCT_BSE_AR'],
+        'business_type': row['HPSN_MCT_ZCD_NM'],
+        'index': index
+    }
+
+
+def _facets(ranked: "pd.DataFrame") -> Dict[str, Dict[str, int]]:
+    """검색 결과 전체의 시군구/업종별 가맹점 수 (상위 MAX_FACET_VALUES개)"""
+    return {
+        column: {str(value): int(count) for value, count in ranked[column].value_counts().head(MAX_FACET_VALUES).items()}
+        for column in ("MCT_SIGUNGU_NM", "HPSN_MCT_ZCD_NM")
+    }
+
+
+def _merchant_rows(df: "pd.DataFrame", encoded_mct: str) -> "pd.DataFrame":
+    """가맹점의 월별 행 (TA_YM 오름차순)"""
+    return df[df["ENCODED_MCT"] == encoded_mct].sort_values("TA_YM")
+
+
+def _response_mode(response_format: str) -> str:
+    """Tool 인자 response_format → "compact" | "full" (빈 값/잘못된 값이면 MERCHANT_RESPONSE_MODE)"""
+    return response_format if response_format in RESPONSE_MODES else MERCHANT_RESPONSE_MODE
 
-    # 결과 리스트 생성 (중복 제거)
-    results = []
-    seen_codes = set()
 
-    for _, row in matched.iterrows():
-        encoded_mct = row['ENCODED_MCT']
+def _compact_value(value: Any) -> Any:
+    """NaN → None, float은 COMPACT_FLOAT_DIGITS 자리 반올림 (정수로 떨어지면 int)"""
+    if isinstance(value, float):
+        if value != value:
+            return None
+        value = round(value, COMPACT_FLOAT_DIGITS)
+        return int(value) if value.is_integer() else value
+    return value
 
-        if encoded_mct in seen_codes:
+
+def compact_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """dict 1건 압축 (NaN 필드와 응답에 이미 있는 ENCODED_MCT 제외, float 반올림)"""
+    compact = {}
+    for key, value in record.items():
+        if key == "ENCODED_MCT":
             continue
+        value = _compact_value(value)
+        if value is not None:
+            compact[key] = value
+    return compact
 
-        seen_codes.add(encoded_mct)
 
-        results.append({
-            'encoded_mct': encoded_mct,
-            'name': row['MCT_NM'],
-            'location': row['MCT_BSE_AR'],
-            'business_type': row['HPSN_MCT_ZCD_NM'],
-            'index': len(results) + 1
-        })
+def encode_columnar(frame: "pd.DataFrame", fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    월별 DataFrame → 컬럼형 {"columns": [...], "values": [[컬럼별 월 값], ...]}
 
-    debug_log(f"검색 결과: {len(results)}개")
-    return results
+    - to_dict('records')처럼 긴 컬럼명을 월마다 반복하지 않음 (직렬화 시간/전송 바이트/프롬프트 토큰 절감)
+    - fields가 있으면 해당 컬럼만 (TA_YM은 항상 첫 컬럼)
+    - ENCODED_MCT와 전부 NaN인 컬럼은 제외, 남은 NaN은 null, float은 반올림
+    """
+    candidates = fields if fields else list(frame.columns)
+    columns = ["TA_YM"] + [
+        column for column in candidates
+        if column in frame.columns and column not in ("TA_YM", "ENCODED_MCT")
+    ]
+    frame = frame[columns].dropna(axis=1, how="all")
+
+    return {
+        "columns": list(frame.columns),
+        "values": [[_compact_value(value) for value in frame[column].tolist()] for column in frame.columns]
+    }
 
 
+@traced()
 def get_merchant_full_data(encoded_mct: str) -> Optional[Dict[str, Any]]:
     """
     ENCODED_MCT로 SET1, SET2, SET3 데이터 통합 조회
@@ -212,16 +634,16 @@ def get_merchant_full_data(encoded_mct: str) -> Optional[Dict[str, Any]]:
     # SET2: 매출/운영 지표 (월별)
     sales = []
     if DF_SET2 is not None:
-        sales_data = DF_SET2[DF_SET2["ENCODED_MCT"] == encoded_mct]
+        sales_data = _merchant_rows(DF_SET2, encoded_mct)
         if not sales_data.empty:
-            sales = sales_data.sort_values("TA_YM").to_dict('records')
+            sales = sales_data.to_dict('records')
 
     # SET3: 고객 특성 (월별)
     customer = []
     if DF_SET3 is not None:
-        customer_data = DF_SET3[DF_SET3["ENCODED_MCT"] == encoded_mct]
+        customer_data = _merchant_rows(DF_SET3, encoded_mct)
         if not customer_data.empty:
-            customer = customer_data.sort_values("TA_YM").to_dict('records')
+            customer = customer_data.to_dict('records')
 
     # 최신 월 데이터 통합
     latest = {}
@@ -246,6 +668,8 @@ def calculate_monthly_diff(sales_data: List[Dict]) -> Dict[str, float]:
     월별 데이터에서 최근 2개월 차분 계산
     신규 가맹점(1개월 데이터): 첫 달 값을 diff로 사용
     """
+    import pandas as pd
+
     # 차분 계산할 변수들
     diff_vars = [
         "M12_SME_RY_SAA_PCE_RT",
@@ -375,6 +799,7 @@ def calculate_severity(pattern: Dict[str, Any]) -> Dict[str, Any]:
     return {"level": 0, "label": "판정 불가", "strategy_type": "보통"}
 
 
+@traced()
 def match_pattern_rules(merchant_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     가맹점 데이터와 패턴 규칙 매칭
@@ -423,67 +848,248 @@ def match_pattern_rules(merchant_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     return matched
 
 
+def analyze_pattern(encoded_mct: str) -> Dict[str, Any]:
+    """
+    가맹점 1곳 패턴 분석 (analyze_merchant_pattern, analyze_merchant_patterns_batch 공통)
+    """
+    # 가맹점 데이터 조회
+    merchant_data = get_merchant_full_data(encoded_mct)
+    if merchant_data is None:
+        return {
+            "found": False,
+            "encoded_mct": encoded_mct,
+            "message": f"가맹점 코드 '{encoded_mct}'를 찾을 수 없습니다."
+        }
+
+    # 패턴 매칭
+    matched_patterns = match_pattern_rules(merchant_data)
+
+    # 가맹점 컨텍스트 생성 (LLM이 전략 수립 시 참고)
+    basic = merchant_data.get("basic", {})
+    latest = merchant_data.get("latest", {})
+    sales = merchant_data.get("sales", [])
+    diff_data = calculate_monthly_diff(sales)
+
+    merchant_context = {
+        "name": basic.get("MCT_NM"),
+        "location": basic.get("MCT_BSE_AR"),
+        "business_type": basic.get("HPSN_MCT_ZCD_NM"),
+        "business_detail": basic.get("HPSN_MCT_BZN_CD_NM"),
+        "open_date": basic.get("ARE_D"),
+        "latest_metrics": {
+            "revisit_rate": latest.get("MCT_UE_CLN_REU_RAT", 0),
+            "new_customer_rate": latest.get("MCT_UE_CLN_NEW_RAT", 0),
+            "monthly_sales_change": diff_data.get("M12_SME_RY_SAA_PCE_RT_diff", 0),
+            "delivery_sales_ratio": latest.get("DLV_SAA_RAT", 0),
+            "approval_count_ratio": latest.get("APV_CE_RAT", 0)
+        }
+    }
+
+    if not matched_patterns:
+        return {
+            "found": True,
+            "encoded_mct": encoded_mct,
+            "pattern": None,
+            "severity": None,
+            "merchant_context": merchant_context,
+            "message": "매칭되는 패턴을 찾을 수 없습니다. 가맹점 데이터를 참고하여 전략을 수립하세요."
+        }
+
+    # 최우선 패턴 선택
+    best_pattern = matched_patterns[0]
+
+    # 심각도 계산
+    severity = calculate_severity(best_pattern)
+
+    return {
+        "found": True,
+        "encoded_mct": encoded_mct,
+        "pattern": {
+            "pattern_id": best_pattern.get("pattern_id"),
+            "pattern_type": best_pattern.get("pattern_type"),
+            "condition": best_pattern.get("condition"),
+            "metrics": best_pattern.get("metrics")
+        },
+        "severity": severity,
+        "merchant_context": merchant_context,
+        "all_matched_patterns": [p.get("pattern_id") for p in matched_patterns[:3]],
+        "message": f"{severity['label']} 패턴이 감지되었습니다. 이 데이터를 바탕으로 {severity['strategy_type']} 마케팅 전략을 수립하세요."
+    }
+
+
+@process_task
+@traced()
+def analyze_patterns(encoded_mcts: List[str]) -> List[Dict[str, Any]]:
+    """가맹점 여러 곳 패턴 분석 (analyze_merchant_patterns_batch의 묶음 1개, 프로세스 풀 워커 1개가 처리)"""
+    return [analyze_pattern(encoded_mct) for encoded_mct in encoded_mcts]
+
+
 # ============================================
 # RAG 검색 내부 함수
 # ============================================
-def _search_rag_internal(
+async def _wait_for_process_pool_fork() -> None:
+    """RAG 초기화 전 프로세스 풀 fork 완료 대기 (background 시작 중 데이터 로드 전에 들어온 검색 요청)"""
+    if not PROCESS_POOL_FORKED.is_set():
+        debug_log("⏳ 프로세스 풀 준비 대기: RAG 검색")
+        await asyncio.to_thread(PROCESS_POOL_FORKED.wait)
+
+
+async def _search_rag_internal(
         query: str,
         similarity_threshold: float = 0.7,
-        fetch_k: int = 10
+        fetch_k: int = 10,
+        search_mode: str = "hybrid",
+        compact: bool = True
 ) -> Dict[str, Any]:
     """
     RAG 검색 로직 (내부 함수)
 
     검색 방식:
+    - BM25 키워드 검색 (드문 키워드 여러 개가 모두 일치하면 임베딩 생략)
     - query(LLM 전략)를 임베딩
     - RAG의 content(순수 마케팅 내용)와 코사인 유사도 계산
-    - similarity_threshold 이상인 문서만 반환
+    - similarity_threshold 이상인 문서만 반환 (임베딩을 생략한 경우 키워드 일치 문서)
+    - 키워드/유사도 순위를 RRF로 융합
+    - 섹션 단위로 검색한 뒤 같은 팁은 하나로 병합
 
     Args:
         query: 검색 쿼리 (LLM이 수립한 전략)
         similarity_threshold: 유사도 임계값 (0~1)
-        fetch_k: 최대 검색 개수
+        fetch_k: 최대 검색 개수 (팁 기준)
+        search_mode: "vector" | "lexical" | "hybrid"
+        compact: True면 tips와 내용이 중복되는 context 문자열 제외
 
     Returns:
-        검색 결과 (count, tips, context 포함)
+        검색 결과 (count, tips 포함, compact=False면 context 포함)
     """
     try:
-        from rag.services.search import search_context
+        await _wait_for_process_pool_fork()
+        from rag.services.search import asearch_context, public_metadata
 
         debug_log(f"  🔍 RAG 검색: '{query}'")
-        debug_log(f"     threshold={similarity_threshold}, fetch_k={fetch_k}")
+        debug_log(f"     threshold={similarity_threshold}, fetch_k={fetch_k}, mode={search_mode}")
 
         # 명시적 파라미터 전달
-        context, docs = search_context(
+        context, docs = await asearch_context(
             query=query,
             similarity_threshold=similarity_threshold,
-            fetch_k=fetch_k
+            fetch_k=fetch_k,
+            search_mode=search_mode
         )
 
         tips = []
         for doc in docs:
             tips.append({
                 "content": doc.page_content,  # content만
-                "metadata": doc.metadata  # channel, title, video_link
+                "metadata": public_metadata(doc)  # channel, title, video_link
             })
 
         debug_log(f"  ✅ {len(docs)}개 문서 검색 완료")
 
-        return {
+        result = {
             "count": len(docs),
-            "tips": tips,
-            "context": context
+            "tips": tips
         }
+        if not compact:
+            result["context"] = context
+
+        return result
 
     except Exception as e:
         debug_log(f"  ❌ RAG 검색 실패: {e}")
+        METRICS.inc("mcp_rag_errors_total", operation="search", error=type(e).__name__)
+        import traceback
+        traceback.print_exc()
+
+        result = {
+            "count": 0,
+            "tips": [],
+            "error": str(e)
+        }
+        if not compact:
+            result["context"] = ""
+
+        return result
+
+
+async def _search_rag_batch_internal(
+        queries: List[str],
+        similarity_threshold: float = 0.7,
+        fetch_k: int = 10,
+        search_mode: str = "hybrid"
+) -> Dict[str, Any]:
+    """
+    RAG 배치 검색 로직 (내부 함수)
+
+    - 모든 쿼리를 1회 임베딩 + 1회 FAISS 검색으로 처리
+    - 여러 쿼리에서 중복 검색된 팁은 tips에 한 번만 담고 tip_id로 참조
+      (쿼리마다 다른 섹션이 검색되면 섹션을 합쳐 하나의 tip으로 반환)
+
+    Returns:
+        검색 결과 (count, results, tips 포함)
+    """
+    try:
+        await _wait_for_process_pool_fork()
+        from rag.services.search import asearch_context_batch, merge_parents, public_metadata
+
+        debug_log(f"  🔍 RAG 배치 검색: {len(queries)}개 쿼리")
+        debug_log(f"     threshold={similarity_threshold}, fetch_k={fetch_k}, mode={search_mode}")
+
+        batch_results = await asearch_context_batch(
+            queries=queries,
+            similarity_threshold=similarity_threshold,
+            fetch_k=fetch_k,
+            search_mode=search_mode
+        )
+
+        # 팁(parent_id)별로 모든 쿼리의 검색 결과를 모은 뒤 섹션을 합쳐 tip 하나로 반환
+        tip_ids = {}
+        tip_docs: Dict[str, List[Any]] = {}
+        results = []
+
+        for query, (_, docs) in zip(queries, batch_results):
+            query_tip_ids = []
+            for doc in docs:
+                key = doc.id or doc.page_content
+                if key not in tip_ids:
+                    tip_ids[key] = f"T{len(tip_ids) + 1}"
+                    tip_docs[key] = []
+                tip_docs[key].append(doc)
+                query_tip_ids.append(tip_ids[key])
+
+            results.append({
+                "query": query,
+                "count": len(query_tip_ids),
+                "tip_ids": query_tip_ids
+            })
+
+        tips = []
+        for key, docs in tip_docs.items():
+            doc = merge_parents(docs)
+            tips.append({
+                "tip_id": tip_ids[key],
+                "content": doc.page_content,  # content만 (쿼리별로 검색된 섹션의 합집합)
+                "metadata": public_metadata(doc)  # channel, title, video_link
+            })
+
+        debug_log(f"  ✅ {len(tips)}개 문서 검색 완료 (중복 제거 후)")
+
+        return {
+            "count": len(tips),
+            "results": results,
+            "tips": tips
+        }
+
+    except Exception as e:
+        debug_log(f"  ❌ RAG 배치 검색 실패: {e}")
+        METRICS.inc("mcp_rag_errors_total", operation="batch_search", error=type(e).__name__)
         import traceback
         traceback.print_exc()
 
         return {
             "count": 0,
+            "results": [{"query": query, "count": 0, "tip_ids": []} for query in queries],
             "tips": [],
-            "context": "",
             "error": str(e)
         }
 
@@ -492,7 +1098,17 @@ def _search_rag_internal(
 # Tool 1: search_merchant
 # ============================================
 @mcp.tool()
-def search_merchant(merchant_name: str, location: str = "", business_type: str = "") -> Dict[str, Any]:
+@traced_tool
+@run_in_process
+@requires_data
+def search_merchant(
+    merchant_name: str,
+    location: str = "",
+    business_type: str = "",
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    cursor: str = "",
+    response_format: str = ""
+) -> Dict[str, Any]:
     """
     가맹점명으로 가맹점 검색 (부분 일치)
 
@@ -515,16 +1131,30 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
     - 포함: encoded_mct, name, location, business_type, latest_data
 
     ### result_type="multiple" (여러 개 검색)
-    - data: List 타입
-    - 각 항목: encoded_mct, name, location, business_type
-    - index는 1부터 시작 (예: 1, 2, 3, ...)
+    - data: List 타입 (관련도 순, 한 번에 최대 limit개)
+    - 각 항목: encoded_mct, name, location, business_type, index
+    - index는 전체 결과에서의 순번 (1부터 시작, 다음 페이지도 이어서 증가)
+    - count: 전체 검색 결과 수
+    - next_cursor: 다음 페이지 cursor (마지막 페이지면 빈 문자열)
+    - facets: 전체 결과의 시군구(MCT_SIGUNGU_NM)/업종(HPSN_MCT_ZCD_NM)별 가맹점 수
+      → 결과가 많으면 사용자에게 지역/업종을 물어 location/business_type으로 다시 검색
+
+    ## 정렬 기준 (관련도)
+    가맹점명 일치 → 앞부분 일치 → 부분 일치, 위치 일치 정도, 최근 데이터가 있는 가맹점 순
 
     ### result_type="not_found" (검색 결과 없음)
 
+    ## 응답 형식 (response_format)
+    - "compact" (기본값): latest_data에서 값이 없는(NaN) 항목 제외, 소수점 2자리 반올림
+    - "full": latest_data 원본 그대로
+
     Args:
         merchant_name (str): 가맹점명 또는 일부 (필수)
         location (str): 위치 필터 (선택)
         business_type (str): 업종 필터 (선택)
+        limit (int): 여러 개 검색 시 반환할 후보 수 (선택, 기본값 10, 최대 30)
+        cursor (str): 이전 응답의 next_cursor (선택, 다음 페이지 조회)
+        response_format (str): "compact" | "full" (선택, 기본값: compact)
 
     Returns:
         Dict[str, Any]: {
@@ -532,6 +1162,8 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
             "result_type": "single" | "multiple" | "not_found",
             "data": Dict | List,
             "count": int,
+            "next_cursor": str,
+            "facets": Dict[str, Dict[str, int]],
             "message": str
         }
 
@@ -548,14 +1180,14 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
             "message": "데이터가 로드되지 않았습니다."
         }
 
-    # 가맹점 검색
-    search_results = search_merchants_by_name(
+    # 가맹점 검색 (관련도 순)
+    ranked = rank_merchants(
         merchant_name,
         location if location else None,
         business_type if business_type else None
     )
 
-    if len(search_results) == 0:
+    if len(ranked) == 0:
         return {
             "found": False,
             "result_type": "not_found",
@@ -563,9 +1195,8 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
             "message": f"'{merchant_name}' 가맹점을 찾을 수 없습니다."
         }
 
-    elif len(search_results) == 1:
-        result = search_results[0]
-        encoded_mct = result['encoded_mct']
+    elif len(ranked) == 1:
+        encoded_mct = ranked.iloc[0]['ENCODED_MCT']
         merchant_data = get_merchant_full_data(encoded_mct)
 
         if merchant_data is None:
@@ -577,6 +1208,8 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
 
         basic = merchant_data["basic"]
         latest = merchant_data["latest"]
+        if _response_mode(response_format) == "compact":
+            latest = compact_record(latest)
 
         return {
             "found": True,
@@ -594,13 +1227,33 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
         }
 
     else:
+        # 페이지 단위로 반환 (검색어가 짧아도 응답 크기 일정)
+        total = len(ranked)
+        limit = min(max(1, limit), MAX_SEARCH_LIMIT)
+        offset = int(cursor) if cursor.isdigit() else 0
+        page = ranked.iloc[offset:offset + limit]
+        next_offset = offset + len(page)
+
+        message = f"'{merchant_name}'으로 {total}개의 가맹점이 검색되었습니다."
+        if page.empty:
+            message += f" (cursor={cursor}는 범위를 벗어났습니다.)"
+        elif total > limit:
+            message += f" {offset + 1}~{next_offset}번을 표시합니다. 지역/업종(facets)으로 좁히거나 next_cursor로 다음 결과를 조회하세요."
+
         return {
             "found": True,
             "result_type": "multiple",
             "merchant_name": merchant_name,
-            "count": len(search_results),
-            "data": search_results,
-            "message": f"'{merchant_name}'으로 {len(search_results)}개의 가맹점이 검색되었습니다."
+            "location": location,
+            "business_type": business_type,
+            "count": total,
+            "data": [
+                _candidate(row, offset + i)
+                for i, row in enumerate(page.to_dict('records'), start=1)
+            ],
+            "next_cursor": str(next_offset) if next_offset < total else "",
+            "facets": _facets(ranked),
+            "message": message
         }
 
 
@@ -608,7 +1261,16 @@ def search_merchant(merchant_name: str, location: str = "", business_type: str =
 # Tool 2: select_merchant
 # ============================================
 @mcp.tool()
-def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
+@traced_tool
+@run_in_process
+@requires_data
+def select_merchant(
+    index: int,
+    merchant_name: str,
+    location: str = "",
+    business_type: str = "",
+    response_format: str = ""
+) -> Dict[str, Any]:
     """
     여러 검색 결과 중 특정 가맹점 선택
 
@@ -620,8 +1282,8 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
     - 사용자가 번호로 가맹점 선택 (예: "2번 가맹점")
 
     ## 프로세스
-    1. merchant_name으로 다시 검색
-    2. index번째 가맹점의 encoded_mct 추출 (1부터 시작)
+    1. merchant_name(+ location/business_type)으로 다시 검색 (search_merchant와 같은 관련도 순)
+    2. index번째 가맹점의 encoded_mct 추출 (1부터 시작, 페이지와 무관한 전체 순번)
     3. 해당 가맹점의 상세 정보 반환
 
     ## 데이터 소스
@@ -632,6 +1294,9 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
     Args:
         index (int): 검색 결과의 순번 (1부터 시작, 필수)
         merchant_name (str): 이전 검색 쿼리 (필수, 예: "마하")
+        location (str): 이전 검색의 위치 필터 (search_merchant에서 사용했다면 필수)
+        business_type (str): 이전 검색의 업종 필터 (search_merchant에서 사용했다면 필수)
+        response_format (str): "compact" (기본값, latest_data NaN 제외·반올림) | "full" (선택)
 
     Returns:
         Dict[str, Any]: {
@@ -676,10 +1341,14 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
             "message": "merchant_name이 필요합니다."
         }
 
-    # merchant_name으로 다시 검색
-    results = search_merchants_by_name(merchant_name)
+    # 같은 조건으로 다시 검색 (search_merchant와 같은 순서)
+    results = rank_merchants(
+        merchant_name,
+        location if location else None,
+        business_type if business_type else None
+    )
 
-    if not results:
+    if len(results) == 0:
         return {
             "found": False,
             "message": f"'{merchant_name}' 가맹점을 찾을 수 없습니다."
@@ -692,7 +1361,7 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
         }
 
     # index-1 (1부터 시작 → 0부터 시작)
-    encoded_mct = results[index - 1]['encoded_mct']
+    encoded_mct = results.iloc[index - 1]['ENCODED_MCT']
     debug_log(f"✅ index={index} → encoded_mct={encoded_mct}")
 
     # 가맹점 데이터 조회
@@ -707,6 +1376,8 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
 
     basic = merchant_data["basic"]
     latest = merchant_data["latest"]
+    if _response_mode(response_format) == "compact":
+        latest = compact_record(latest)
 
     return {
         "found": True,
@@ -727,9 +1398,10 @@ def select_merchant(index: int, merchant_name: str) -> Dict[str, Any]:
 # Tool 3: search_merchant_knowledge
 # ============================================
 @mcp.tool()
-def search_merchant_knowledge(query: str) -> Dict[str, Any]:
+@traced_tool
+async def search_merchant_knowledge(query: str) -> Dict[str, Any]:
     """
-    RAG 기반 마케팅 사례 검색 (코사인 유사도 0.7 이상)
+    RAG 기반 마케팅 사례 검색 (코사인 유사도 0.7 이상 + 키워드 BM25로 재정렬)
 
     ## 목적
     LLM이 수립한 마케팅 전략과 유사한 실제 사례를 RAG에서 검색합니다.
@@ -742,12 +1414,16 @@ def search_merchant_knowledge(query: str) -> Dict[str, Any]:
     - RAG: 유튜브 마케팅 팁 (FAISS)
       - 임베딩 모델: Google Gemini embedding-001
       - 유사도 임계값: 0.7
+    - BM25 역색인 (한국어 토큰화)
 
     ## 검색 방식
-    1. query를 임베딩
-    2. FAISS와 코사인 유사도 계산
-    3. similarity_threshold=0.7 이상만 반환
-    4. 유사한 내용이 없으면 count=0 반환
+    1. BM25 키워드 검색 (드문 키워드 여러 개가 모두 일치하면 임베딩 생략, 이때는 키워드 일치 문서만 반환)
+    2. query를 임베딩해 FAISS와 코사인 유사도 계산
+    3. similarity_threshold=0.7 이상만 사용 (키워드가 일치해도 0.7 미만이면 제외)
+    4. 키워드/유사도 순위를 RRF로 융합
+    5. 섹션(마케팅 전략/문제 상황/해결 방법) 단위로 검색해 같은 팁은 하나로 병합
+       (content에는 검색된 섹션만 포함)
+    6. 유사한 내용이 없으면 count=0 반환
 
     Args:
         query (str): 검색할 마케팅 전략 또는 키워드
@@ -765,8 +1441,7 @@ def search_merchant_knowledge(query: str) -> Dict[str, Any]:
                         "video_link": str
                     }
                 }
-            ],
-            "context": str  # count=0이면 빈 문자열
+            ]
         }
 
     Note:
@@ -776,10 +1451,12 @@ def search_merchant_knowledge(query: str) -> Dict[str, Any]:
     debug_log(f"\n🔍 search_merchant_knowledge 호출: '{query}'")
 
     # 명시적 파라미터 전달
-    result = _search_rag_internal(
+    result = await _search_rag_internal(
         query=query,
         similarity_threshold=0.7,  # 유사도 임계값
-        fetch_k=10  # 최대 후보군
+        fetch_k=10,  # 최대 후보군
+        search_mode="hybrid",  # BM25 + 벡터 융합
+        compact=RAG_RESPONSE_MODE != "full"  # tips와 중복되는 context 제외
     )
 
     debug_log(f"✅ RAG 검색 완료: {result.get('count', 0)}개\n")
@@ -791,6 +1468,9 @@ def search_merchant_knowledge(query: str) -> Dict[str, Any]:
 # Tool 4: analyze_merchant_pattern
 # ============================================
 @mcp.tool()
+@traced_tool
+@run_in_process
+@requires_data
 def analyze_merchant_pattern(encoded_mct: str) -> Dict[str, Any]:
     """
     가맹점 패턴 분석 및 상세 컨텍스트 제공
@@ -846,84 +1526,661 @@ def analyze_merchant_pattern(encoded_mct: str) -> Dict[str, Any]:
     """
     debug_log("analyze_merchant_pattern Tool 호출 (패턴 분석만)")
 
-    # 가맹점 데이터 조회
-    merchant_data = get_merchant_full_data(encoded_mct)
-    if merchant_data is None:
-        return {
-            "found": False,
-            "encoded_mct": encoded_mct,
-            "message": f"가맹점 코드 '{encoded_mct}'를 찾을 수 없습니다."
+    result = analyze_pattern(encoded_mct)
+
+    debug_log("analyze_merchant_pattern Tool 호출 종료")
+    return result
+
+
+# ============================================
+# Tool 5: search_merchant_knowledge_batch
+# ============================================
+MAX_BATCH_QUERIES = 20
+
+
+@mcp.tool()
+@traced_tool
+async def search_merchant_knowledge_batch(queries: List[str]) -> Dict[str, Any]:
+    """
+    여러 마케팅 전략의 RAG 사례를 한 번에 검색 (search_merchant_knowledge 배치 버전)
+
+    ## 목적
+    마케팅 컨셉/상세 전략마다 search_merchant_knowledge를 따로 호출하지 않고,
+    모든 전략 쿼리를 한 번에 검색합니다.
+
+    ## 사용 시점
+    LLM이 마케팅 컨셉과 상세 전략을 모두 수립한 후
+
+    ## 검색 방식
+    1. 모든 쿼리를 1회 배치 임베딩
+    2. FAISS 다중 쿼리 검색 1회 (BM25 키워드 검색과 RRF 융합)
+    3. 쿼리별 결과는 tip_id 리스트로 반환
+    4. 여러 쿼리에 중복된 팁은 tips에 한 번만 포함 (쿼리마다 검색된 섹션이 다르면 합쳐서 포함)
+
+    Args:
+        queries (List[str]): 검색할 마케팅 전략/키워드 리스트 (최대 20개)
+
+    Returns:
+        Dict[str, Any]: {
+            "count": int,  # 중복 제거된 팁 개수 (0일 수 있음)
+            "results": [
+                {
+                    "query": str,
+                    "count": int,
+                    "tip_ids": List[str]  # tips[].tip_id 참조
+                }
+            ],
+            "tips": [
+                {
+                    "tip_id": str,
+                    "content": str,
+                    "metadata": {
+                        "channel": str,
+                        "title": str,
+                        "video_link": str
+                    }
+                }
+            ]
         }
 
-    # 패턴 매칭
-    matched_patterns = match_pattern_rules(merchant_data)
+    Example:
+        search_merchant_knowledge_batch([
+            "재방문 고객 쿠폰 전략",
+            "소상공인 인스타그램 광고 팁",
+            "배달앱 리뷰 이벤트"
+        ])
+    """
+    debug_log(f"\n🔍 search_merchant_knowledge_batch 호출: {queries}")
 
-    # 가맹점 컨텍스트 생성 (LLM이 전략 수립 시 참고)
-    basic = merchant_data.get("basic", {})
-    latest = merchant_data.get("latest", {})
-    sales = merchant_data.get("sales", [])
-    diff_data = calculate_monthly_diff(sales)
+    queries = [query for query in queries if query and query.strip()][:MAX_BATCH_QUERIES]
 
-    merchant_context = {
-        "name": basic.get("MCT_NM"),
-        "location": basic.get("MCT_BSE_AR"),
-        "business_type": basic.get("HPSN_MCT_ZCD_NM"),
-        "business_detail": basic.get("HPSN_MCT_BZN_CD_NM"),
-        "open_date": basic.get("ARE_D"),
-        "latest_metrics": {
-            "revisit_rate": latest.get("MCT_UE_CLN_REU_RAT", 0),
-            "new_customer_rate": latest.get("MCT_UE_CLN_NEW_RAT", 0),
-            "monthly_sales_change": diff_data.get("M12_SME_RY_SAA_PCE_RT_diff", 0),
-            "delivery_sales_ratio": latest.get("DLV_SAA_RAT", 0),
-            "approval_count_ratio": latest.get("APV_CE_RAT", 0)
+    result = await _search_rag_batch_internal(
+        queries=queries,
+        similarity_threshold=0.7,  # 유사도 임계값
+        fetch_k=10,  # 쿼리별 최대 후보군
+        search_mode="hybrid"  # BM25 + 벡터 융합
+    )
+
+    debug_log(f"✅ RAG 배치 검색 완료: {result.get('count', 0)}개\n")
+
+    return result
+
+
+# ============================================
+# Tool 6: get_server_info
+# ============================================
+@mcp.tool()
+@run_in_thread
+def get_server_info() -> Dict[str, Any]:
+    """
+    서버 데이터 버전 정보 (클라이언트 내부용, 가맹점 분석에는 사용하지 않음)
+
+    ## 목적
+    클라이언트가 Tool 결과를 캐시할 때 키로 사용합니다.
+    데이터 파일이나 RAG 인덱스가 바뀌면 버전이 바뀌어 이전 캐시는 사용되지 않습니다.
+    데이터 로드 전(background 시작 모드)에는 기다리지 않고 빈 data_version을 반환합니다.
+
+    Returns:
+        Dict[str, Any]: {
+            "data_version": str,  # SET1/SET2/SET3 파일 버전 (로드 전이면 빈 문자열)
+            "rules_version": str,  # PATTERN_RULES 파일 버전
+            "rag_version": str,   # FAISS/BM25 인덱스 파일 버전 (인덱스가 없으면 빈 문자열)
+            "data_ready": bool,   # 데이터 로드 완료 여부
+            "startup": Dict[str, float]  # 시작 단계별 경과 시간 (초, 프로세스 시작 기준)
         }
+    """
+    from rag.vectorstore.faiss_client import get_index_version
+
+    rag_version = get_index_version()
+
+    return {
+        "data_version": DATA_VERSION,
+        "rules_version": RULES_VERSION,
+        "rag_version": hashlib.sha1(rag_version.encode("utf-8")).hexdigest()[:16] if rag_version else "",
+        "data_ready": DATA_READY.is_set(),
+        "startup": STARTUP.to_dict()
     }
 
-    if not matched_patterns:
+
+# ============================================
+# Tool 7: get_merchant_timeseries
+# ============================================
+@mcp.tool()
+@traced_tool
+@run_in_process
+@requires_data
+def get_merchant_timeseries(
+    encoded_mct: str,
+    fields: Optional[List[str]] = None,
+    months: int = DEFAULT_TIMESERIES_MONTHS,
+    response_format: str = ""
+) -> Dict[str, Any]:
+    """
+    가맹점 월별 매출/운영 지표(SET2)와 고객 특성(SET3) 추이 조회
+
+    ## 사용 시점
+    최신 값(latest_data)만으로 부족하고 월별 추이를 근거로 제시해야 할 때만 호출
+    필요한 컬럼(fields)과 개월 수(months)만 요청하세요.
+
+    ## 전제조건
+    encoded_mct 필요 → search_merchant 또는 select_merchant 먼저 실행
+
+    ## 응답 형식 (response_format)
+    - "compact" (기본값): 컬럼형 {"columns": ["TA_YM", ...], "values": [[컬럼별 월 값], ...]}
+      - values[i]는 columns[i]의 월별 값 (TA_YM 오름차순)
+      - 값이 모두 없는 컬럼은 제외, 일부 없는 값은 null, 소수점 2자리 반올림
+    - "full": 월별 dict 리스트 (원본 값)
+
+    Args:
+        encoded_mct (str): 가맹점 코드 (필수)
+        fields (List[str]): 조회할 컬럼 (선택, 예: ["MCT_UE_CLN_REU_RAT", "DLV_SAA_RAT"], 비우면 전체)
+        months (int): 최근 몇 개월 (선택, 기본값 6, 0이면 전체)
+        response_format (str): "compact" | "full" (선택, 기본값: compact)
+
+    Returns:
+        Dict[str, Any]: {
+            "found": bool,
+            "encoded_mct": str,
+            "months": int,           # 반환한 개월 수
+            "sales": Dict | List,    # SET2 (요청 컬럼이 SET2에 없으면 생략)
+            "customer": Dict | List, # SET3 (요청 컬럼이 SET3에 없으면 생략)
+            "unknown_fields": List[str],  # 없는 컬럼 (있을 때만)
+            "message": str
+        }
+
+    Example:
+        get_merchant_timeseries("761947ABD9", fields=["MCT_UE_CLN_REU_RAT"], months=12)
+    """
+    debug_log(f"get_merchant_timeseries 호출: {encoded_mct}, fields={fields}, months={months}")
+
+    if DF_SET1 is None or not (DF_SET1["ENCODED_MCT"] == encoded_mct).any():
         return {
-            "found": True,
+            "found": False,
             "encoded_mct": encoded_mct,
-            "pattern": None,
-            "severity": None,
-            "merchant_context": merchant_context,
-            "message": "매칭되는 패턴을 찾을 수 없습니다. 가맹점 데이터를 참고하여 전략을 수립하세요."
+            "message": f"가맹점 코드 '{encoded_mct}'를 찾을 수 없습니다."
         }
 
-    # 최우선 패턴 선택
-    best_pattern = matched_patterns[0]
+    mode = _response_mode(response_format)
+    fields = [field for field in (fields or []) if field]
+    months = max(0, months)
 
-    # 심각도 계산
-    severity = calculate_severity(best_pattern)
+    result: Dict[str, Any] = {"found": True, "encoded_mct": encoded_mct, "months": 0}
+    known_fields = set()
 
-    debug_log("analyze_merchant_pattern Tool 호출 종료")
+    for section, df in (("sales", DF_SET2), ("customer", DF_SET3)):
+        if df is None:
+            continue
+        known_fields.update(df.columns)
+        if fields and not any(field in df.columns for field in fields):
+            continue
+
+        rows = _merchant_rows(df, encoded_mct)
+        if months > 0:
+            rows = rows.tail(months)
+        result["months"] = max(result["months"], len(rows))
+
+        if mode == "compact":
+            result[section] = encode_columnar(rows, fields)
+        else:
+            if fields:
+                rows = rows[["TA_YM"] + [field for field in fields if field in rows.columns and field != "TA_YM"]]
+            result[section] = rows.to_dict('records')
+
+    unknown_fields = [field for field in fields if field not in known_fields]
+    if unknown_fields:
+        result["unknown_fields"] = unknown_fields
+
+    result["message"] = f"최근 {result['months']}개월 추이를 조회했습니다."
+    return result
+
+
+# ============================================
+# Tool 8: server_stats
+# ============================================
+def _collect_runtime_metrics():
+    """조회 시점 지표: 데이터 행 수/메모리/나이, 캐시 크기, 프로세스 메모리"""
+    for dataset, df in (("set1", DF_SET1), ("set2", DF_SET2), ("set3", DF_SET3)):
+        if df is not None:
+            yield "mcp_dataset_rows", {"dataset": dataset}, len(df)
+            yield "mcp_dataset_memory_bytes", {"dataset": dataset}, int(df.memory_usage(index=True, deep=False).sum())
+    if PATTERN_RULES is not None:
+        yield "mcp_dataset_rows", {"dataset": "pattern_rules"}, len(PATTERN_RULES)
+
+    if DATA_LOADED_AT:
+        yield "mcp_data_loaded_timestamp_seconds", {}, DATA_LOADED_AT
+    if DATA_MODIFIED_AT:
+        yield "mcp_data_age_seconds", {}, round(time.time() - DATA_MODIFIED_AT, 3)
+
+    # RAG 시맨틱 캐시 (RAG 모듈을 이미 import한 경우만, 조회 때문에 import하지 않음)
+    semantic_cache_module = sys.modules.get("rag.services.semantic_cache")
+    semantic_cache = semantic_cache_module.get_semantic_cache() if semantic_cache_module else None
+    if semantic_cache is not None:
+        yield "mcp_cache_entries", {"cache": "rag_semantic"}, len(semantic_cache)
+        for event, count in semantic_cache.stats.items():
+            yield "mcp_cache_events_total", {"cache": "rag_semantic", "event": event}, count
+
+    yield "mcp_process_resident_memory_bytes", {}, process_rss_bytes()
+    yield "mcp_process_pool_workers", {}, PROCESS_POOL_WORKERS
+    yield "mcp_uptime_seconds", {}, round(process_uptime(), 3)
+
+
+METRICS.add_collector(_collect_runtime_metrics)
+
+
+def _tool_stats(snapshot: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Tool별 호출 수/오류 수/지연시간(ms) 요약"""
+    tools: Dict[str, Dict[str, Any]] = {}
+    for sample in snapshot["mcp_tool_calls_total"]["samples"]:
+        labels = sample["labels"]
+        stats = tools.setdefault(labels["tool"], {"calls": 0, "errors": 0, "exceptions": 0})
+        stats["calls"] += int(sample["value"])
+        if labels["status"] == "error":
+            stats["errors"] += int(sample["value"])
+        elif labels["status"] == "exception":
+            stats["exceptions"] += int(sample["value"])
+
+    for sample in snapshot["mcp_tool_latency_seconds"]["samples"]:
+        stats = tools.setdefault(sample["labels"]["tool"], {"calls": 0, "errors": 0, "exceptions": 0})
+        stats["mean_ms"] = round(sample["sum"] / sample["count"] * 1000, 1) if sample["count"] else None
+        for quantile in ("p50", "p95", "p99"):
+            stats[f"{quantile}_ms"] = round(sample[quantile] * 1000, 1) if sample[quantile] is not None else None
+
+    return tools
+
+
+@mcp.tool()
+def server_stats() -> Dict[str, Any]:
+    """
+    서버 런타임 지표 (모니터링/부하 테스트용, 가맹점 분석에는 사용하지 않음)
+
+    지연시간 분위수는 히스토그램 버킷에서 추정한 값입니다.
+    HTTP 모드에서는 GET /metrics (Prometheus 형식)로도 조회할 수 있으며, 값은 응답한 워커 프로세스 기준입니다.
+
+    Returns:
+        Dict[str, Any]: {
+            "pid": int,
+            "uptime_seconds": float,
+            "data_version": str,
+            "process_workers": int,  # CPU 작업 프로세스 풀 워커 수 (0이면 스레드에서 실행, 워커 RSS는 포함 안 됨)
+            "tools": {Tool 이름: {"calls", "errors", "exceptions", "mean_ms", "p50_ms", "p95_ms", "p99_ms"}},
+            "metrics": {지표 이름: {"type", "samples"}}  # 전체 지표
+        }
+    """
+    snapshot = METRICS.snapshot()
 
     return {
-        "found": True,
-        "encoded_mct": encoded_mct,
-        "pattern": {
-            "pattern_id": best_pattern.get("pattern_id"),
-            "pattern_type": best_pattern.get("pattern_type"),
-            "condition": best_pattern.get("condition"),
-            "metrics": best_pattern.get("metrics")
-        },
-        "severity": severity,
-        "merchant_context": merchant_context,
-        "all_matched_patterns": [p.get("pattern_id") for p in matched_patterns[:3]],
-        "message": f"{severity['label']} 패턴이 감지되었습니다. 이 데이터를 바탕으로 {severity['strategy_type']} 마케팅 전략을 수립하세요."
+        "pid": os.getpid(),
+        "uptime_seconds": round(process_uptime(), 1),
+        "data_version": DATA_VERSION,
+        "process_workers": PROCESS_POOL_WORKERS,
+        "tools": _tool_stats(snapshot),
+        "metrics": snapshot
     }
 
 
 # ============================================
-# 서버 실행
+# Tool 9: analyze_merchant_patterns_batch
 # ============================================
+MAX_BATCH_MERCHANTS = 200
+
+
+@mcp.tool()
+@traced_tool
+async def analyze_merchant_patterns_batch(encoded_mcts: List[str]) -> Dict[str, Any]:
+    """
+    여러 가맹점 패턴 일괄 분석 (포트폴리오/지역·업종 단위 분석용)
+
+    ## 목적
+    가맹점 여러 곳의 analyze_merchant_pattern 결과를 한 번에 조회하고 패턴 유형별로 집계합니다.
+    가맹점 1곳 분석에는 analyze_merchant_pattern을 사용하세요.
+
+    ## 처리 방식
+    - 가맹점 목록을 프로세스 풀 워커 수만큼 나눠 동시에 분석 (코어 수에 비례해 처리량 증가)
+    - 중복 코드는 한 번만 분석, 최대 MAX_BATCH_MERCHANTS(200)곳 (초과분은 제외하고 truncated=True)
+    - 전체 제한 시간 MCP_BATCH_TOOL_TIMEOUT(기본 120초)
+
+    Args:
+        encoded_mcts (List[str]): 가맹점 코드 목록
+
+    Returns:
+        Dict[str, Any]: {
+            "count": int,  # 분석한 가맹점 수
+            "found": int,  # 데이터가 있는 가맹점 수
+            "truncated": bool,
+            "summary": {"Decline": int, "Growth": int, "no_pattern": int, "not_found": int},
+            "results": List[Dict]  # 입력 순서, 항목 형식은 analyze_merchant_pattern과 같음
+        }
+    """
+    debug_log(f"analyze_merchant_patterns_batch Tool 호출 ({len(encoded_mcts)}곳)")
+
+    if not await asyncio.to_thread(wait_for_data, "analyze_merchant_patterns_batch") or DF_SET1 is None:
+        return data_not_loaded_result()
+
+    unique = list(dict.fromkeys(encoded_mct for encoded_mct in encoded_mcts if encoded_mct))
+    selected = unique[:MAX_BATCH_MERCHANTS]
+
+    # 워커마다 묶음 1개 (풀이 없으면 스레드에서 묶음 1개)
+    chunk_size = max(1, math.ceil(len(selected) / max(1, PROCESS_POOL_WORKERS)))
+    chunks = [selected[i:i + chunk_size] for i in range(0, len(selected), chunk_size)]
+
+    try:
+        chunk_results = await asyncio.wait_for(
+            asyncio.gather(*(dispatch("analyze_patterns", (chunk,), timeout=0) for chunk in chunks)),
+            BATCH_TOOL_TIMEOUT or None
+        )
+    except (asyncio.TimeoutError, BrokenProcessPool) as e:
+        return _failed_result("analyze_merchant_patterns_batch", e, BATCH_TOOL_TIMEOUT)
+
+    results = [result for chunk_result in chunk_results for result in chunk_result]
+
+    summary = {"Decline": 0, "Growth": 0, "no_pattern": 0, "not_found": 0}
+    for result in results:
+        if not result.get("found"):
+            summary["not_found"] += 1
+        elif result.get("pattern") is None:
+            summary["no_pattern"] += 1
+        else:
+            pattern_type = result["pattern"].get("pattern_type")
+            summary[pattern_type] = summary.get(pattern_type, 0) + 1
+
+    debug_log(f"analyze_merchant_patterns_batch 완료: {len(results)}곳 (묶음 {len(chunks)}개)")
+
+    return {
+        "count": len(results),
+        "found": len(results) - summary["not_found"],
+        "truncated": len(unique) > len(selected),
+        "summary": summary,
+        "results": results
+    }
+
 
 # ============================================
 # 서버 실행
 # ============================================
 
+def resolve_process_workers(setting: str, http_workers: int = 1) -> int:
+    """MCP_PROCESS_WORKERS / --process-workers 값 → 프로세스당 풀 워커 수 (auto: 코어를 HTTP 워커끼리 나눔)"""
+    if setting == "auto":
+        return (os.cpu_count() or 1) // max(1, http_workers)
+    return max(0, int(setting))
+
+
+def _detach_stdin() -> None:
+    """
+    fork한 자식 프로세스의 stdin 분리
+
+    stdio 서버는 읽기 스레드가 stdin lock을 잡은 채 대기하므로, 자식(프로세스 풀 워커)이 시작 시
+    sys.stdin.close()를 호출하면 물려받은 lock을 영원히 기다립니다.
+    """
+    sys.stdin = None
+
+
+def _exit_with_parent(parent_pid: int) -> None:
+    """프로세스 풀 워커 초기화: 서버 프로세스가 종료(SIGKILL 포함)되면 워커도 종료"""
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1.0)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+def start_process_pool(workers: int) -> None:
+    """
+    CPU 작업 프로세스 풀 생성 (데이터 로드 후, RAG 준비 전에 호출)
+
+    - 워커는 fork로 만들어 로드된 DataFrame/패턴 규칙을 copy-on-write로 공유 (워커별 재로드 없음)
+    - 워커를 모두 바로 띄워 요청 처리 중 fork를 피함 (서버가 스레드를 늘린 뒤에는 다시 fork하지 않음)
+    - 워커가 2개 미만이거나 fork를 지원하지 않으면 풀 없이 스레드에서 실행
+    """
+    global PROCESS_POOL, PROCESS_POOL_WORKERS
+    import gc
+    import multiprocessing
+
+    global _STDIN_DETACH_REGISTERED
+    if workers < 2 or not hasattr(os, "fork") or DF_SET1 is None:
+        return
+
+    # 풀을 만드는 프로세스에서만 등록 (이 모듈을 import한 다른 프로세스의 fork에는 영향 없음)
+    if not _STDIN_DETACH_REGISTERED:
+        os.register_at_fork(after_in_child=_detach_stdin)
+        _STDIN_DETACH_REGISTERED = True
+
+    # 로드된 데이터 객체를 GC 추적에서 제외 → fork 후 GC가 페이지를 건드려 복사되는 것 방지
+    gc.freeze()
+    pool = concurrent.futures.ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_exit_with_parent,
+        initargs=(os.getpid(),)
+    )
+    for future in [pool.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+
+    with _PROCESS_POOL_LOCK:
+        PROCESS_POOL, PROCESS_POOL_WORKERS = pool, workers
+    STARTUP.mark("process_pool_ready")
+    debug_log(f"🧮 프로세스 풀 준비: 워커 {workers}개")
+
+
+def stop_process_pool() -> None:
+    """프로세스 풀 종료 (os._exit로 끝나는 HTTP 워커는 atexit가 실행되지 않으므로 직접 호출)"""
+    global PROCESS_POOL, PROCESS_POOL_WORKERS
+
+    with _PROCESS_POOL_LOCK:
+        pool, PROCESS_POOL, PROCESS_POOL_WORKERS = PROCESS_POOL, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def close_broken_process_pool(broken: Optional[concurrent.futures.ProcessPoolExecutor]) -> None:
+    """
+    워커가 비정상 종료(메모리 부족 등)해 깨진 풀을 닫고 이후 요청은 스레드에서 실행 (동시에 여러 요청이 실패해도 1번만)
+
+    요청을 처리 중인 서버(이벤트 루프, 검색 스레드, gRPC 클라이언트)에서 다시 fork하면 자식이 잠긴 lock을
+    물려받아 멈출 수 있으므로 새 풀을 만들지 않습니다. 프로세스 풀은 서버를 다시 시작하면 복구됩니다.
+    """
+    global PROCESS_POOL, PROCESS_POOL_WORKERS
+
+    with _PROCESS_POOL_LOCK:
+        if broken is None or PROCESS_POOL is not broken:
+            return
+        PROCESS_POOL, PROCESS_POOL_WORKERS = None, 0
+
+    broken.shutdown(wait=False, cancel_futures=True)
+    METRICS.inc("mcp_process_pool_broken_total")
+    debug_log("⚠️ 프로세스 풀 워커 비정상 종료 → 풀을 닫고 이후 요청은 스레드에서 실행합니다.")
+
+
+def prewarm_rag() -> None:
+    """RAG 검색 스택 미리 준비 (첫 search_merchant_knowledge의 import/인덱스 로드 지연 제거)"""
+    try:
+        from rag.services.search import warm_up
+
+        if warm_up():
+            STARTUP.mark("rag_ready")
+    except Exception as e:
+        debug_log(f"⚠️ RAG 미리 준비 실패 (첫 검색 시 다시 시도): {e!r}")
+
+
+def start_background_startup(load_data: bool, process_workers: int = 0) -> threading.Thread:
+    """
+    서버가 요청을 받는 동안 백그라운드 스레드에서 데이터 로드(load_data=True) → 프로세스 풀 생성 → RAG 준비
+    RAG 검색 요청은 프로세스 풀 fork가 끝날 때까지 기다립니다. (PROCESS_POOL_FORKED)
+    MCP_METRICS_FILE이 있으면 지표 파일 기록도 시작 (stdio 프로세스, HTTP 워커마다 1회)
+
+    데이터 Tool은 requires_data로 로드 완료를 기다리므로 응답 내용은 eager 모드와 같습니다.
+    """
+    if process_workers:
+        PROCESS_POOL_FORKED.clear()
+
+    def run():
+        try:
+            if load_data and not load_all_data():
+                debug_log("❌ 데이터 로딩 실패! 최소 SET1 파일이 필요합니다. (데이터 Tool은 오류 응답)")
+            # 임베딩 클라이언트, 검색/지표 기록 스레드를 만들기 전에 fork
+            if process_workers:
+                try:
+                    start_process_pool(process_workers)
+                except Exception as e:
+                    debug_log(f"⚠️ 프로세스 풀 생성 실패 (스레드에서 실행): {e!r}")
+        finally:
+            PROCESS_POOL_FORKED.set()
+
+        if METRICS_FILE:
+            METRICS.start_file_dump(METRICS_FILE, METRICS_FILE_INTERVAL)
+        if RAG_PREWARM:
+            prewarm_rag()
+        debug_log(f"⏱️ 시작 단계: {STARTUP.summary()}")
+
+    thread = threading.Thread(target=run, name="mcp-startup", daemon=True)
+    thread.start()
+    return thread
+
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request):
+    """HTTP 모드 상태 확인 (로드밸런서/모니터링용)"""
+    from starlette.responses import JSONResponse
+
+    if not DATA_READY.is_set():
+        status = "loading"
+    else:
+        status = "ok" if DF_SET1 is not None else "no_data"
+
+    return JSONResponse({
+        "status": status,
+        "data_version": DATA_VERSION,
+        "pid": os.getpid()
+    })
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request):
+    """Prometheus 형식 지표 (응답한 워커 프로세스 기준, 워커별 수집은 MCP_METRICS_FILE 사용)"""
+    from starlette.responses import PlainTextResponse
+
+    return PlainTextResponse(METRICS.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="가맹점 마케팅 분석 MCP Server")
+    parser.add_argument("--transport", choices=["stdio", "http", "sse"], default="stdio",
+                        help="stdio: 클라이언트 자식 프로세스 (기본값) / http: streamable HTTP 공유 서버 / sse: SSE 공유 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--path", default="/mcp", help="MCP 엔드포인트 경로")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="HTTP 워커 프로세스 수 (데이터 로드 후 fork, 데이터는 공유)")
+    parser.add_argument("--keep-alive", type=int, default=30, help="HTTP keep-alive 유지 시간 (초)")
+    parser.add_argument("--limit-concurrency", type=int, default=None,
+                        help="워커당 최대 동시 연결 수 (초과 시 503)")
+    parser.add_argument("--startup", choices=STARTUP_MODES, default=MCP_STARTUP,
+                        help="background: 요청을 먼저 받고 데이터는 백그라운드 로드 (stdio 기본값) / eager: 데이터 로드 후 시작 "
+                             "(HTTP/SSE는 fork 전 공유를 위해 항상 eager)")
+    parser.add_argument("--process-workers", default=PROCESS_WORKERS,
+                        help="CPU 작업 프로세스 풀 워커 수 (auto: 코어 수, HTTP는 코어 수 / --workers, 0: 스레드에서 실행)")
+    return parser.parse_args(argv)
+
+
+def serve_http(args: argparse.Namespace) -> None:
+    """
+    HTTP/SSE 공유 서버 실행
+
+    - 데이터(SET1/SET2/SET3, 패턴 규칙)는 부모 프로세스에서 한 번 로드한 뒤 워커를 fork
+      → 워커들은 읽기 전용 데이터를 copy-on-write로 공유 (사용자가 늘어도 메모리 일정)
+    - 모든 워커가 같은 listen 소켓에서 연결을 받음
+    - streamable HTTP는 stateless 모드로 실행해 어느 워커가 요청을 받아도 처리 가능
+    - SSE는 연결별 세션 상태가 워커 프로세스에 묶이므로 워커 1개로만 실행
+    - 워커마다 CPU 작업 프로세스 풀을 만들며, auto면 코어 수를 워커끼리 나눔
+    - RAG 모듈 import는 fork 전에 끝내 워커 간 공유하고, FAISS 인덱스/임베딩 클라이언트는 워커별로
+      시작 직후 백그라운드에서 준비 (임베딩 API 클라이언트는 fork 전에 만들면 안 됨)
+    """
+    import gc
+    import signal
+    import socket
+
+    import uvicorn
+
+    workers = max(1, args.workers)
+    if args.transport == "sse" and workers > 1:
+        debug_log("⚠️ SSE는 세션이 워커에 묶이므로 워커 1개로 실행합니다.")
+        workers = 1
+    if workers > 1 and not hasattr(os, "fork"):
+        debug_log("⚠️ fork를 지원하지 않는 OS입니다. 워커 1개로 실행합니다.")
+        workers = 1
+
+    app = mcp.http_app(
+        path=args.path,
+        transport=args.transport,
+        stateless_http=True if args.transport == "http" else None
+    )
+    config = uvicorn.Config(
+        app,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency,
+        log_level="info"
+    )
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    debug_log(f"🌐 {args.transport} 서버: http://{args.host}:{args.port}{args.path} (워커 {workers}개)")
+
+    if RAG_PREWARM:
+        try:
+            import rag.services.search  # noqa: F401
+        except Exception as e:
+            debug_log(f"⚠️ RAG 모듈 import 실패: {e!r}")
+
+    STARTUP.mark("serving")
+    process_workers = resolve_process_workers(args.process_workers, workers)
+
+    if workers == 1:
+        start_background_startup(load_data=False, process_workers=process_workers)
+        uvicorn.Server(config).run(sockets=[sock])
+        return
+
+    # 로드된 데이터 객체를 GC 추적에서 제외 → fork 후 GC가 페이지를 건드려 복사되는 것 방지
+    gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            start_background_startup(load_data=False, process_workers=process_workers)
+            uvicorn.Server(config).run(sockets=[sock])
+            stop_process_pool()
+            os._exit(0)
+        children.append(pid)
+
+    def shutdown(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for pid in children:
+        os.waitpid(pid, 0)
+    debug_log("🛑 MCP Server 종료")
+
+
 if __name__ == "__main__":
-    # 데이터 로드
-    if not load_all_data():
+    args = parse_args()
+    STARTUP.mark("imports")
+
+    # stdio background 모드: 데이터는 요청을 받기 시작한 뒤 백그라운드에서 로드
+    # HTTP/SSE: 워커 fork 전에 로드해야 데이터가 공유되므로 항상 먼저 로드
+    load_in_background = args.startup == "background" and args.transport == "stdio"
+
+    if not load_in_background and not load_all_data():
         debug_log("\n" + "=" * 50)
         debug_log("❌ 데이터 로딩 실패! 서버를 시작할 수 없습니다.")
         debug_log("최소 SET1 파일이 필요합니다.")
@@ -934,4 +2191,9 @@ if __name__ == "__main__":
     debug_log("🚀 MCP Server 시작")
     debug_log("=" * 50 + "\n")
 
-    mcp.run()
+    if args.transport == "stdio":
+        start_background_startup(load_data=load_in_background, process_workers=resolve_process_workers(args.process_workers))
+        STARTUP.mark("serving")
+        mcp.run()
+    else:
+        serve_http(args)
@@ -0,0 +1,266 @@
+"""
+런타임 지표 (counter / gauge / histogram)
+- MetricsRegistry: 프로세스 단위 지표 저장소 (스레드 안전)
+  - inc(): 호출/오류 횟수, observe(): 지연시간 히스토그램, set(): 현재 값
+  - add_collector(): 조회 시점에 계산하는 값 (데이터 행 수, 메모리, 캐시 크기 등)
+- snapshot(): JSON용 요약 (히스토그램은 count/sum과 p50/p95/p99 추정치)
+- to_prometheus(): Prometheus text exposition format (0.0.4)
+- start_file_dump(): 주기적으로 Prometheus 텍스트를 파일에 기록 (node_exporter textfile collector 등)
+"""
+
+import atexit
+import bisect
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Prometheus 텍스트 파일 경로 (비우면 기록 안 함, {pid}는 프로세스 ID로 치환 → fork 워커별 파일)
+METRICS_FILE = os.environ.get("MCP_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.environ.get("MCP_METRICS_INTERVAL", "15"))
+
+# 지연시간 히스토그램 버킷 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SNAPSHOT_QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# collector 반환 항목: (지표 이름, 라벨, 값)
+Sample = Tuple[str, Dict[str, Any], float]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in items
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram과 같은 le 경계)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """버킷 안에서 선형 보간한 분위수 추정치 (Prometheus histogram_quantile과 같은 방식)"""
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            if i < len(self.buckets):
+                lower = self.buckets[i]
+        return self.buckets[-1]
+
+    def copy(self) -> "Histogram":
+        clone = Histogram(self.buckets)
+        clone.counts = list(self.counts)
+        clone.sum = self.sum
+        clone.count = self.count
+        return clone
+
+
+class MetricsRegistry:
+    """
+    지표 저장소 (스레드 안전)
+
+    사용 예시:
+        METRICS = MetricsRegistry()
+        METRICS.counter("tool_calls_total", "Tool 호출 수")
+        METRICS.histogram("tool_latency_seconds", "Tool 실행 시간")
+        METRICS.inc("tool_calls_total", tool="search_merchant", status="ok")
+        METRICS.observe("tool_latency_seconds", 0.12, tool="search_merchant")
+        print(METRICS.to_prometheus())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}  # 이름 → (종류, 설명, 버킷)
+        self._values: Dict[str, Dict[LabelKey, Any]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    # ============================================
+    # 지표 선언
+    # ============================================
+
+    def counter(self, name: str, description: str) -> None:
+        self._declare(name, "counter", description)
+
+    def gauge(self, name: str, description: str) -> None:
+        self._declare(name, "gauge", description)
+
+    def histogram(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._declare(name, "histogram", description, buckets)
+
+    def _declare(self, name: str, kind: str, description: str, buckets: Tuple[float, ...] = ()) -> None:
+        with self._lock:
+            self._meta[name] = (kind, description, buckets)
+            self._values.setdefault(name, {})
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """조회(snapshot/to_prometheus) 시점에 호출해 값을 채우는 함수 등록 (선언한 counter/gauge만)"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    # ============================================
+    # 기록
+    # ============================================
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """counter/gauge 증가 (gauge는 음수로 감소 가능)"""
+        key = _label_key(labels)
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._values[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            values = self._values[name]
+            histogram = values.get(key)
+            if histogram is None:
+                histogram = values[key] = Histogram(self._meta[name][2])
+            histogram.observe(value)
+
+    # ============================================
+    # 조회
+    # ============================================
+
+    def _collect(self) -> Dict[str, Dict[LabelKey, Any]]:
+        """저장된 값 복사본 + collector 값 (collector는 lock 밖에서 실행)"""
+        with self._lock:
+            values = {
+                name: {key: value.copy() if isinstance(value, Histogram) else value for key, value in samples.items()}
+                for name, samples in self._values.items()
+            }
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    if name in values:
+                        values[name][_label_key(labels)] = value
+            except Exception as e:
+                print(f"⚠️ 지표 수집 실패 ({getattr(collector, '__name__', collector)}): {e!r}", file=sys.stderr)
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        JSON 직렬화 가능한 전체 지표
+
+        Returns:
+            {이름: {"type": str, "samples": [{"labels": {...}, "value": float}
+                                            | {"labels": {...}, "count", "sum", "p50", "p95", "p99"}]}}
+        """
+        result = {}
+        for name, samples in self._collect().items():
+            kind = self._meta[name][0]
+            entries = []
+            for key, value in sorted(samples.items()):
+                if isinstance(value, Histogram):
+                    entry = {"labels": dict(key), "count": value.count, "sum": round(value.sum, 6)}
+                    for q in SNAPSHOT_QUANTILES:
+                        estimate = value.quantile(q)
+                        entry[f"p{int(q * 100)}"] = round(estimate, 6) if estimate is not None else None
+                    entries.append(entry)
+                else:
+                    entries.append({"labels": dict(key), "value": value})
+            result[name] = {"type": kind, "samples": entries}
+        return result
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, samples in self._collect().items():
+            kind, description, _ = self._meta[name]
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for key, value in sorted(samples.items()):
+                if isinstance(value, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(value.buckets + (float("inf"),), value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(value.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    # ============================================
+    # 파일 기록
+    # ============================================
+
+    def write_file(self, path: str) -> str:
+        """Prometheus 텍스트를 파일에 기록 (임시 파일에 쓴 뒤 교체 → 읽는 쪽이 쓰는 중인 파일을 보지 않음)"""
+        path = path.format(pid=os.getpid())
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+        return path
+
+    def start_file_dump(self, path: str, interval: float = METRICS_FILE_INTERVAL) -> threading.Thread:
+        """interval초마다, 그리고 프로세스 종료 시 write_file(path)"""
+        def run():
+            while True:
+                try:
+                    self.write_file(path)
+                except OSError as e:
+                    print(f"⚠️ 지표 파일 기록 실패: {e!r}", file=sys.stderr)
+                time.sleep(interval)
+
+        atexit.register(self.write_file, path)
+        thread = threading.Thread(target=run, name="metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+
+def process_rss_bytes() -> int:
+    """현재 프로세스 RSS (바이트, /proc이 없으면 최대 RSS)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,209 @@
+"""
+프로세스 시작 시간 측정
+- StartupReport: 프로세스 시작(인터프리터 부팅 포함) 후 단계별 경과 시간 기록 (import 완료, 서버 응답 가능, 데이터/RAG 준비)
+- import 프로파일: python -X importtime 결과를 모듈/패키지별로 집계
+- MCP 서버 준비 시간: stdio 서버를 띄워 initialize / Tool 목록 / 첫 데이터 Tool / 첫 RAG Tool 응답까지 측정
+
+사용 예시:
+    python -m observability.startup imports mcp_server
+    python -m observability.startup imports streamlit chatbot.runtime chatbot.turn
+    python -m observability.startup server --startup background
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 표시할 모듈 수 (누적 import 시간 상위)
+DEFAULT_TOP = 25
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+_MODULE_LOADED_AT = time.perf_counter()
+
+
+def process_uptime() -> float:
+    """
+    프로세스 시작 후 경과 시간 (초, 인터프리터 부팅 포함)
+
+    /proc이 없으면 이 모듈 import 시점부터 측정합니다.
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            system_uptime = float(f.read().split()[0])
+        return max(0.0, system_uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, IndexError, ValueError):
+        return time.perf_counter() - _MODULE_LOADED_AT
+
+
+class StartupReport:
+    """
+    시작 단계별 경과 시간 (스레드 안전)
+
+    사용 예시:
+        STARTUP = StartupReport()
+        STARTUP.mark("imports")
+        ...
+        STARTUP.mark("data_loaded")
+        print(STARTUP.summary())
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        # 프로세스 시작 시각 (perf_counter 기준, fork한 워커도 부모 프로세스 시작 기준으로 기록)
+        self._started = time.perf_counter() - process_uptime()
+
+    def mark(self, phase: str) -> float:
+        elapsed = round(time.perf_counter() - self._started, 3)
+        with self._lock:
+            self.phases[phase] = elapsed
+        return elapsed
+
+    def to_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.phases)
+
+    def summary(self) -> str:
+        return " · ".join(f"{phase} {seconds:.2f}초" for phase, seconds in self.to_dict().items())
+
+
+# ============================================
+# import 프로파일
+# ============================================
+
+def profile_imports(modules: List[str]) -> List[Tuple[str, int, int, int]]:
+    """
+    새 프로세스에서 modules를 import하며 -X importtime 결과 수집
+
+    Returns:
+        [(모듈명, 자체 시간 us, 누적 시간 us, 깊이)] (import 순서)
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1:] or ["알 수 없는 오류"]
+        raise RuntimeError(f"import 실패: {error[0]}")
+    return entries
+
+
+def format_import_profile(entries: List[Tuple[str, int, int, int]], top: int = DEFAULT_TOP) -> str:
+    """최상위 패키지별 자체 시간 합계 + 누적 시간 상위 모듈"""
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+
+    packages: Dict[str, int] = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+
+    lines = [f"전체 import {total_us / 1e6:.2f}초 (모듈 {len(entries)}개)", "", "[패키지별 (자체 시간 합계)]"]
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {self_us / 1000:8.1f}ms  {self_us / total_us * 100:5.1f}%  {package}")
+
+    lines += ["", "[모듈별 (누적 시간)]"]
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda entry: -entry[2])[:top]:
+        lines.append(f"  {cumulative_us / 1000:8.1f}ms  (자체 {self_us / 1000:6.1f}ms)  {'  ' * min(depth, 6)}{name}")
+    return "\n".join(lines)
+
+
+# ============================================
+# MCP 서버 준비 시간
+# ============================================
+
+async def measure_server_startup(command: List[str], env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    stdio MCP 서버를 띄워 단계별 응답 시간 측정 (초, 프로세스 시작 기준)
+
+    - initialize: 서버가 요청을 받기 시작 (클라이언트 세션 준비)
+    - list_tools: Tool 목록 수신
+    - first_data_tool: 첫 search_merchant 응답 (데이터 로드 대기 포함)
+    - first_rag_tool: 첫 search_merchant_knowledge 응답 (RAG import/인덱스 로드 포함)
+    """
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=command[0], args=command[1:], env=env)
+    timings: Dict[str, Any] = {}
+
+    with open(os.devnull, "w") as devnull:
+        started = time.perf_counter()
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                timings["initialize"] = time.perf_counter() - started
+
+                tools = await session.list_tools()
+                timings["list_tools"] = time.perf_counter() - started
+                names = {tool.name for tool in tools.tools}
+
+                if "search_merchant" in names:
+                    await session.call_tool("search_merchant", {"merchant_name": "가"})
+                    timings["first_data_tool"] = time.perf_counter() - started
+
+                if "search_merchant_knowledge" in names:
+                    await session.call_tool("search_merchant_knowledge", {"query": "재방문 고객 쿠폰"})
+                    timings["first_rag_tool"] = time.perf_counter() - started
+
+                if "get_server_info" in names:
+                    result = await session.call_tool("get_server_info", {})
+                    timings["server_phases"] = json.loads(result.content[0].text).get("startup", {})
+
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in timings.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="프로세스 시작 시간 측정")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="모듈 import 시간 프로파일")
+    imports.add_argument("modules", nargs="+", help="import할 모듈 (예: mcp_server)")
+    imports.add_argument("--top", type=int, default=DEFAULT_TOP)
+
+    server = commands.add_parser("server", help="MCP 서버 준비 시간 (stdio)")
+    server.add_argument("--startup", choices=("background", "eager"), default=None,
+                        help="서버 시작 모드 (MCP_STARTUP, 기본값: 서버 설정)")
+    server.add_argument("--repeat", type=int, default=3)
+    server.add_argument("--command", default="python mcp_server.py")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "imports":
+        print(format_import_profile(profile_imports(args.modules), args.top))
+        return
+
+    executable, *command_args = args.command.split()
+    command = [sys.executable if executable == "python" else executable, *command_args]
+    env = dict(os.environ)
+    if args.startup:
+        env["MCP_STARTUP"] = args.startup
+
+    runs = [asyncio.run(measure_server_startup(command, env)) for _ in range(args.repeat)]
+    for i, run in enumerate(runs, start=1):
+        phases = run.pop("server_phases", {})
+        print(f"[{i}] " + "  ".join(f"{key}={value:.2f}s" for key, value in run.items()))
+        if phases:
+            print("    서버: " + "  ".join(f"{key}={value:.2f}s" for key, value in phases.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+"""
+요청 단위 추적 (span)
+- span(name, **attrs): 구간 소요 시간 기록, contextvars로 부모-자식 연결 (async task/스레드로 전파)
+- traced(): 함수 데코레이터 (sync/async)
+- traceparent 문자열("00-<trace_id>-<span_id>-01")로 프로세스 경계(UI → MCP 서버) 전파
+- 내보내기 (TRACE_EXPORT): none (기본값) | jsonl (TRACE_JSONL_PATH) | otel (OpenTelemetry, 설치된 경우)
+- jsonl 파일은 TRACE_JSONL_MAX_BYTES를 넘으면 .1로 교체 (최대 약 2배 크기만 디스크 사용)
+- 구간별 소요 시간 보기: python -m observability.tracing [trace_id]
+
+개인정보 주의: span 속성에는 사용자 질문, Tool 인자(가맹점명/검색어) 등 입력 텍스트가 그대로 기록됩니다.
+jsonl/otel을 켜면 해당 파일/수집 서버의 보관·접근 정책을 따로 관리해야 합니다.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 기본값은 기록하지 않음 (span에 사용자 입력 텍스트가 포함되므로 명시적으로 켤 때만 기록)
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "none")
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "./.cache/traces.jsonl")
+
+# jsonl 파일 최대 크기 (바이트, 넘으면 {path}.1로 교체, 0이면 제한 없음)
+TRACE_JSONL_MAX_BYTES = int(os.environ.get("TRACE_JSONL_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# MCP Tool 호출 시 traceparent를 전달하는 숨은 인자 이름 (LLM에 보이는 스키마에서는 제거)
+TRACE_CONTEXT_ARG = "trace_context"
+
+# 트리 출력 시 읽을 JSONL 파일 끝부분 크기
+TRACE_READ_TAIL_BYTES = 8 * 1024 * 1024
+
+# 현재 span의 (trace_id, span_id)
+_current_context: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "trace_current_context", default=None
+)
+
+_service_name = "app"
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    service: str
+    start_time: float  # epoch 초
+    duration_ms: float = 0.0
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _started: float = field(default=0.0, repr=False)
+    _otel_span: Any = field(default=None, repr=False)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("_started")
+        data.pop("_otel_span")
+        return data
+
+
+def set_service_name(name: str) -> None:
+    """span에 기록할 프로세스 이름 (예: "streamlit", "mcp-server")"""
+    global _service_name
+    _service_name = name
+
+
+# ============================================
+# span API
+# ============================================
+
+def start_span(name: str, **attributes) -> Span:
+    """
+    span 시작 (현재 context는 바꾸지 않음)
+
+    콜백처럼 시작/종료가 다른 함수에서 일어날 때 사용합니다. 보통은 span()을 사용하세요.
+    """
+    parent = _current_context.get()
+    if parent is None:
+        trace_id, parent_id = secrets.token_hex(16), None
+    else:
+        trace_id, parent_id = parent
+
+    s = Span(
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        name=name,
+        service=_service_name,
+        start_time=time.time(),
+        attributes=dict(attributes),
+        _started=time.perf_counter()
+    )
+
+    exporter = _get_exporter()
+    if exporter is not None:
+        exporter.on_start(s)
+    return s
+
+
+def end_span(s: Span, error: Optional[BaseException] = None) -> None:
+    s.duration_ms = round((time.perf_counter() - s._started) * 1000, 3)
+    if error is not None:
+        s.status = "error"
+        s.error = repr(error)
+
+    exporter = _get_exporter()
+    if exporter is not None:
+        exporter.on_end(s)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    구간 span (with 블록 안에서 시작한 span/Tool 호출은 이 span의 자식)
+
+    사용 예시:
+        with span("rag.search", queries=3) as s:
+            ...
+            s.set(results=10)
+    """
+    s = start_span(name, **attributes)
+    token = _current_context.set((s.trace_id, s.span_id))
+    try:
+        yield s
+    except BaseException as e:
+        end_span(s, e)
+        raise
+    else:
+        end_span(s)
+    finally:
+        _current_context.reset(token)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """함수 실행을 span으로 기록하는 데코레이터 (sync/async 모두 지원)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+# ============================================
+# 프로세스 간 전파
+# ============================================
+
+def current_traceparent() -> str:
+    """현재 span의 traceparent (span 밖이면 빈 문자열)"""
+    context = _current_context.get()
+    return f"00-{context[0]}-{context[1]}-01" if context else ""
+
+
+def parse_traceparent(traceparent: str) -> Optional[Tuple[str, str]]:
+    parts = (traceparent or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def attach(traceparent: str) -> Iterator[None]:
+    """다른 프로세스에서 받은 traceparent를 부모로 설정 (값이 없거나 잘못되면 그대로)"""
+    context = parse_traceparent(traceparent)
+    if context is None:
+        yield
+        return
+
+    token = _current_context.set(context)
+    try:
+        yield
+    finally:
+        _current_context.reset(token)
+
+
+def in_current_context(func: Callable) -> Callable:
+    """
+    현재 contextvars(span)를 이어받아 실행하는 callable 반환
+
+    loop.run_in_executor / ThreadPoolExecutor는 context를 복사하지 않으므로 이걸로 감쌉니다.
+    (asyncio.to_thread는 자동으로 복사)
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+# ============================================
+# 내보내기
+# ============================================
+
+class JsonlExporter:
+    """
+    span 종료 시 JSON 한 줄씩 추가 (여러 프로세스가 같은 파일에 써도 줄 단위로 안전: O_APPEND)
+
+    파일이 max_bytes를 넘으면 {path}.1로 교체하고 새 파일에 이어서 기록합니다.
+    다른 프로세스가 먼저 교체했으면(경로의 inode가 바뀜) 새 파일을 다시 엽니다.
+    """
+
+    def __init__(self, path: str, max_bytes: int = TRACE_JSONL_MAX_BYTES):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._path = path
+        self._max_bytes = max_bytes
+        self._fd = self._open()
+        self._lock = threading.Lock()
+        # 다른 스레드가 기록 중일 때 fork한 자식(프로세스 풀 워커)이 잠긴 lock을 물려받지 않도록 새로 생성
+        os.register_at_fork(after_in_child=self._reset_lock)
+
+    def _reset_lock(self) -> None:
+        self._lock = threading.Lock()
+
+    def on_start(self, s: Span) -> None:
+        pass
+
+    def on_end(self, s: Span) -> None:
+        line = json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._max_bytes:
+                self._rotate_if_needed()
+            os.write(self._fd, line.encode("utf-8"))
+
+    def _open(self) -> int:
+        return os.open(self._path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _rotate_if_needed(self) -> None:
+        current = os.fstat(self._fd)
+        try:
+            on_disk = os.stat(self._path)
+        except FileNotFoundError:
+            on_disk = None
+
+        if on_disk is not None and on_disk.st_ino == current.st_ino and current.st_size < self._max_bytes:
+            return
+
+        if on_disk is not None and on_disk.st_ino == current.st_ino:
+            os.replace(self._path, self._path + ".1")
+
+        os.close(self._fd)
+        self._fd = self._open()
+
+
+class OTelExporter:
+    """
+    OpenTelemetry로 내보내기
+
+    span ID는 이 모듈이 만든 ID를 그대로 쓰지 않고 OTel span의 ID를 사용합니다.
+    (부모는 traceparent와 같은 형식이라 프로세스 간에도 그대로 연결)
+    TracerProvider가 설정되어 있지 않으면 OTLP exporter(OTEL_EXPORTER_OTLP_ENDPOINT)로 설정합니다.
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+
+        self._trace = trace
+        if type(trace.get_tracer_provider()).__name__ == "ProxyTracerProvider":
+            _configure_otel_sdk()
+        self._tracer = trace.get_tracer("observability.tracing")
+
+    def on_start(self, s: Span) -> None:
+        trace = self._trace
+        context = None
+        if s.parent_id:
+            parent = trace.SpanContext(
+                trace_id=int(s.trace_id, 16),
+                span_id=int(s.parent_id, 16),
+                is_remote=True,
+                trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+            )
+            context = trace.set_span_in_context(trace.NonRecordingSpan(parent))
+
+        otel_span = self._tracer.start_span(
+            s.name,
+            context=context,
+            attributes={"service": s.service, **_otel_attributes(s.attributes)},
+            start_time=int(s.start_time * 1e9)
+        )
+        span_context = otel_span.get_span_context()
+        if span_context.is_valid:
+            s.trace_id = format(span_context.trace_id, "032x")
+            s.span_id = format(span_context.span_id, "016x")
+        s._otel_span = otel_span
+
+    def on_end(self, s: Span) -> None:
+        otel_span = s._otel_span
+        if otel_span is None:
+            return
+        otel_span.set_attributes(_otel_attributes(s.attributes))
+        if s.status == "error":
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, s.error))
+        otel_span.end(end_time=int((s.start_time + s.duration_ms / 1000) * 1e9))
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value if isinstance(value, (str, bool, int, float)) else json.dumps(value, ensure_ascii=False, default=str)
+        for key, value in attributes.items()
+        if value is not None
+    }
+
+
+def _configure_otel_sdk() -> None:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+    provider = TracerProvider(resource=Resource.create({"service.name": _service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+_exporter: Any = None
+_exporter_ready = False
+_exporter_lock = threading.Lock()
+
+
+def _get_exporter():
+    global _exporter, _exporter_ready
+
+    if _exporter_ready:
+        return _exporter
+
+    with _exporter_lock:
+        if not _exporter_ready:
+            if TRACE_EXPORT == "otel":
+                try:
+                    _exporter = OTelExporter()
+                except ImportError as e:
+                    print(f"⚠️ OpenTelemetry를 사용할 수 없어 JSONL로 기록합니다: {e}", file=sys.stderr)
+                    _exporter = JsonlExporter(TRACE_JSONL_PATH)
+            elif TRACE_EXPORT == "jsonl":
+                _exporter = JsonlExporter(TRACE_JSONL_PATH)
+            else:
+                _exporter = None
+            _exporter_ready = True
+
+    return _exporter
+
+
+# ============================================
+# 조회
+# ============================================
+
+def read_spans(path: str = TRACE_JSONL_PATH, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """JSONL 파일 끝부분에서 span 읽기 (trace_id 지정 시 해당 요청만)"""
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - TRACE_READ_TAIL_BYTES))
+        lines = f.read().decode("utf-8", errors="ignore").splitlines()
+
+    if size > TRACE_READ_TAIL_BYTES:
+        lines = lines[1:]  # 잘린 첫 줄
+
+    spans = []
+    for line in lines:
+        if trace_id is not None and trace_id not in line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if trace_id is None or data.get("trace_id") == trace_id:
+            spans.append(data)
+    return spans
+
+
+def format_trace(spans: List[Dict[str, Any]]) -> str:
+    """span 목록을 들여쓰기 트리로 (시작 시각 순, 부모 대비 시작 오프셋/소요 시간)"""
+    if not spans:
+        return "(span 없음)"
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_time"]):
+        parent = s.get("parent_id") if s.get("parent_id") in span_ids else None
+        children.setdefault(parent, []).append(s)
+
+    origin = min(s["start_time"] for s in spans)
+    lines = []
+
+    def walk(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            offset_ms = (s["start_time"] - origin) * 1000
+            marker = " ❌" if s.get("status") == "error" else ""
+            lines.append(
+                f"{offset_ms:9.1f}ms {s['duration_ms']:9.1f}ms  {'  ' * depth}{s['name']} [{s['service']}]{marker}"
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "  시작(+ms)    소요(ms)  구간\n" + "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="요청별 구간 소요 시간 보기")
+    parser.add_argument("trace_id", nargs="?", help="생략하면 가장 최근 요청")
+    parser.add_argument("--path", default=TRACE_JSONL_PATH)
+    args = parser.parse_args(argv)
+
+    trace_id = args.trace_id
+    if trace_id is None:
+        spans = read_spans(args.path)
+        roots = [s for s in spans if s.get("parent_id") is None]
+        if not roots:
+            print("기록된 요청이 없습니다.")
+            return
+        trace_id = max(roots, key=lambda s: s["start_time"])["trace_id"]
+
+    print(f"trace_id: {trace_id}")
+    print(format_trace(read_spans(args.path, trace_id)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,223 +1,494 @@
 """
 문서 청킹 및 벡터DB 적재 서비스
-- 각 row를 개별 문서로 저장
-- content만 임베딩 (순수 내용)
+- 각 row(팁)를 섹션(마케팅 전략/문제 상황/해결 방법)별 child chunk로 분할해 저장
+- child chunk의 content만 임베딩 (순수 내용), metadata의 parent_id로 원래 팁에 연결
 - metadata는 Document에 저장 (검색 결과와 함께 반환)
+- FAISS 인덱스와 함께 BM25 역색인(bm25.sqlite) 생성, 새 버전 디렉토리에 기록한 뒤 한 번에 교체
+- CSV를 청크 단위로 읽어 배치별로 임베딩 (전체 문서를 메모리에 올리지 않음)
+- 배치 단위 체크포인트로 중단된 적재 재개
 """
 
+import hashlib
+import json
 import os
 import shutil
 import time
+import uuid
 
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import faiss
 import pandas as pd
-from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from langchain_community.vectorstores.utils import DistanceStrategy
 
+from rag.services.ingest_checkpoint import IngestCheckpoint
 from rag.vectorstore.embeddings import get_embeddings
-
-FAISS_PATH = "./faiss_db"
+from rag.vectorstore.faiss_client import (
+    EXACT_INDEX_NAME,
+    FAISS_PATH,
+    create_version_dir,
+    get_document_count,
+    has_index,
+    migrate_legacy_docstore,
+    needs_migration,
+    open_staging_vectorstore,
+    save_vectorstore,
+)
+from rag.vectorstore.sqlite_docstore import DOCSTORE_NAME, SQLiteDocstore, copy_documents
+from rag.vectorstore.index_factory import (
+    INDEX_TYPES,
+    build_tuned_index,
+    select_index_type,
+)
+
+INDEX_REPORT_NAME = "index_report.json"
 BATCH_SIZE = 7
 DELAY_SECONDS = 10
 
+# 배치 임베딩 실패 시 재시도 (초과하면 실패 행으로 기록)
+MAX_RETRIES = 3
+RETRY_DELAY_SECONDS = 20
+
+# CSV 전처리 청크 크기 (행 단위, 메모리에 동시에 올리는 최대 행 수)
+CSV_CHUNK_SIZE = 100_000
+
+# 본문 섹션 (컬럼명, 머리말) - 이 순서로 이어붙여 page_content 생성
+CONTENT_SECTIONS = [
+    ("content_marketing", "[마케팅 전략]"),
+    ("content_issue", "[문제 상황]"),
+    ("content_solution", "[해결 방법]"),
+]
 
-def ingest_youtube_tips_csv(csv_path: str, append_mode: bool = True) -> int:
+
+def ingest_youtube_tips_csv(
+    csv_path: str,
+    append_mode: bool = True,
+    index_type: str = "auto",
+    resume: bool = False
+) -> int:
     """
     유튜브 팁 CSV를 벡터DB에 적재
 
     저장 방식:
-    - page_content: content만 (임베딩 대상)
+    - page_content: 섹션 하나의 content만 (임베딩 대상)
     - metadata: channel, title, video_link (검색 결과와 함께 반환)
+      + parent_id, section, section_order (검색 시 팁 단위로 다시 묶는 데 사용)
+
+    체크포인트:
+    - 임베딩이 끝난 배치는 FAISS_PATH/ingest_checkpoint에 즉시 기록
+    - resume=True면 기록된 배치는 다시 임베딩하지 않고 재사용, 나머지 배치만 처리
+    - MAX_RETRIES번 재시도 후에도 실패한 배치의 원본 행 번호는 ingest_report.json에 기록
+    - 게시 후에도 실패 배치 기록은 남으므로 resume=True로 다시 실행하면 실패 배치만 재시도
+    - 게시 직후 중단되어 체크포인트가 남은 경우에도 이미 게시된 문서는 다시 추가하지 않음
+    - 이전 실행에서 게시된 배치가 있으면 append_mode와 관계없이 게시된 버전에 이어서 적재
 
     Args:
         csv_path: CSV 파일 경로
         append_mode: True면 기존 데이터에 추가, False면 완전 교체
+        index_type: "auto"(코퍼스 크기로 자동 선택) 또는 INDEX_TYPES 중 하나
+        resume: True면 중단된 적재를 체크포인트부터 재개
 
     Returns:
         적재된 문서 개수
     """
-    df = pd.read_csv(csv_path)
-    print(f"📊 CSV 파일 로드 완료: {len(df)}개 행")
+    if index_type != "auto" and index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 index_type: {index_type} (가능: auto, {', '.join(INDEX_TYPES)})")
+
+    checkpoint = IngestCheckpoint(
+        FAISS_PATH,
+        csv_path,
+        settings={"append_mode": append_mode, "index_type": index_type, "batch_size": BATCH_SIZE},
+        resume=resume
+    )
+
+    embeddings = get_embeddings(task_type="retrieval_document")
 
     # ============================================
-    # 1. video_link별 metadata 수집
+    # 1. 기존 데이터 로드
     # ============================================
-    video_metadata = {}
+    vectorstore = None
 
-    for idx, row in df.iterrows():
-        if pd.isna(row['video_link']) or str(row['video_link']).strip() == '':
-            continue
+    # 이전 실행이 일부 배치를 이미 게시했으면 그 버전에 이어서 적재 (append_mode=False여도 교체하지 않음)
+    resume_published = bool(checkpoint.state.get("published_batches"))
 
-        video_link = str(row['video_link']).strip()
+    # index.pkl만 있는 이전 벡터스토어는 적재 전에 명시적으로 변환 (서버는 변환하지 않음)
+    if append_mode and needs_migration(FAISS_PATH):
+        migrate_legacy_docstore(FAISS_PATH)
 
-        if video_link not in video_metadata:
-            video_metadata[video_link] = {
-                "channel": None,
-                "title": None
-            }
+    # 새 버전 디렉토리 (저장 시 CURRENT 교체로 게시, 그 전까지 서비스에 보이지 않음)
+    version_path = create_version_dir(FAISS_PATH)
 
-        if video_metadata[video_link]["channel"] is None and pd.notna(row.get('channel')):
-            video_metadata[video_link]["channel"] = str(row['channel'])
+    if resume_published:
+        if not has_index(FAISS_PATH):
+            shutil.rmtree(version_path, ignore_errors=True)
+            raise FileNotFoundError(f"이전에 게시된 벡터스토어가 없습니다: {FAISS_PATH} (resume=False로 다시 적재하세요)")
+        print(f"📂 이전에 게시된 벡터스토어에 이어서 적재...")
+        vectorstore = open_staging_vectorstore(FAISS_PATH, embeddings, version_path)
+    elif append_mode and has_index(FAISS_PATH):
+        try:
+            print(f"📂 기존 벡터스토어 로드 중...")
+            vectorstore = open_staging_vectorstore(FAISS_PATH, embeddings, version_path)
+            print(f"✅ 기존 벡터스토어 로드 완료")
+        except Exception as e:
+            print(f"⚠️ 기존 벡터스토어 로드 실패: {e}")
+            vectorstore = None
 
-        if video_metadata[video_link]["title"] is None and pd.notna(row.get('title')):
-            video_metadata[video_link]["title"] = str(row['title'])
+    # 체크포인트에 기록된 배치 복원 (임베딩 호출 없음, 이미 게시된 배치 제외)
+    # committed_docs: 이번 적재로 커밋된 문서 (이전 실행에서 게시된 배치 포함)
+    # added_docs: 그중 아직 게시되지 않아 새로 추가한 문서
+    committed_docs = checkpoint.published_docs()
+    added_docs = 0
+    restored_docs = 0
+    for batch_num in checkpoint.unpublished_batches():
+        vectors, ids, batch_texts, batch_metadatas = checkpoint.load_batch(batch_num)
+        committed_docs += len(ids)
+        restored_docs += len(ids)
+
+        # 저장(게시) 직후 체크포인트 정리 전에 중단된 경우: 이미 게시된 문서는 다시 추가하지 않음
+        keep = _unpublished_positions(vectorstore, ids)
+        if not keep:
+            continue
 
-    # metadata 기본값 설정
-    for video_link, metadata in video_metadata.items():
-        if metadata["channel"] is None:
-            metadata["channel"] = "알 수 없음"
-        if metadata["title"] is None:
-            metadata["title"] = "제목 없음"
+        vectorstore = _add_embedded_batch(
+            vectorstore,
+            embeddings,
+            [batch_texts[k] for k in keep],
+            [vectors[k] for k in keep],
+            [batch_metadatas[k] for k in keep],
+            [ids[k] for k in keep],
+            version_path
+        )
+        added_docs += len(keep)
+
+    if restored_docs:
+        print(f"♻️ 체크포인트 배치 복원 완료: {restored_docs}개 문서 (이미 게시됨 {restored_docs - added_docs}개)")
 
     # ============================================
-    # 2. 각 row를 개별 문서로 생성
+    # 2. CSV → 문서 → 배치 임베딩 (CSV 청크 하나 분량만 메모리에 유지)
     # ============================================
-    texts = []
-    metadatas = []
-    skipped_rows = 0
+    print(f"📝 섹션 단위 child chunk를 {BATCH_SIZE}개씩 임베딩")
+    print(f"   임베딩 대상: 섹션별 content만 (순수 내용)")
+    print(f"   metadata 저장: channel, title, video_link, parent_id, section")
 
-    for idx, row in df.iterrows():
-        if pd.isna(row['video_link']) or str(row['video_link']).strip() == '':
-            skipped_rows += 1
+    stats = {"rows": 0, "skipped": 0, "docs": 0}
+    embedded_any = False
+
+    for batch_num, (batch_texts, batch_metadatas, batch_rows) in enumerate(
+        iter_document_batches(csv_path, BATCH_SIZE, stats), start=1
+    ):
+        if checkpoint.is_committed(batch_num):
             continue
 
-        video_link = str(row['video_link']).strip()
-        channel = video_metadata[video_link]["channel"]
-        title = video_metadata[video_link]["title"]
+        if embedded_any:
+            print(f"  ⏳ {DELAY_SECONDS}초 대기...")
+            time.sleep(DELAY_SECONDS)
+        embedded_any = True
 
-        # content 수집
-        content_parts = []
+        i = (batch_num - 1) * BATCH_SIZE
+        print(f"\n배치 {batch_num}: {len(batch_texts)}개 문서")
 
-        if pd.notna(row.get('content_marketing')):
-            content_parts.append(f"[마케팅 전략]\n{row['content_marketing']}")
+        for j, metadata in enumerate(batch_metadatas):
+            print(f"  - 문서 {i+j+1}: {metadata['channel']} | {metadata['title'][:30]}...")
 
-        if pd.notna(row.get('content_issue')):
-            content_parts.append(f"[문제 상황]\n{row['content_issue']}")
+        for attempt in range(1, MAX_RETRIES + 1):
+            try:
+                vectors = embeddings.embed_documents(batch_texts)
+                break
+            except Exception as e:
+                print(f"  ❌ 배치 {batch_num} 실패 ({attempt}/{MAX_RETRIES}): {e}")
+                if attempt == MAX_RETRIES:
+                    checkpoint.record_failure(batch_num, batch_rows, str(e), attempt)
+                    vectors = None
+                else:
+                    print(f"  ⏳ {RETRY_DELAY_SECONDS}초 대기...")
+                    time.sleep(RETRY_DELAY_SECONDS)
+
+        if vectors is not None:
+            ids = [str(uuid.uuid4()) for _ in batch_texts]
+            checkpoint.commit_batch(batch_num, vectors, ids, batch_rows, batch_texts, batch_metadatas)
+            vectorstore = _add_embedded_batch(vectorstore, embeddings, batch_texts, vectors, batch_metadatas, ids, version_path)
+            committed_docs += len(ids)
+            added_docs += len(ids)
+            print(f"  ✅ 배치 {batch_num} 완료")
 
-        if pd.notna(row.get('content_solution')):
-            content_parts.append(f"[해결 방법]\n{row['content_solution']}")
+    total_docs = stats["docs"]
+    print(f"\n📊 CSV 파일 처리 완료: {stats['rows']}개 행 → {total_docs}개 문서(섹션 단위 child chunk)")
 
-        if not content_parts:
-            skipped_rows += 1
-            continue
+    if stats["skipped"] > 0:
+        print(f"⚠️ 총 {stats['skipped']}개 행 건너뜀")
 
-        # ============================================
-        # 핵심: content만 page_content로 사용 (임베딩 대상)
-        # ============================================
-        combined_content = "\n\n".join(content_parts)
+    if total_docs == 0:
+        print("❌ 적재할 문서가 없습니다.")
+        checkpoint.finish()
+        shutil.rmtree(version_path, ignore_errors=True)
+        return 0
 
-        # page_content: content만 (metadata 제외)
-        text = combined_content
+    # ============================================
+    # 3. 저장
+    # ============================================
+    report = checkpoint.write_report(total_docs, committed_docs)
+
+    if report["failed_rows"]:
+        print(f"⚠️ 최종 실패 {len(report['failed_rows'])}개 행 (원본 행 번호는 {checkpoint.report_path} 참고)")
+
+    if vectorstore and committed_docs:
+        if added_docs:
+            _apply_index_type(vectorstore, index_type, version_path)
+            save_vectorstore(vectorstore, FAISS_PATH, version_path)
+        else:
+            print("♻️ 모든 배치가 이미 게시되어 있어 저장을 건너뜁니다.")
+            shutil.rmtree(version_path, ignore_errors=True)
+        checkpoint.finish()
+        print(f"\n✅ 총 {committed_docs}개 문서 적재 완료!")
+        print(f"📊 벡터스토어 최종 문서 개수: {get_document_count()}개")
+
+        return committed_docs
+    else:
+        shutil.rmtree(version_path, ignore_errors=True)
+        print(f"❌ 적재 실패 (resume=True로 재시도 가능)")
+        return 0
 
-        # metadata: Document에 저장 (검색 결과와 함께 반환)
-        metadata = {
-            "channel": channel,
-            "title": title,
-            "video_link": video_link
-        }
 
-        texts.append(text.strip())
-        metadatas.append(metadata)
+def iter_document_batches(
+    csv_path: str,
+    batch_size: int = BATCH_SIZE,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[List[str], List[Dict[str, str]], List[int]]]:
+    """
+    prepare_tip_documents의 문서를 batch_size개씩 묶어 반환 (CSV 청크 하나 분량만 메모리에 유지)
 
-    if skipped_rows > 0:
-        print(f"⚠️ 총 {skipped_rows}개 행 건너뜀")
+    배치 경계는 CSV 청크와 무관하게 문서 순서로만 정해지므로 같은 CSV면 재개 시에도 배치 번호가 같습니다.
 
-    # ============================================
-    # 3. 적재
-    # ============================================
-    total_docs = len(texts)
+    Args:
+        stats: 주어지면 처리한 행/건너뛴 행/문서 수를 "rows"/"skipped"/"docs"에 누적
+    """
+    texts: List[str] = []
+    metadatas: List[Dict[str, str]] = []
+    rows: List[int] = []
 
-    if total_docs == 0:
-        print("❌ 적재할 문서가 없습니다.")
-        return 0
+    for chunk_texts, chunk_metadatas, chunk_rows, chunk_row_count, chunk_skipped in prepare_tip_documents(csv_path):
+        if stats is not None:
+            stats["rows"] += chunk_row_count
+            stats["skipped"] += chunk_skipped
+            stats["docs"] += len(chunk_texts)
 
-    print(f"📝 총 {total_docs}개 문서 생성 완료")
-    print(f"   임베딩 대상: content만 (순수 내용)")
-    print(f"   metadata 저장: channel, title, video_link")
-    print(f"⏱️ 예상 소요 시간: 약 {(total_docs // BATCH_SIZE) * DELAY_SECONDS // 60 + 1}분")
+        texts.extend(chunk_texts)
+        metadatas.extend(chunk_metadatas)
+        rows.extend(chunk_rows)
 
-    embeddings = get_embeddings(task_type="retrieval_document")
+        start = 0
+        while len(texts) - start >= batch_size:
+            yield texts[start:start + batch_size], metadatas[start:start + batch_size], rows[start:start + batch_size]
+            start += batch_size
 
-    # ============================================
-    # 4. 기존 데이터 로드
-    # ============================================
-    vectorstore = None
+        texts, metadatas, rows = texts[start:], metadatas[start:], rows[start:]
 
-    if append_mode and os.path.exists(FAISS_PATH):
-        try:
-            print(f"📂 기존 벡터스토어 로드 중...")
-            vectorstore = FAISS.load_local(
-                FAISS_PATH,
-                embeddings,
-                allow_dangerous_deserialization=True
-            )
-            print(f"✅ 기존 벡터스토어 로드 완료")
-        except Exception as e:
-            print(f"⚠️ 기존 벡터스토어 로드 실패: {e}")
-            vectorstore = None
+    if texts:
+        yield texts, metadatas, rows
 
-    # ============================================
-    # 5. 배치 처리
-    # ============================================
-    for i in range(0, total_docs, BATCH_SIZE):
-        batch_texts = texts[i:i+BATCH_SIZE]
-        batch_metadatas = metadatas[i:i+BATCH_SIZE]
 
-        batch_num = i // BATCH_SIZE + 1
-        total_batches = (total_docs + BATCH_SIZE - 1) // BATCH_SIZE
-        print(f"\n배치 {batch_num}/{total_batches}: {len(batch_texts)}개 문서")
+def _unpublished_positions(vectorstore: Optional[FAISS], ids: List[str]) -> List[int]:
+    """ids 중 벡터스토어(게시된 docstore의 복사본)에 아직 없는 문서의 위치"""
+    if vectorstore is None:
+        return list(range(len(ids)))
 
-        for j, metadata in enumerate(batch_metadatas):
-            print(f"  - 문서 {i+j+1}: {metadata['channel']} | {metadata['title'][:30]}...")
+    existing = vectorstore.docstore.mget(ids)
+    return [k for k, doc_id in enumerate(ids) if doc_id not in existing]
 
-        batch_documents = [
-            Document(page_content=text, metadata=metadata)
-            for text, metadata in zip(batch_texts, batch_metadatas)
-        ]
 
-        try:
-            if vectorstore is None:
-                vectorstore = FAISS.from_documents(
-                    batch_documents,
-                    embeddings,
-                    distance_strategy=DistanceStrategy.COSINE
-                )
-            else:
-                vectorstore.add_documents(batch_documents)
+def _add_embedded_batch(
+    vectorstore: Optional[FAISS],
+    embeddings,
+    texts: List[str],
+    vectors,
+    metadatas: List[Dict[str, str]],
+    ids: List[str],
+    version_path: str
+) -> FAISS:
+    """
+    이미 임베딩된 배치를 벡터스토어에 추가
 
-            print(f"  ✅ 배치 {batch_num} 완료")
-        except Exception as e:
-            print(f"  ❌ 배치 {batch_num} 실패: {e}")
-            print(f"  ⏳ 20초 대기...")
-            time.sleep(20)
+    없으면 새로 생성하고, docstore는 version_path의 SQLiteDocstore로 옮김
+    (문서 텍스트를 메모리에 쌓지 않고, 재개 시 이미 게시된 ID 조회(mget)도 같은 방식으로 처리)
+    """
+    text_embeddings = [(text, list(map(float, vector))) for text, vector in zip(texts, vectors)]
+
+    if vectorstore is None:
+        vectorstore = FAISS.from_embeddings(
+            text_embeddings,
+            embeddings,
+            metadatas=metadatas,
+            ids=ids,
+            distance_strategy=DistanceStrategy.COSINE
+        )
+
+        docstore = SQLiteDocstore(os.path.join(version_path, DOCSTORE_NAME), reset=True)
+        copy_documents(docstore, vectorstore.docstore, vectorstore.index_to_docstore_id)
+        vectorstore.docstore = docstore
+        vectorstore.index_to_docstore_id = docstore.index_map
+        return vectorstore
+
+    vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+    return vectorstore
+
+
+def prepare_tip_documents(
+    csv_path: str,
+    chunksize: int = CSV_CHUNK_SIZE
+) -> Iterator[Tuple[List[str], List[Dict[str, str]], List[int], int, int]]:
+    """
+    유튜브 팁 CSV를 청크 단위로 읽어 적재용 문서로 변환 (iterrows 없이 컬럼 연산)
+
+    1. video_link/channel/title 컬럼만 읽어 video_link별 첫 번째 값 수집 (groupby first)
+    2. 본문 컬럼을 청크 단위로 읽어 섹션 문자열을 벡터 연산으로 생성
+    3. video_link 없음 / 본문 없음 행은 boolean mask로 제외
+    4. 팁(행) 하나를 섹션별 child chunk로 분할, parent_id로 원래 팁에 연결
+
+    Yields:
+        (texts, metadatas, source_rows, chunk_row_count, skipped_row_count)
+        - texts/metadatas: 섹션 단위 child chunk (같은 팁 안에서는 CONTENT_SECTIONS 순서)
+        - source_rows: 각 child chunk의 원본 CSV 행 번호 (0부터, 헤더 제외)
+    """
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    video_metadata = _collect_video_metadata(csv_path, columns, chunksize)
+
+    content_columns = [column for column, _ in CONTENT_SECTIONS if column in columns]
+
+    for chunk in pd.read_csv(csv_path, usecols=["video_link", *content_columns], chunksize=chunksize):
+        video_links = chunk["video_link"].astype("string").str.strip()
+        has_link = video_links.notna() & (video_links != "")
+
+        sections = {}
+        combined = pd.Series("", index=chunk.index, dtype=object)
+        for column, header in CONTENT_SECTIONS:
+            if column not in chunk:
+                continue
+
+            values = chunk[column]
+            section = (header + "\n" + values.astype(str)).where(values.notna(), "")
+            separator = pd.Series("", index=chunk.index, dtype=object).mask((combined != "") & (section != ""), "\n\n")
+            combined = combined + separator + section
+            sections[column] = section
+
+        # 핵심: content만 page_content로 사용 (임베딩 대상)
+        keep = has_link & (combined != "")
+
+        # parent_id: video_link + 팁 전체 내용 해시 (같은 팁은 항상 같은 ID)
+        parent_ids = (video_links[keep].astype(object) + "\n" + combined[keep].str.strip()).map(_parent_id)
+
+        children = []
+        for order, (column, _) in enumerate(CONTENT_SECTIONS):
+            if column not in sections:
+                continue
+
+            section = sections[column][keep]
+            section = section[section != ""]
+            children.append(pd.DataFrame({
+                "row": section.index,
+                "order": order,
+                "section": column,
+                "text": section.str.strip().values,
+            }))
+
+        if not children:
+            yield [], [], [], len(chunk), int((~keep).sum())
             continue
 
-        if i + BATCH_SIZE < total_docs:
-            print(f"  ⏳ {DELAY_SECONDS}초 대기...")
-            time.sleep(DELAY_SECONDS)
+        children = pd.concat(children, ignore_index=True).sort_values(["row", "order"], kind="stable")
 
-    # ============================================
-    # 6. 저장
-    # ============================================
-    if vectorstore:
-        vectorstore.save_local(FAISS_PATH)
-        print(f"\n✅ 총 {total_docs}개 문서 적재 완료!")
+        child_links = video_links.loc[children["row"]].astype(object)
+        child_metadata = video_metadata.reindex(child_links)
 
-        try:
-            final_vectorstore = FAISS.load_local(
-                FAISS_PATH,
-                embeddings,
-                allow_dangerous_deserialization=True
+        texts = children["text"].tolist()
+        metadatas = [
+            {
+                "channel": channel,
+                "title": title,
+                "video_link": video_link,
+                "parent_id": parent_id,
+                "section": section,
+                "section_order": int(order)
+            }
+            for channel, title, video_link, parent_id, section, order in zip(
+                child_metadata["channel"].tolist(),
+                child_metadata["title"].tolist(),
+                child_links.tolist(),
+                parent_ids.loc[children["row"]].tolist(),
+                children["section"].tolist(),
+                children["order"].tolist()
             )
-            total_count = final_vectorstore.index.ntotal
-            print(f"📊 벡터스토어 최종 문서 개수: {total_count}개")
-        except:
-            pass
+        ]
 
-        return total_docs
-    else:
-        print(f"❌ 적재 실패")
-        return 0
+        yield texts, metadatas, children["row"].tolist(), len(chunk), int((~keep).sum())
+
+
+def _parent_id(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _collect_video_metadata(csv_path: str, columns, chunksize: int) -> pd.DataFrame:
+    """video_link별 channel/title (첫 번째 비어있지 않은 값, 없으면 기본값)"""
+    metadata_columns = [column for column in ("channel", "title") if column in columns]
+    video_metadata = pd.DataFrame(columns=["channel", "title"], dtype=object)
+
+    for chunk in pd.read_csv(csv_path, usecols=["video_link", *metadata_columns], chunksize=chunksize):
+        video_links = chunk["video_link"].astype("string").str.strip()
+        chunk = chunk.assign(video_link=video_links)[video_links.notna() & (video_links != "")]
+
+        first_values = chunk.groupby("video_link", sort=False)[metadata_columns].first()
+        first_values = first_values.reindex(columns=["channel", "title"]).astype(object)
+
+        # 앞 청크에서 이미 찾은 값 우선, 비어있는 값만 이번 청크로 채움
+        video_metadata = video_metadata.combine_first(first_values) if len(video_metadata) else first_values
+
+    # metadata 기본값 설정
+    for column, default in (("channel", "알 수 없음"), ("title", "제목 없음")):
+        values = video_metadata[column]
+        video_metadata[column] = values.astype(str).where(values.notna(), default).astype(object)
+
+    return video_metadata
+
+
+def _apply_index_type(vectorstore: FAISS, index_type: str, version_path: str) -> None:
+    """
+    적재가 끝난 정확 검색(flat) 인덱스를 index_type 인덱스로 교체
+
+    - 원본 flat 인덱스는 version_path에 EXACT_INDEX_NAME으로 별도 저장 (추가 적재/재학습용)
+    - 근사 인덱스는 인덱스에 넣지 않은 held-out 벡터로 flat 대비 recall@k를 측정해 nprobe/efSearch 튜닝
+    - 측정 결과(운영점)는 version_path에 INDEX_REPORT_NAME으로 저장
+    """
+    exact_index = vectorstore.index
+    num_vectors = exact_index.ntotal
+
+    if index_type == "auto":
+        index_type = select_index_type(num_vectors)
+        print(f"🔧 인덱스 타입 자동 선택: {index_type} ({num_vectors}개 벡터)")
+
+    if index_type == "flat":
+        return
+
+    vectors = exact_index.reconstruct_n(0, num_vectors)
+
+    print(f"📏 {index_type} 검색 품질 측정 (flat 대비, held-out 쿼리)")
+    approx_index, tuning = build_tuned_index(vectors, index_type, metric_type=exact_index.metric_type)
+    # 학습 데이터가 부족하면 다른 타입으로 대체되므로 실제 사용한 타입을 기록
+    index_type = tuning.pop("index_type")
+
+    faiss.write_index(exact_index, os.path.join(version_path, EXACT_INDEX_NAME))
+    vectorstore.index = approx_index
+
+    report = {
+        "index_type": index_type,
+        "num_vectors": num_vectors,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **tuning
+    }
+    with open(os.path.join(version_path, INDEX_REPORT_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if tuning["param"]:
+        print(f"✅ {index_type} 인덱스 적용: {tuning['param']}={tuning['value']}")
 
 
 def clear_vectorstore():
@@ -0,0 +1,185 @@
+"""
+적재 체크포인트 모듈
+- 임베딩이 끝난 배치(벡터, 문서 ID, 원본 행 번호, 텍스트/metadata)를 디스크에 기록
+- 중단된 적재를 마지막으로 기록된 배치부터 재개 (이미 임베딩한 배치는 재사용)
+- 재시도 후에도 실패한 배치의 원본 행 번호를 리포트로 기록
+- 게시 후에도 실패 배치 기록은 남겨 재개 시 실패 배치만 다시 시도
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+CHECKPOINT_DIR_NAME = "ingest_checkpoint"
+STATE_NAME = "state.json"
+REPORT_NAME = "ingest_report.json"
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def csv_fingerprint(csv_path: str) -> str:
+    """CSV 파일 식별값 (크기 + 앞 1MB 해시) - 다른 파일로 재개하는 것을 방지"""
+    digest = hashlib.sha1()
+    with open(csv_path, "rb") as f:
+        digest.update(f.read(1024 * 1024))
+    return f"{os.path.getsize(csv_path)}:{digest.hexdigest()}"
+
+
+class IngestCheckpoint:
+    """
+    배치 단위 적재 체크포인트
+
+    디렉토리 구조:
+        {faiss_path}/ingest_checkpoint/
+            state.json              # 설정 + 커밋된 배치(문서 수) + 게시된 배치 + 실패 배치
+            batch_000001.npz        # vectors, rows
+            batch_000001.json       # ids, texts, metadatas
+    """
+
+    def __init__(self, faiss_path: str, csv_path: str, settings: Dict[str, Any], resume: bool = False):
+        self.directory = os.path.join(faiss_path, CHECKPOINT_DIR_NAME)
+        self.state_path = os.path.join(self.directory, STATE_NAME)
+        self.report_path = os.path.join(faiss_path, REPORT_NAME)
+
+        fingerprint = csv_fingerprint(csv_path)
+        previous = self._load_state()
+
+        if resume and previous is not None:
+            if previous["csv_fingerprint"] != fingerprint or previous["settings"] != settings:
+                raise ValueError(
+                    "체크포인트와 CSV 파일/적재 설정이 다릅니다. "
+                    "resume=False로 처음부터 다시 적재하세요."
+                )
+            self.state = previous
+            print(f"♻️ 체크포인트에서 재개: {len(self.state['committed_batches'])}개 배치 완료됨")
+            return
+
+        if resume:
+            print("⚠️ 재개할 체크포인트가 없어 처음부터 적재합니다.")
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.state = {
+            "csv_path": csv_path,
+            "csv_fingerprint": fingerprint,
+            "settings": settings,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "committed_batches": [],
+            "batch_docs": {},
+            "published_batches": [],
+            "failed_batches": {}
+        }
+        _write_json_atomic(self.state_path, self.state)
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _batch_path(self, batch_num: int, ext: str) -> str:
+        return os.path.join(self.directory, f"batch_{batch_num:06d}.{ext}")
+
+    def is_committed(self, batch_num: int) -> bool:
+        return batch_num in self.state["committed_batches"]
+
+    def unpublished_batches(self) -> List[int]:
+        """커밋되었지만 아직 벡터스토어에 게시되지 않은 배치 (재개 시 복원 대상)"""
+        published = set(self.state.get("published_batches", []))
+        return sorted(n for n in self.state["committed_batches"] if n not in published)
+
+    def published_docs(self) -> int:
+        """이전 실행에서 이미 게시된 배치의 문서 수 (재개 시 리포트/반환값에 합산)"""
+        batch_docs = self.state.get("batch_docs", {})
+        return sum(batch_docs.get(str(n), 0) for n in self.state.get("published_batches", []))
+
+    def commit_batch(
+        self,
+        batch_num: int,
+        vectors: List[List[float]],
+        ids: List[str],
+        rows: List[int],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """배치 결과를 기록한 뒤 state에 커밋 (기록 도중 중단되면 미커밋 상태로 남음)"""
+        npz_tmp_path = self._batch_path(batch_num, "tmp.npz")
+        np.savez(npz_tmp_path, vectors=np.asarray(vectors, dtype=np.float32), rows=np.asarray(rows, dtype=np.int64))
+        os.replace(npz_tmp_path, self._batch_path(batch_num, "npz"))
+
+        _write_json_atomic(self._batch_path(batch_num, "json"), {
+            "ids": ids,
+            "texts": texts,
+            "metadatas": metadatas
+        })
+
+        self.state["committed_batches"].append(batch_num)
+        self.state.setdefault("batch_docs", {})[str(batch_num)] = len(ids)
+        self.state["failed_batches"].pop(str(batch_num), None)
+        _write_json_atomic(self.state_path, self.state)
+
+    def record_failure(self, batch_num: int, rows: List[int], error: str, attempts: int) -> None:
+        """재시도 후에도 실패한 배치 기록 (재개 시 다시 시도)"""
+        self.state["failed_batches"][str(batch_num)] = {
+            "rows": rows,
+            "error": error,
+            "attempts": attempts
+        }
+        _write_json_atomic(self.state_path, self.state)
+
+    def load_batch(self, batch_num: int) -> Tuple[np.ndarray, List[str], List[str], List[Dict[str, Any]]]:
+        """커밋된 배치의 (vectors, ids, texts, metadatas)"""
+        with np.load(self._batch_path(batch_num, "npz")) as data:
+            vectors = data["vectors"]
+        with open(self._batch_path(batch_num, "json"), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return vectors, payload["ids"], payload["texts"], payload["metadatas"]
+
+    def failed_rows(self) -> List[int]:
+        return sorted(row for failure in self.state["failed_batches"].values() for row in failure["rows"])
+
+    def write_report(self, total_docs: int, committed_docs: int) -> Dict[str, Any]:
+        """적재 결과 리포트 (영구 실패한 원본 행 번호 포함) 저장"""
+        report = {
+            "csv_path": self.state["csv_path"],
+            "started_at": self.state["started_at"],
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "total_docs": total_docs,
+            "committed_docs": committed_docs,
+            "failed_rows": self.failed_rows(),
+            "failed_batches": self.state["failed_batches"]
+        }
+        _write_json_atomic(self.report_path, report)
+        return report
+
+    def finish(self) -> None:
+        """
+        벡터스토어 게시 후 호출
+
+        - 실패 배치가 없으면 체크포인트 삭제
+        - 있으면 배치 파일만 삭제하고 커밋된 배치를 게시됨으로 기록 (실패 배치 기록은 유지)
+          → resume=True로 다시 실행하면 게시된 배치는 건너뛰고 실패 배치만 다시 시도
+        """
+        if not self.state["failed_batches"]:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return
+
+        self.state["published_batches"] = sorted(self.state["committed_batches"])
+        _write_json_atomic(self.state_path, self.state)
+
+        for name in os.listdir(self.directory):
+            if name.startswith("batch_"):
+                os.remove(os.path.join(self.directory, name))
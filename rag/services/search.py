@@ -1,35 +1,91 @@
 """
 벡터DB 검색 서비스
 LLM 전략과 RAG content 간 유사도 검색
+- vector: 임베딩 코사인 유사도 (FAISS)
+- lexical: BM25 키워드 검색 (한국어 토큰화)
+- hybrid: 두 결과를 Reciprocal Rank Fusion으로 융합 (쿼리 임베딩이 있으면 유사도 임계값 이상 문서만)
+- asearch_context: 이벤트 루프용 비동기 버전
+- 섹션 단위 child chunk로 검색한 뒤 팁(parent_id) 단위로 병합해 반환
+- 시맨틱 캐시: 같은/유사한 쿼리는 FAISS 검색 없이 캐시 결과 반환
+- warm_up: 서버 시작 시 인덱스/캐시를 미리 로드해 첫 검색 지연 제거
 """
 
-from rag.vectorstore.faiss_client import get_vectorstore
-from typing import List, Tuple
+from rag.services.semantic_cache import SemanticCache, get_semantic_cache
+from rag.vectorstore.faiss_client import FAISS_PATH, aget_vectorstore, get_index_version, get_vectorstore, resolve_index_path
+from rag.vectorstore.bm25_index import LexicalHit, get_bm25_index
+from observability.tracing import in_current_context, span, traced
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from langchain.schema import Document
+import asyncio
+import faiss
+import numpy as np
+import os
+import weakref
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Reciprocal Rank Fusion 상수 (1 / (RRF_K + rank))
+RRF_K = 60
+
+# BM25 결과 중 쿼리 토큰(IDF 기준)을 이 비율 이상 포함한 문서만 사용
+LEXICAL_MIN_COVERAGE = 0.6
+
+# 임베딩 호출 생략 조건: 쿼리가 LEXICAL_SKIP_MIN_WORDS 단어 이상이고,
+# 토큰 평균 IDF가 LEXICAL_SKIP_MIN_IDF 이상(드문 키워드)이며, BM25 1위 문서가 IDF의 이 비율 이상을 포함
+LEXICAL_CONFIDENT_COVERAGE = 0.9
+LEXICAL_SKIP_MIN_WORDS = 3
+LEXICAL_SKIP_MIN_IDF = 2.0
+
+# 섹션 단위 child chunk 검색 시 fetch_k의 몇 배를 가져와 팁 단위로 묶을지
+CHILD_FETCH_FACTOR = 3
+
+# 팁 단위로 묶은 결과에 남기는 metadata
+PARENT_METADATA_KEYS = ("channel", "title", "video_link")
+
+# 팁 단위 Document에 검색된 섹션 [(section_order, content)]을 보관하는 metadata 키
+# (여러 쿼리 결과를 merge_parents로 합치는 데 사용, Tool 응답에서는 public_metadata로 제외)
+SECTIONS_METADATA_KEY = "_sections"
+
+# 비동기 검색: 검색 전용 스레드 수, 동시에 진행 가능한 검색 수
+SEARCH_WORKERS = int(os.environ.get("RAG_SEARCH_WORKERS", "4"))
+MAX_CONCURRENT_SEARCHES = int(os.environ.get("RAG_MAX_CONCURRENT_SEARCHES", "8"))
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
 def search_context(
     query: str,
     similarity_threshold: float = 0.7,
-    fetch_k: int = 10
+    fetch_k: int = 10,
+    search_mode: str = "hybrid",
+    skip_embedding_if_confident: bool = True
 ) -> Tuple[str, List[Document]]:
     """
     LLM 전략과 유사한 RAG content 검색
 
     검색 방식:
-    1. query(LLM 전략)를 임베딩
-    2. RAG content와 코사인 유사도 계산
-    3. similarity_threshold 이상인 문서만 반환
+    1. (lexical/hybrid) BM25로 키워드 검색
+       - 드문 키워드 3개 이상으로 된 쿼리를 1위 문서가 거의 모두 포함하면 임베딩 생략 가능
+    2. (vector/hybrid) query(LLM 전략)를 임베딩해 코사인 유사도 계산
+       - similarity_threshold 이상인 문서만 사용
+    3. (hybrid) 두 순위를 Reciprocal Rank Fusion으로 융합
+       - 임베딩한 쿼리는 BM25 순위를 재정렬에만 사용 (임계값 미만 문서는 제외)
+       - 임베딩을 생략한 쿼리/lexical 모드는 유사도 점수가 없으므로 BM25 결과만 반환
 
     Args:
         query: LLM이 수립한 전략
         similarity_threshold: 유사도 임계값 (0~1)
         fetch_k: 최대 검색 개수
+        search_mode: "vector" | "lexical" | "hybrid"
+        skip_embedding_if_confident: BM25 결과가 확실하면 임베딩 호출 생략
 
     Returns:
         Tuple[str, List[Document]]:
             - str: 컨텍스트 텍스트 (표시용)
-            - List[Document]: Document 객체 리스트
-              - doc.page_content: content (순수 내용)
+            - List[Document]: 팁 단위 Document 객체 리스트
+              - doc.page_content: 검색된 섹션의 content (순수 내용)
               - doc.metadata: {"channel": ..., "title": ..., "video_link": ...}
 
     예시:
@@ -40,24 +96,506 @@ def search_context(
             print(doc.page_content)  # "[마케팅 전략]\n쿠폰..."
             print(doc.metadata)      # {"channel": "잘 파는 청년", ...}
     """
+    return search_context_batch(
+        [query],
+        similarity_threshold=similarity_threshold,
+        fetch_k=fetch_k,
+        search_mode=search_mode,
+        skip_embedding_if_confident=skip_embedding_if_confident
+    )[0]
+
+
+def search_context_batch(
+    queries: List[str],
+    similarity_threshold: float = 0.7,
+    fetch_k: int = 10,
+    search_mode: str = "hybrid",
+    skip_embedding_if_confident: bool = True
+) -> List[Tuple[str, List[Document]]]:
+    """
+    여러 쿼리를 한 번에 검색 (search_context의 배치 버전)
+
+    - 쿼리 문자열이 캐시에 있으면 바로 반환 (임베딩/BM25 생략)
+    - 임베딩이 필요한 쿼리만 모아 한 번의 배치 요청으로 임베딩
+    - 임베딩이 캐시 쿼리와 충분히 유사하면 캐시 결과 반환 (FAISS 검색 생략)
+    - FAISS 검색도 쿼리 행렬 하나로 한 번에 수행
+    - 문서는 모든 쿼리의 결과 position을 모아 한 번에 조회
+
+    Returns:
+        쿼리 순서대로 (context, docs) 리스트
+    """
+    _validate_search_mode(search_mode)
+
     vectorstore = get_vectorstore()
 
-    if vectorstore is None:
-        return "", []
+    if vectorstore is None or not queries:
+        return [("", []) for _ in queries]
+
+    with span("rag.search", queries=len(queries), search_mode=search_mode) as s:
+        plan = _plan_search(queries, similarity_threshold, fetch_k, search_mode, skip_embedding_if_confident)
 
-    # FAISS 검색: query와 content 간 유사도 계산
-    docs_with_scores = vectorstore.similarity_search_with_relevance_scores(
-        query,
-        k=fetch_k,
-        score_threshold=similarity_threshold
+        # FAISS 검색: query와 content 간 유사도 계산 (임베딩/검색 모두 1회)
+        query_vectors = []
+        if plan.vector_targets:
+            query_vectors = _embed_queries(vectorstore, [queries[i] for i in plan.vector_targets])
+
+        results = _complete_search(vectorstore, plan, query_vectors, fetch_k, similarity_threshold)
+        s.set(cache_hits=len(queries) - len(plan.pending), embedded=len(plan.vector_targets))
+        return results
+
+
+# ============================================
+# 비동기 검색 (MCP 서버 등 이벤트 루프에서 사용)
+# ============================================
+
+async def asearch_context(
+    query: str,
+    similarity_threshold: float = 0.7,
+    fetch_k: int = 10,
+    search_mode: str = "hybrid",
+    skip_embedding_if_confident: bool = True
+) -> Tuple[str, List[Document]]:
+    """search_context의 비동기 버전 (이벤트 루프를 블로킹하지 않음)"""
+    results = await asearch_context_batch(
+        [query],
+        similarity_threshold=similarity_threshold,
+        fetch_k=fetch_k,
+        search_mode=search_mode,
+        skip_embedding_if_confident=skip_embedding_if_confident
     )
+    return results[0]
+
+
+async def asearch_context_batch(
+    queries: List[str],
+    similarity_threshold: float = 0.7,
+    fetch_k: int = 10,
+    search_mode: str = "hybrid",
+    skip_embedding_if_confident: bool = True
+) -> List[Tuple[str, List[Document]]]:
+    """
+    search_context_batch의 비동기 버전
+
+    - 임베딩: 비동기 임베딩 호출 (aembed_query / aembed_documents)
+    - BM25/FAISS 검색·문서 조회: 검색 전용 스레드 풀에서 실행 (CPU 작업)
+    - 동시에 진행되는 검색 수는 MAX_CONCURRENT_SEARCHES로 제한
+    """
+    _validate_search_mode(search_mode)
+
+    vectorstore = await aget_vectorstore()
+
+    if vectorstore is None or not queries:
+        return [("", []) for _ in queries]
+
+    loop = asyncio.get_running_loop()
+
+    with span("rag.search", queries=len(queries), search_mode=search_mode) as s:
+        async with _get_search_semaphore():
+            # 실행기 스레드는 context를 복사하지 않으므로 현재 span을 넘겨 실행
+            plan = await loop.run_in_executor(
+                _get_search_executor(),
+                in_current_context(_plan_search),
+                queries, similarity_threshold, fetch_k, search_mode, skip_embedding_if_confident
+            )
+
+            query_vectors = []
+            if plan.vector_targets:
+                query_vectors = await _aembed_queries(vectorstore, [queries[i] for i in plan.vector_targets])
+
+            results = await loop.run_in_executor(
+                _get_search_executor(),
+                in_current_context(_complete_search),
+                vectorstore, plan, query_vectors, fetch_k, similarity_threshold
+            )
+
+        s.set(cache_hits=len(queries) - len(plan.pending), embedded=len(plan.vector_targets))
+        return results
+
+
+def warm_up() -> bool:
+    """
+    첫 검색 전에 벡터스토어/BM25 인덱스/시맨틱 캐시/검색 스레드를 미리 준비 (임베딩 API 호출 없음)
+
+    Returns:
+        bool: 벡터스토어 준비 여부 (인덱스가 없으면 False)
+    """
+    vectorstore = get_vectorstore()
+    get_bm25_index(resolve_index_path(FAISS_PATH))
+    get_semantic_cache()
+    _get_search_executor()
+    return vectorstore is not None
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="rag-search")
+    return _search_executor
+
+
+def _get_search_semaphore() -> asyncio.Semaphore:
+    """이벤트 루프별 동시 검색 제한 세마포어"""
+    loop = asyncio.get_running_loop()
+    semaphore = _search_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+        _search_semaphores[loop] = semaphore
+    return semaphore
+
+
+# ============================================
+# 검색 단계 (sync/async 공용)
+# ============================================
+
+@dataclass
+class _SearchPlan:
+    """임베딩 전 단계(캐시 exact 조회 + BM25) 결과"""
+    queries: List[str]
+    params: tuple
+    cache: Optional[SemanticCache]
+    results: List[Optional[Tuple[str, List[Document]]]]  # 캐시 적중 시 채워짐
+    pending: List[int]  # 캐시 미적중 쿼리 인덱스
+    ranked_lists: Dict[int, List[List[int]]]  # pending 쿼리별 BM25 순위 목록
+    vector_targets: List[int]  # 임베딩이 필요한 쿼리 인덱스
+
+
+@traced("rag.plan")
+def _plan_search(
+    queries: List[str],
+    similarity_threshold: float,
+    fetch_k: int,
+    search_mode: str,
+    skip_embedding_if_confident: bool
+) -> _SearchPlan:
+    """1단계: 쿼리 문자열 캐시 조회 → 미적중 쿼리만 BM25 검색"""
+    params = (similarity_threshold, fetch_k, search_mode, skip_embedding_if_confident)
+
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.sync_version(get_index_version())
+
+    results = [cache.get_exact(query, params) if cache is not None else None for query in queries]
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    ranked_lists, targets = _lexical_rankings(
+        [queries[i] for i in pending], fetch_k, search_mode, skip_embedding_if_confident
+    )
+
+    return _SearchPlan(
+        queries=queries,
+        params=params,
+        cache=cache,
+        results=results,
+        pending=pending,
+        ranked_lists=dict(zip(pending, ranked_lists)),
+        vector_targets=[pending[t] for t in targets]
+    )
+
+
+@traced("rag.complete")
+def _complete_search(
+    vectorstore,
+    plan: _SearchPlan,
+    query_vectors: List[List[float]],
+    fetch_k: int,
+    similarity_threshold: float
+) -> List[Tuple[str, List[Document]]]:
+    """2단계: 임베딩 기준 시맨틱 캐시 조회 → 미적중 쿼리만 FAISS 검색/문서 조회 → 캐시 저장"""
+    vectors_by_query = dict(zip(plan.vector_targets, query_vectors))
+
+    if plan.cache is not None:
+        for i, vector in vectors_by_query.items():
+            plan.results[i] = plan.cache.get_similar(vector, plan.params)
+
+    remaining = [i for i in plan.pending if plan.results[i] is None]
+    remaining_targets = [n for n, i in enumerate(remaining) if i in vectors_by_query]
+
+    computed = _rank_and_load(
+        vectorstore,
+        [plan.ranked_lists[i] for i in remaining],
+        remaining_targets,
+        [vectors_by_query[remaining[n]] for n in remaining_targets],
+        fetch_k,
+        similarity_threshold
+    )
+
+    for i, result in zip(remaining, computed):
+        plan.results[i] = result
+        if plan.cache is not None:
+            plan.cache.put(plan.queries[i], plan.params, result, vectors_by_query.get(i))
+
+    return plan.results
+
+
+def _validate_search_mode(search_mode: str) -> None:
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"지원하지 않는 search_mode: {search_mode} (가능: {', '.join(SEARCH_MODES)})")
+
+
+@traced("rag.bm25")
+def _lexical_rankings(
+    queries: List[str],
+    fetch_k: int,
+    search_mode: str,
+    skip_embedding_if_confident: bool
+) -> Tuple[List[List[List[int]]], List[int]]:
+    """
+    BM25 검색 (역색인이 없으면 vector 검색으로 대체)
+
+    Returns:
+        (쿼리별 순위 목록, 벡터 검색이 필요한 쿼리 인덱스)
+    """
+    ranked_lists: List[List[List[int]]] = [[] for _ in queries]
+    run_vector = [search_mode != "lexical"] * len(queries)
+
+    if search_mode != "vector":
+        for i, query in enumerate(queries):
+            lexical_hits = _lexical_hits(query, fetch_k * CHILD_FETCH_FACTOR)
+
+            if lexical_hits is None:
+                run_vector[i] = True
+                continue
+
+            ranked_lists[i].append([hit.position for hit in lexical_hits])
+
+            if skip_embedding_if_confident and _is_confident_lexical(query, lexical_hits):
+                run_vector[i] = False
+
+    return ranked_lists, [i for i, needed in enumerate(run_vector) if needed]
+
+
+def _is_confident_lexical(query: str, lexical_hits: List[LexicalHit]) -> bool:
+    """
+    BM25 결과만으로 충분한지 (임베딩 생략 여부)
+
+    짧은 쿼리("이벤트")나 흔한 단어만 있는 쿼리는 키워드가 일치해도 의미가 모호하므로 항상 임베딩합니다.
+    """
+    if not lexical_hits or len(query.split()) < LEXICAL_SKIP_MIN_WORDS:
+        return False
+
+    top = lexical_hits[0]
+    return top.mean_idf >= LEXICAL_SKIP_MIN_IDF and top.coverage >= LEXICAL_CONFIDENT_COVERAGE
+
+
+@traced("rag.rank_and_load")
+def _rank_and_load(
+    vectorstore,
+    ranked_lists: List[List[List[int]]],
+    vector_targets: List[int],
+    query_vectors: List[List[float]],
+    fetch_k: int,
+    similarity_threshold: float
+) -> List[Tuple[str, List[Document]]]:
+    """
+    벡터 검색 → RRF 융합 → 문서 조회 (전체 쿼리의 position을 한 번에 조회) → 팁 단위 병합
+
+    쿼리 벡터가 있으면 융합 결과에서 similarity_threshold 미만(벡터 결과에 없는) 문서를 제외합니다.
+    """
+    child_k = fetch_k * CHILD_FETCH_FACTOR
+    allowed: Dict[int, set] = {}
+
+    if vector_targets:
+        vector_hits = search_vectors(
+            vectorstore,
+            np.array(query_vectors, dtype=np.float32),
+            child_k,
+            similarity_threshold
+        )
+
+        for i, hits in zip(vector_targets, vector_hits):
+            ranked_lists[i].append([position for position, _ in hits])
+            allowed[i] = {position for position, _ in hits}
+
+    positions_per_query = []
+    for i, ranked in enumerate(ranked_lists):
+        fused = fuse_rankings(ranked)
+        if i in allowed:
+            fused = [position for position in fused if position in allowed[i]]
+        positions_per_query.append(fused[:child_k])
 
     # Document 추출
-    filtered_docs = [doc for doc, score in docs_with_scores]
+    documents = load_documents(
+        vectorstore,
+        list(dict.fromkeys(p for positions in positions_per_query for p in positions))
+    )
+
+    results = []
+    for positions in positions_per_query:
+        filtered_docs = group_by_parent(
+            [documents[position] for position in positions if position in documents]
+        )[:fetch_k]
+        results.append((format_context(filtered_docs), filtered_docs))
+
+    return results
+
+
+@traced("rag.embed")
+def _embed_queries(vectorstore, queries: List[str]) -> List[List[float]]:
+    """쿼리 임베딩 (2개 이상이면 배치 요청 1회)"""
+    if len(queries) == 1:
+        return [vectorstore._embed_query(queries[0])]
+    return vectorstore._embed_documents(queries)
+
+
+@traced("rag.embed")
+async def _aembed_queries(vectorstore, queries: List[str]) -> List[List[float]]:
+    """쿼리 비동기 임베딩 (2개 이상이면 배치 요청 1회)"""
+    if len(queries) == 1:
+        return [await vectorstore._aembed_query(queries[0])]
+    return await vectorstore._aembed_documents(queries)
 
-    # 컨텍스트 생성 (표시용)
+
+def _lexical_hits(query: str, k: int) -> Optional[List[LexicalHit]]:
+    """BM25 결과 (coverage 미달 문서 제외). 역색인이 없으면 None"""
+    bm25_index = get_bm25_index(resolve_index_path(FAISS_PATH))
+
+    if bm25_index is None:
+        return None
+
+    return [hit for hit in bm25_index.search(query, k) if hit.coverage >= LEXICAL_MIN_COVERAGE]
+
+
+@traced("rag.faiss_search")
+def search_vectors(
+    vectorstore,
+    query_vectors: np.ndarray,
+    k: int,
+    similarity_threshold: float
+) -> List[List[Tuple[int, float]]]:
+    """
+    여러 쿼리 벡터를 한 번의 FAISS 검색으로 처리
+
+    Returns:
+        쿼리별 [(FAISS position, 유사도 점수)] (similarity_threshold 이상만)
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(query_vectors)
+
+    distances, indices = vectorstore.index.search(query_vectors, k)
+
+    # 기존 similarity_search_with_relevance_scores와 동일한 점수 변환
+    relevance_score_fn = vectorstore._select_relevance_score_fn()
+
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        hits = []
+        for distance, position in zip(row_distances, row_indices):
+            if position == -1:
+                continue
+            score = relevance_score_fn(float(distance))
+            if score >= similarity_threshold:
+                hits.append((int(position), score))
+        results.append(hits)
+
+    return results
+
+
+def fuse_rankings(ranked_lists: List[List[int]]) -> List[int]:
+    """Reciprocal Rank Fusion: 여러 순위 목록을 하나로 융합"""
+    if not ranked_lists:
+        return []
+    if len(ranked_lists) == 1:
+        return list(ranked_lists[0])
+
+    scores: Dict[int, float] = {}
+    for ranked in ranked_lists:
+        for rank, position in enumerate(ranked):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+@traced("rag.load_documents")
+def load_documents(vectorstore, positions: List[int]) -> Dict[int, Document]:
+    """FAISS position → Document (SQLite docstore면 한 번의 쿼리로 조회)"""
+    if not positions:
+        return {}
+
+    index_map = vectorstore.index_to_docstore_id
+    docstore = vectorstore.docstore
+
+    if hasattr(index_map, "get_many"):
+        doc_ids = index_map.get_many(positions)
+    else:
+        doc_ids = {position: index_map[position] for position in positions}
+
+    if hasattr(docstore, "mget"):
+        docs_by_id = docstore.mget(doc_ids.values())
+    else:
+        docs_by_id = {doc_id: docstore.search(doc_id) for doc_id in doc_ids.values()}
+
+    return {
+        position: docs_by_id[doc_id]
+        for position, doc_id in doc_ids.items()
+        if isinstance(docs_by_id.get(doc_id), Document)
+    }
+
+
+def group_by_parent(docs: List[Document]) -> List[Document]:
+    """
+    섹션 단위 child chunk를 원래 팁(parent_id) 단위로 병합
+
+    - 순위: 팁 안에서 가장 높은 순위의 child 기준
+    - page_content: 검색된 섹션만 CONTENT_SECTIONS 순서로 이어붙임 (검색되지 않은 섹션 제외)
+    - metadata[SECTIONS_METADATA_KEY]: 검색된 섹션 (merge_parents용)
+    - parent_id가 없는 문서(섹션 분할 전 적재)는 그대로 하나의 팁
+    """
+    groups: Dict[str, List[Document]] = {}
+    for doc in docs:
+        parent_id = doc.metadata.get("parent_id") or doc.id or doc.page_content
+        groups.setdefault(parent_id, []).append(doc)
+
+    parents = []
+    for parent_id, children in groups.items():
+        if "parent_id" not in children[0].metadata:
+            parents.extend(children)
+            continue
+
+        parents.append(_parent_document(
+            parent_id,
+            {key: children[0].metadata.get(key) for key in PARENT_METADATA_KEYS},
+            [(child.metadata.get("section_order", 0), child.page_content) for child in children]
+        ))
+
+    return parents
+
+
+def merge_parents(docs: List[Document]) -> Document:
+    """
+    같은 팁(parent_id)의 Document 여러 개를 하나로 병합 (여러 쿼리에서 서로 다른 섹션이 검색된 경우)
+
+    page_content는 검색된 섹션의 합집합을 CONTENT_SECTIONS 순서로 이어붙임
+    """
+    if len(docs) == 1 or any(SECTIONS_METADATA_KEY not in doc.metadata for doc in docs):
+        return docs[0]
+
+    sections = {}
+    for doc in docs:
+        for order, content in doc.metadata[SECTIONS_METADATA_KEY]:
+            sections.setdefault(order, content)
+
+    return _parent_document(docs[0].id, public_metadata(docs[0]), list(sections.items()))
+
+
+def public_metadata(doc: Document) -> Dict:
+    """Tool 응답용 metadata (병합용 내부 키 제외)"""
+    return {key: value for key, value in doc.metadata.items() if key != SECTIONS_METADATA_KEY}
+
+
+def _parent_document(parent_id: str, metadata: Dict, sections: List[Tuple[int, str]]) -> Document:
+    sections = sorted(sections, key=lambda section: section[0])
+    return Document(
+        id=parent_id,
+        page_content="\n\n".join(content for _, content in sections),
+        metadata={**metadata, SECTIONS_METADATA_KEY: sections}
+    )
+
+
+def format_context(docs: List[Document]) -> str:
+    """컨텍스트 생성 (표시용)"""
     context_parts = []
-    for doc in filtered_docs:
+    for doc in docs:
         # metadata + content 조합
         context_parts.append(
             f"채널: {doc.metadata.get('channel', '알 수 없음')}\n"
@@ -66,6 +604,4 @@ def search_context(
             f"{doc.page_content}"
         )
 
-    context = "\n\n---\n\n".join(context_parts)
-
-    return context, filtered_docs
+    return "\n\n---\n\n".join(context_parts)
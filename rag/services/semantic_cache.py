@@ -0,0 +1,183 @@
+"""
+RAG 검색 결과 시맨틱 캐시
+- 쿼리 문자열이 완전히 같으면 임베딩 없이 바로 반환 (exact)
+- 쿼리 임베딩과 코사인 유사도가 임계값 이상인 캐시 쿼리가 있으면 그 결과 반환 (semantic)
+- 최대 개수 초과 시 LRU, 만료 시간(TTL) 초과 시 제거
+- 인덱스 버전(get_index_version)이 바뀌면 전체 무효화
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional, Sequence
+
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.environ.get("RAG_SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("RAG_SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.environ.get("RAG_SEMANTIC_CACHE_TTL", "3600"))
+
+
+@dataclass
+class _CacheEntry:
+    query: str
+    params: Hashable
+    vector: Optional[np.ndarray]  # L2 정규화된 쿼리 벡터 (임베딩 없이 처리된 쿼리는 None)
+    result: Any
+    created_at: float
+
+
+class SemanticCache:
+    """
+    쿼리 → 검색 결과 캐시 (스레드 안전)
+
+    params: 결과에 영향을 주는 검색 파라미터 (threshold, fetch_k, search_mode 등).
+    params가 같은 항목끼리만 매칭합니다.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._version: Optional[str] = None
+
+        # 유사도 계산용 벡터 행렬 (항목이 바뀌면 다시 생성)
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list = []
+
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def sync_version(self, version: str) -> None:
+        """인덱스 버전이 바뀌었으면 전체 무효화"""
+        with self._lock:
+            if self._version != version:
+                if self._entries:
+                    self.stats["invalidations"] += 1
+                self._entries.clear()
+                self._matrix = None
+                self._version = version
+
+    def get_exact(self, query: str, params: Hashable) -> Optional[Any]:
+        """쿼리 문자열이 같은 캐시 결과 (임베딩 전 단계)"""
+        key = (params, query)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return entry.result
+
+    def get_similar(self, vector: Sequence[float], params: Hashable) -> Optional[Any]:
+        """임베딩이 임계값 이상으로 유사한 캐시 결과 (가장 유사한 항목)"""
+        query_vector = _normalize(vector)
+
+        with self._lock:
+            self._evict_expired()
+            matrix, keys = self._similarity_matrix()
+
+            if matrix is None or matrix.shape[1] != query_vector.shape[0]:
+                self.stats["misses"] += 1
+                return None
+
+            similarities = matrix @ query_vector
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.similarity_threshold:
+                    break
+                key = keys[i]
+                if key[0] != params:
+                    continue
+
+                self._entries.move_to_end(key)
+                self.stats["semantic_hits"] += 1
+                return self._entries[key].result
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, params: Hashable, result: Any, vector: Optional[Sequence[float]] = None) -> None:
+        key = (params, query)
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(
+                query=query,
+                params=params,
+                vector=_normalize(vector) if vector is not None else None,
+                result=result,
+                created_at=time.monotonic()
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: _CacheEntry) -> bool:
+        return time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _remove(self, key: tuple) -> None:
+        del self._entries[key]
+        self._matrix = None
+
+    def _evict_expired(self) -> None:
+        expired = [key for key, entry in self._entries.items() if self._expired(entry)]
+        for key in expired:
+            self._remove(key)
+            self.stats["evictions"] += 1
+
+    def _similarity_matrix(self):
+        if self._matrix is None:
+            self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+            if not self._matrix_keys:
+                return None, []
+            self._matrix = np.stack([self._entries[key].vector for key in self._matrix_keys])
+        return self._matrix, self._matrix_keys
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm > 0 else array
+
+
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """프로세스 공용 시맨틱 캐시 (RAG_SEMANTIC_CACHE=0이면 None)"""
+    global _semantic_cache
+
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+        return _semantic_cache
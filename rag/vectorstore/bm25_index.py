@@ -0,0 +1,243 @@
+"""
+BM25 역색인 모듈 (한국어 토큰화)
+- docstore.sqlite의 문서로 bm25.sqlite 역색인 생성
+- FAISS position 단위로 색인하므로 벡터 검색 결과와 바로 융합 가능
+- 키워드 중심 쿼리("배달앱 리뷰 이벤트")는 임베딩 없이 응답 가능
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from rag.vectorstore.sqlite_docstore import DOCSTORE_NAME, SQLiteDocstore
+
+BM25_NAME = "bm25.sqlite"
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# 명사 뒤에 붙는 조사/어미 (긴 것부터 매칭)
+_KOREAN_SUFFIXES = sorted([
+    "에서는", "에게서", "으로는", "으로서", "으로써", "이라는", "이라고",
+    "에서", "에게", "으로", "이나", "부터", "까지", "처럼", "보다", "라는", "하는", "하고", "이다", "해서",
+    "은", "는", "이", "가", "을", "를", "에", "의", "와", "과", "도", "로", "만", "나",
+], key=len, reverse=True)
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tf INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_lengths (
+    position INTEGER PRIMARY KEY,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _strip_suffix(word: str) -> str:
+    for suffix in _KOREAN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize_korean(text: str) -> List[str]:
+    """
+    한국어 BM25용 토큰화
+
+    - 한글/영숫자 단위로 분리 후 조사 제거 ("고객이" → "고객")
+    - 3글자 이상 한글 어간은 음절 bigram 추가 ("배달앱" → "배달앱", "배달", "달앱")
+      → 띄어쓰기가 다른 복합명사("배달 앱")도 매칭
+    """
+    tokens = []
+
+    for word in _TOKEN_PATTERN.findall(str(text).lower()):
+        if word[0] < "가":
+            tokens.append(word)
+            continue
+
+        stem = _strip_suffix(word)
+        tokens.append(stem)
+
+        if len(stem) >= 3:
+            tokens.extend(stem[i:i + 2] for i in range(len(stem) - 1))
+
+    return tokens
+
+
+@dataclass
+class LexicalHit:
+    position: int
+    score: float
+    coverage: float  # 쿼리 토큰 IDF 중 해당 문서가 포함한 비율 (0~1)
+    mean_idf: float  # 쿼리 토큰 평균 IDF (흔한 단어만 있는 쿼리면 낮음)
+
+
+class BM25Index:
+    """SQLite 기반 BM25 역색인 (조회 시 쿼리 토큰의 posting만 읽음)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        self.num_docs = int(meta.get("num_docs", 0))
+        self.avg_length = meta.get("avg_length", 0.0) or 1.0
+
+    def _idf(self, df: int) -> float:
+        return math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10) -> List[LexicalHit]:
+        """BM25 점수 상위 k개 (position, score, coverage, mean_idf) 반환"""
+        query_terms = list(dict.fromkeys(tokenize_korean(query)))
+        if not query_terms or self.num_docs == 0:
+            return []
+
+        placeholders = ",".join("?" * len(query_terms))
+
+        with self._lock:
+            dfs = dict(self._conn.execute(
+                f"SELECT term, df FROM terms WHERE term IN ({placeholders})", query_terms
+            ).fetchall())
+            postings = self._conn.execute(
+                f"SELECT term, position, tf FROM postings WHERE term IN ({placeholders})", query_terms
+            ).fetchall()
+
+        if not postings:
+            return []
+
+        idfs = {term: self._idf(dfs.get(term, 0)) for term in query_terms}
+        total_idf = sum(idfs.values())
+        mean_idf = total_idf / len(query_terms)
+
+        positions = list({position for _, position, _ in postings})
+        lengths = self._doc_lengths(positions)
+
+        scores: Dict[int, float] = {}
+        matched_idf: Dict[int, float] = {}
+
+        for term, position, tf in postings:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(position, self.avg_length) / self.avg_length)
+            scores[position] = scores.get(position, 0.0) + idfs[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            matched_idf[position] = matched_idf.get(position, 0.0) + idfs[term]
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+        return [
+            LexicalHit(position=position, score=score, coverage=matched_idf[position] / total_idf, mean_idf=mean_idf)
+            for position, score in ranked
+        ]
+
+    def _doc_lengths(self, positions: List[int]) -> Dict[int, int]:
+        lengths = {}
+        # SQLite 파라미터 개수 제한을 피하기 위해 나눠서 조회
+        for i in range(0, len(positions), 500):
+            chunk = positions[i:i + 500]
+            with self._lock:
+                lengths.update(self._conn.execute(
+                    f"SELECT position, length FROM doc_lengths WHERE position IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall())
+        return lengths
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_bm25_index(path: str) -> int:
+    """
+    docstore.sqlite의 모든 문서로 bm25.sqlite 생성 (임시 파일 기록 후 교체)
+
+    적재 시 게시 전 버전 디렉토리에서만 호출합니다. (서버는 생성하지 않음)
+
+    Returns:
+        색인된 문서 개수
+    """
+    docstore = SQLiteDocstore(os.path.join(path, DOCSTORE_NAME))
+    tmp_path = os.path.join(path, BM25_NAME + ".tmp")
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(_SCHEMA)
+
+    dfs: Counter = Counter()
+    num_docs = 0
+    total_length = 0
+
+    for position, doc in docstore.iter_documents():
+        term_counts = Counter(tokenize_korean(doc.page_content))
+        conn.executemany(
+            "INSERT INTO postings (term, position, tf) VALUES (?, ?, ?)",
+            [(term, position, tf) for term, tf in term_counts.items()]
+        )
+        conn.execute(
+            "INSERT INTO doc_lengths (position, length) VALUES (?, ?)",
+            (position, sum(term_counts.values()))
+        )
+        dfs.update(term_counts.keys())
+        num_docs += 1
+        total_length += sum(term_counts.values())
+
+    docstore.close()
+
+    conn.executemany("INSERT INTO terms (term, df) VALUES (?, ?)", dfs.items())
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?)",
+        [("num_docs", num_docs), ("avg_length", total_length / max(1, num_docs))]
+    )
+    conn.execute("CREATE INDEX idx_postings_term ON postings (term)")
+    conn.commit()
+    conn.close()
+
+    os.replace(tmp_path, os.path.join(path, BM25_NAME))
+    print(f"🔤 BM25 역색인 생성 완료: {num_docs}개 문서, {len(dfs)}개 토큰")
+    return num_docs
+
+
+_bm25_lock = threading.Lock()
+# retired: 직전 버전 역색인 (진행 중인 검색이 끝나도록 다음 교체 때 연결을 닫음)
+_bm25_cache = {"version": None, "index": None, "retired": None}
+
+
+def get_bm25_index(path: str) -> Optional[BM25Index]:
+    """
+    BM25Index 반환 (역색인 파일/버전 디렉토리가 바뀌면 다시 로드)
+
+    path는 서비스 중인 버전 디렉토리 (faiss_client.resolve_index_path).
+    읽기 전용: bm25.sqlite는 적재 시에만 생성하며, 없으면 None (벡터 검색으로 대체).
+    """
+    bm25_path = os.path.join(path, BM25_NAME)
+
+    if not os.path.exists(bm25_path):
+        return None
+
+    with _bm25_lock:
+        version = (os.path.abspath(bm25_path), os.stat(bm25_path).st_mtime_ns)
+        if _bm25_cache["version"] != version:
+            if _bm25_cache["retired"] is not None:
+                _bm25_cache["retired"].close()
+            _bm25_cache["retired"] = _bm25_cache["index"]
+            _bm25_cache["index"] = BM25Index(bm25_path)
+            _bm25_cache["version"] = version
+
+        return _bm25_cache["index"]
@@ -1,19 +1,168 @@
 """
-Gemini 임베딩 초기화 모듈
+임베딩 초기화 모듈
+- gemini: Gemini 임베딩 API (기본값)
+- cached: Gemini 임베딩 + SQLite 캐시 (캐시에 있으면 API 호출 없음)
+- local: 해시 기반 로컬 임베딩 (API 키/네트워크 불필요, 벤치마크·오프라인용)
+
+RAG_EMBEDDING_PROVIDER 환경변수로 선택
 """
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from typing import Callable, Dict, List, Optional
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+EMBEDDING_PROVIDERS = ("gemini", "cached", "local")
+EMBEDDING_PROVIDER = os.environ.get("RAG_EMBEDDING_PROVIDER", "gemini")
+
+GEMINI_MODEL = "models/gemini-embedding-001"
+
+# cached 모드의 SQLite 캐시 파일
+EMBEDDING_CACHE_PATH = os.environ.get("RAG_EMBEDDING_CACHE", "./.cache/embeddings.sqlite")
 
-def get_embeddings(task_type: str = "retrieval_document"):
+# local 모드의 벡터 차원
+LOCAL_EMBEDDING_DIM = 768
+
+def get_embeddings(task_type: str = "retrieval_document", provider: Optional[str] = None) -> Embeddings:
     """
-    GoogleGenerativeAIEmbeddings 인스턴스 반환
+    임베딩 인스턴스 반환
 
     Args:
         task_type: "retrieval_document" (적재) 또는 "retrieval_query" (조회)
+        provider: "gemini" | "cached" | "local" (None이면 RAG_EMBEDDING_PROVIDER)
 
     Returns:
-        GoogleGenerativeAIEmbeddings 인스턴스
+        Embeddings 인스턴스
     """
+    provider = provider or EMBEDDING_PROVIDER
+
+    if provider == "gemini":
+        return _gemini_embeddings(task_type)
+    if provider == "cached":
+        return CachedEmbeddings(
+            lambda: _gemini_embeddings(task_type),
+            EMBEDDING_CACHE_PATH,
+            namespace=f"{GEMINI_MODEL}:{task_type}"
+        )
+    if provider == "local":
+        return LocalHashEmbeddings()
+
+    raise ValueError(f"지원하지 않는 임베딩 provider: {provider} (가능: {', '.join(EMBEDDING_PROVIDERS)})")
+
+def _gemini_embeddings(task_type: str) -> Embeddings:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
     return GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-001",
+        model=GEMINI_MODEL,
         task_type=task_type
     )
+
+
+class LocalHashEmbeddings(Embeddings):
+    """
+    해시 기반 로컬 임베딩 (feature hashing)
+
+    BM25와 같은 한국어 토큰을 해시로 고정 차원에 투영한 뒤 L2 정규화합니다.
+    의미 유사도는 Gemini보다 약하지만 결정적이고 네트워크가 필요 없습니다.
+    """
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        from rag.vectorstore.bm25_index import tokenize_korean
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts: Dict[str, int] = {}
+        for token in tokenize_korean(text):
+            counts[token] = counts.get(token, 0) + 1
+
+        for token, count in counts.items():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    SQLite 캐시를 거치는 임베딩
+
+    - 키: sha1(namespace + 텍스트), 값: float32 벡터
+    - 캐시에 없는 텍스트만 모아 한 번에 원본 임베딩 호출
+    - 원본 임베딩은 캐시 미스가 있을 때만 생성 (전부 캐시에 있으면 API 키 불필요)
+    """
+
+    def __init__(self, base_factory: Callable[[], Embeddings], cache_path: str, namespace: str):
+        self._base_factory = base_factory
+        self._base: Optional[Embeddings] = None
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\n{text}".encode("utf-8")).hexdigest()
+
+    def _base_embeddings(self) -> Embeddings:
+        if self._base is None:
+            self._base = self._base_factory()
+        return self._base
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    cached[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+        self.hits += len(texts) - sum(1 for key in keys if key in missing)
+        self.misses += sum(1 for key in keys if key in missing)
+
+        if missing:
+            vectors = self._base_embeddings().embed_documents(list(missing.values()))
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [
+                        (key, np.asarray(vector, dtype=np.float32).tobytes())
+                        for key, vector in zip(missing.keys(), vectors)
+                    ]
+                )
+                self._conn.commit()
+            for key, vector in zip(missing.keys(), vectors):
+                cached[key] = list(vector)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
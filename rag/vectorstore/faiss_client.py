@@ -1,25 +1,318 @@
 """
 FAISS 클라이언트 초기화 모듈
+- versions/<버전>/: 적재 1회분 (index.faiss, docstore.sqlite, bm25.sqlite, index.flat.faiss, index_report.json)
+- CURRENT: 서비스 중인 버전 디렉토리 이름 (os.replace 한 번으로 교체)
+- index.faiss: FAISS 인덱스 (가능하면 mmap으로 로드)
+- docstore.sqlite: 문서 텍스트/metadata + position → 문서 ID 매핑
+- index.pkl: 이전 버전 pickle docstore (python -m rag.vectorstore.faiss_client migrate로 변환)
 """
 from langchain_community.vectorstores import FAISS
+from rag.vectorstore.bm25_index import BM25_NAME, build_bm25_index
 from rag.vectorstore.embeddings import get_embeddings
+from rag.vectorstore.index_factory import apply_search_params
+from rag.vectorstore.sqlite_docstore import DOCSTORE_NAME, SQLiteDocstore, copy_documents
+from observability.tracing import span
+from typing import Optional
+import argparse
+import asyncio
+import faiss
 import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
 
-FAISS_PATH = "./faiss_db"
+# RAG_FAISS_PATH로 다른 벡터스토어 디렉토리 사용 가능 (벤치마크 등)
+FAISS_PATH = os.environ.get("RAG_FAISS_PATH", "./faiss_db")
+INDEX_NAME = "index.faiss"
+LEGACY_DOCSTORE_NAME = "index.pkl"
+
+# 버전 디렉토리와 서비스 중인 버전을 가리키는 포인터 파일
+VERSIONS_DIR_NAME = "versions"
+CURRENT_NAME = "CURRENT"
+
+# 교체 후에도 남겨두는 이전 버전 개수 (아직 이전 버전을 읽는 프로세스용)
+KEEP_PREVIOUS_VERSIONS = 1
+
+# 근사 인덱스 사용 시 함께 저장되는 정확 검색(flat) 인덱스
+EXACT_INDEX_NAME = "index.flat.faiss"
+
+# 검색 파라미터 런타임 오버라이드 (미설정 시 적재 시 튜닝된 값 사용)
+FAISS_NPROBE = os.environ.get("FAISS_NPROBE")
+FAISS_EF_SEARCH = os.environ.get("FAISS_EF_SEARCH")
+
+# 인덱스 버전별 벡터스토어 캐시 (매 검색마다 디스크에서 다시 읽지 않음)
+# retired: 직전 버전 벡터스토어 (진행 중인 검색이 끝나도록 다음 교체 때 docstore 연결을 닫음)
+_vectorstore_lock = threading.Lock()
+_vectorstore_cache = {"version": None, "vectorstore": None, "retired": None}
+_legacy_warned = False
+
+def _read_current(path: str) -> Optional[str]:
+    current_path = os.path.join(path, CURRENT_NAME)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+def resolve_index_path(path: str = FAISS_PATH) -> str:
+    """
+    서비스 중인 버전 디렉토리 경로
+
+    CURRENT가 없으면 버전 디렉토리 도입 전 레이아웃(path에 바로 파일 저장)으로 보고 path를 그대로 반환합니다.
+    """
+    current = _read_current(path)
+    return os.path.join(path, VERSIONS_DIR_NAME, current) if current else path
+
+def get_index_version(path: str = FAISS_PATH) -> str:
+    """서비스 중인 인덱스 버전 문자열 (없으면 빈 문자열)"""
+    current = _read_current(path)
+    if current:
+        return current
+
+    # 이전 레이아웃: 파일 수정 시각·크기 기반
+    parts = []
+    for name in (INDEX_NAME, DOCSTORE_NAME, BM25_NAME):
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+def has_index(path: str = FAISS_PATH) -> bool:
+    """서비스 가능한 인덱스(index.faiss + docstore.sqlite) 존재 여부"""
+    index_path = resolve_index_path(path)
+    return os.path.exists(os.path.join(index_path, INDEX_NAME)) and os.path.exists(os.path.join(index_path, DOCSTORE_NAME))
+
+def needs_migration(path: str = FAISS_PATH) -> bool:
+    """index.pkl만 있고 SQLite docstore가 없는지 (migrate_legacy_docstore 대상)"""
+    return (
+        os.path.exists(os.path.join(path, LEGACY_DOCSTORE_NAME))
+        and not os.path.exists(os.path.join(resolve_index_path(path), DOCSTORE_NAME))
+    )
 
 def get_vectorstore():
-    """FAISS 벡터스토어 인스턴스 반환"""
-    embeddings = get_embeddings()
-
-    if os.path.exists(f"{FAISS_PATH}/index.faiss"):
-        vectorstore = FAISS.load_local(
-            FAISS_PATH,
-            embeddings,
-            allow_dangerous_deserialization=True
+    """
+    FAISS 벡터스토어 인스턴스 반환 (인덱스 버전이 바뀌면 다시 로드)
+
+    읽기 전용: 디스크에 아무것도 쓰지 않으며, index.pkl만 있으면 (안내를 한 번 출력하고) None을 반환합니다.
+    """
+    global _legacy_warned
+
+    if not has_index():
+        if needs_migration() and not _legacy_warned:
+            _legacy_warned = True
+            print(
+                f"⚠️ {FAISS_PATH}에 index.pkl만 있습니다. "
+                "python -m rag.vectorstore.faiss_client migrate로 먼저 변환하세요.",
+                file=sys.stderr
+            )
+        return None
+
+    version = get_index_version()
+
+    with _vectorstore_lock:
+        if _vectorstore_cache["version"] != version:
+            with span("rag.load_index", path=FAISS_PATH):
+                vectorstore = load_vectorstore(FAISS_PATH, get_embeddings())
+                apply_search_params(
+                    vectorstore.index,
+                    nprobe=FAISS_NPROBE,
+                    ef_search=FAISS_EF_SEARCH
+                )
+
+            # 두 버전 전 벡터스토어는 더 이상 사용하는 검색이 없으므로 연결 종료
+            _close_vectorstore(_vectorstore_cache["retired"])
+            _vectorstore_cache["retired"] = _vectorstore_cache["vectorstore"]
+            _vectorstore_cache["version"] = version
+            _vectorstore_cache["vectorstore"] = vectorstore
+
+        return _vectorstore_cache["vectorstore"]
+
+def _close_vectorstore(vectorstore: Optional[FAISS]) -> None:
+    if vectorstore is not None and isinstance(vectorstore.docstore, SQLiteDocstore):
+        vectorstore.docstore.close()
+
+async def aget_vectorstore():
+    """get_vectorstore의 비동기 버전 (디스크 로드를 스레드에서 수행)"""
+    return await asyncio.to_thread(get_vectorstore)
+
+def load_vectorstore(path: str, embeddings, mmap: bool = True) -> FAISS:
+    """
+    서비스 중인 버전의 index.faiss + docstore.sqlite로 FAISS 벡터스토어 생성 (읽기 전용)
+
+    - mmap=True: 인덱스 벡터를 메모리 매핑 (읽기 전용, 로드 시간/RSS가 코퍼스 크기에 비례하지 않음)
+    - docstore.sqlite가 없으면 FileNotFoundError (index.pkl은 migrate_legacy_docstore로 먼저 변환)
+    """
+    index_path = resolve_index_path(path)
+    docstore_path = os.path.join(index_path, DOCSTORE_NAME)
+
+    if not os.path.exists(docstore_path):
+        raise FileNotFoundError(
+            f"{docstore_path} 없음 (index.pkl이면 python -m rag.vectorstore.faiss_client migrate로 먼저 변환하세요)"
         )
-        return vectorstore
+
+    index = _read_index(os.path.join(index_path, INDEX_NAME), mmap=mmap)
+    docstore = SQLiteDocstore(docstore_path)
+
+    return FAISS(
+        embeddings,
+        index,
+        docstore,
+        docstore.index_map
+    )
+
+def create_version_dir(path: str = FAISS_PATH) -> str:
+    """
+    새 버전 디렉토리 생성 (publish_version 전까지는 서비스에 보이지 않음)
+
+    이름은 생성 시각으로 시작하므로 이름 순서 = 생성 순서입니다.
+    """
+    versions_path = os.path.join(path, VERSIONS_DIR_NAME)
+    os.makedirs(versions_path, exist_ok=True)
+
+    now_ns = time.time_ns()
+    prefix = time.strftime("%Y%m%d-%H%M%S", time.localtime(now_ns // 10**9)) + f".{now_ns % 10**9:09d}-"
+    version_path = tempfile.mkdtemp(prefix=prefix, dir=versions_path)
+    os.chmod(version_path, 0o755)
+    return version_path
+
+def open_staging_vectorstore(path: str, embeddings, version_path: str) -> FAISS:
+    """
+    추가 적재용 벡터스토어 (서비스 중인 docstore를 새 버전 디렉토리로 복사해 사용)
+
+    적재 도중 실패해도 서비스 중인 버전은 변경되지 않으며,
+    save_vectorstore()에서 CURRENT를 교체할 때 한 번에 반영됩니다.
+    """
+    index_path = resolve_index_path(path)
+
+    shutil.copyfile(os.path.join(index_path, DOCSTORE_NAME), os.path.join(version_path, DOCSTORE_NAME))
+    docstore = SQLiteDocstore(os.path.join(version_path, DOCSTORE_NAME))
+
+    # 근사 인덱스로 저장된 경우 정확 검색용 원본 벡터로 이어서 적재
+    index = load_exact_index(index_path)
+    if index is None:
+        index = _read_index(os.path.join(index_path, INDEX_NAME), mmap=False)
+
+    return FAISS(
+        embeddings,
+        index,
+        docstore,
+        docstore.index_map
+    )
+
+def save_vectorstore(vectorstore: FAISS, path: str = FAISS_PATH, version_path: Optional[str] = None) -> str:
+    """
+    FAISS 인덱스 + SQLite docstore + BM25 역색인을 새 버전으로 저장 (pickle 미사용)
+
+    버전 디렉토리에 모든 파일을 기록한 뒤 CURRENT를 한 번 교체하므로,
+    읽는 쪽은 항상 완전한 이전/새 버전 중 하나만 보게 됩니다.
+
+    Args:
+        version_path: create_version_dir()로 만든 디렉토리 (open_staging_vectorstore/정확 검색 인덱스를
+            이미 기록한 경우). None이면 새로 생성
+
+    Returns:
+        게시된 버전 디렉토리 경로
+    """
+    if version_path is None:
+        version_path = create_version_dir(path)
+
+    docstore_path = os.path.join(version_path, DOCSTORE_NAME)
+    docstore = vectorstore.docstore
+
+    if not (isinstance(docstore, SQLiteDocstore) and os.path.abspath(docstore.db_path) == os.path.abspath(docstore_path)):
+        target = SQLiteDocstore(docstore_path, reset=True)
+        copy_documents(target, docstore, vectorstore.index_to_docstore_id)
+        target.close()
     else:
-        return None
+        docstore.close()
+
+    faiss.write_index(vectorstore.index, os.path.join(version_path, INDEX_NAME))
+    build_bm25_index(version_path)
+
+    publish_version(path, version_path)
+    return version_path
+
+def publish_version(path: str, version_path: str) -> None:
+    """CURRENT를 version_path로 원자적으로 교체한 뒤 오래된 버전 삭제"""
+    version = os.path.basename(os.path.normpath(version_path))
+    current_tmp_path = os.path.join(path, f"{CURRENT_NAME}.{os.getpid()}.tmp")
+
+    with open(current_tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(current_tmp_path, os.path.join(path, CURRENT_NAME))
+
+    print(f"📦 벡터스토어 버전 교체: {version}")
+    _prune_versions(path, version)
+
+def _prune_versions(path: str, current: str) -> None:
+    """현재 버전보다 오래된 디렉토리 중 최근 KEEP_PREVIOUS_VERSIONS개만 남김 (더 새로운 디렉토리는 적재 중일 수 있음)"""
+    versions_path = os.path.join(path, VERSIONS_DIR_NAME)
+    older = sorted(name for name in os.listdir(versions_path) if name < current)
+
+    for name in older[:max(0, len(older) - KEEP_PREVIOUS_VERSIONS)]:
+        shutil.rmtree(os.path.join(versions_path, name), ignore_errors=True)
+
+def load_legacy_docstore(path: str = FAISS_PATH):
+    """
+    index.pkl(pickle docstore) 읽기 (디스크에는 쓰지 않음)
+
+    신뢰할 수 있는 로컬 파일에 대해서만 pickle을 역직렬화합니다.
+
+    Returns:
+        (docstore, index_to_docstore_id)
+    """
+    import pickle
+
+    with open(os.path.join(path, LEGACY_DOCSTORE_NAME), "rb") as f:
+        return pickle.load(f)
+
+def migrate_legacy_docstore(path: str = FAISS_PATH) -> int:
+    """
+    index.pkl(+ index.faiss)을 새 버전(docstore.sqlite + BM25)으로 변환해 게시 (1회)
+
+    서버는 마이그레이션하지 않습니다. 적재(ingest) 또는 CLI에서 명시적으로 실행하세요.
+
+    Returns:
+        변환된 문서 개수
+    """
+    print(f"🔄 pickle docstore → SQLite 마이그레이션: {path}")
+
+    docstore, index_to_docstore_id = load_legacy_docstore(path)
+
+    version_path = create_version_dir(path)
+    target = SQLiteDocstore(os.path.join(version_path, DOCSTORE_NAME), reset=True)
+    copied = copy_documents(target, docstore, index_to_docstore_id)
+    target.close()
+
+    legacy_index_path = os.path.join(path, INDEX_NAME)
+    if os.path.exists(legacy_index_path):
+        shutil.copyfile(legacy_index_path, os.path.join(version_path, INDEX_NAME))
+    build_bm25_index(version_path)
+
+    publish_version(path, version_path)
+    print(f"✅ 마이그레이션 완료: {copied}개 문서")
+    return copied
+
+def _read_index(index_path: str, mmap: bool = True):
+    if mmap:
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # IVF 등 mmap 미지원 인덱스는 일반 로드
+            pass
+    return faiss.read_index(index_path)
+
+def load_exact_index(path: str):
+    """버전 디렉토리에 근사 인덱스와 함께 저장된 flat 인덱스 반환 (없으면 None)"""
+    exact_path = os.path.join(path, EXACT_INDEX_NAME)
+
+    if os.path.exists(exact_path):
+        return faiss.read_index(exact_path)
+    return None
 
 def get_document_count() -> int:
     """벡터DB에 저장된 문서 개수 반환"""
@@ -30,3 +323,14 @@ def get_document_count() -> int:
 
     # FAISS 인덱스의 벡터 개수
     return vectorstore.index.ntotal
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벡터스토어 관리")
+    parser.add_argument("command", choices=["migrate"], help="migrate: index.pkl → docstore.sqlite 변환")
+    parser.add_argument("--path", default=FAISS_PATH, help="벡터스토어 디렉토리")
+    args = parser.parse_args()
+
+    if not needs_migration(args.path):
+        print(f"⚠️ {args.path}: 변환할 index.pkl이 없거나 이미 변환되었습니다.")
+    else:
+        migrate_legacy_docstore(args.path)
@@ -0,0 +1,292 @@
+"""
+FAISS 인덱스 타입 선택/학습/튜닝 모듈
+- flat: 정확 검색 (brute-force)
+- ivf_flat / ivf_sq8 / ivf_pq: IVF 근사 검색 (+ 스칼라/곱 양자화)
+- hnsw: 그래프 기반 근사 검색
+- 근사 인덱스의 recall은 flat(정확 검색) 대비로 측정 (인덱스에 넣지 않은 held-out 벡터를 쿼리로 사용)
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_sq8", "ivf_pq")
+
+# 코퍼스 크기별 자동 선택 기준 (벡터 개수)
+AUTO_FLAT_MAX = 5_000
+AUTO_IVF_FLAT_MAX = 50_000
+AUTO_IVF_SQ8_MAX = 500_000
+
+HNSW_M = 32
+PQ_SUBQUANTIZERS = (96, 64, 48, 32, 16, 8)
+PQ_NBITS = 8
+# faiss는 PQ 코드북마다 2**nbits개 중심 × 39개 이상의 학습 벡터가 필요 (부족하면 ivf_sq8로 대체)
+PQ_MIN_TRAIN = 39 * 2 ** PQ_NBITS
+
+NPROBE_CANDIDATES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+EF_SEARCH_CANDIDATES = (16, 32, 64, 128, 256, 512)
+
+TARGET_RECALL = 0.95
+EVAL_QUERIES = 200
+EVAL_K = 10
+
+
+def select_index_type(num_vectors: int) -> str:
+    """
+    코퍼스 크기로 인덱스 타입 자동 선택
+
+    - ~5천: flat (정확 검색이 충분히 빠름)
+    - ~5만: ivf_flat
+    - ~50만: ivf_sq8 (메모리 1/4)
+    - 그 이상: ivf_pq
+    """
+    if num_vectors <= AUTO_FLAT_MAX:
+        return "flat"
+    if num_vectors <= AUTO_IVF_FLAT_MAX:
+        return "ivf_flat"
+    if num_vectors <= AUTO_IVF_SQ8_MAX:
+        return "ivf_sq8"
+    return "ivf_pq"
+
+
+def _nlist_for(num_vectors: int) -> int:
+    """IVF 클러스터 개수: 4*sqrt(N), 클러스터당 학습 샘플 39개 이상 보장"""
+    nlist = int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // 39))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    for m in PQ_SUBQUANTIZERS:
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def index_factory_string(index_type: str, num_vectors: int, dim: int) -> str:
+    """index_type → faiss.index_factory 문자열"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}"
+
+    nlist = _nlist_for(num_vectors)
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_sq8":
+        return f"IVF{nlist},SQ8"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{_pq_subquantizers(dim)}x{PQ_NBITS}"
+
+    raise ValueError(f"지원하지 않는 index_type: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+
+def build_index(vectors: np.ndarray, index_type: str, metric_type: int = faiss.METRIC_L2):
+    """
+    벡터로 인덱스 생성 (필요 시 학습 포함)
+
+    Args:
+        vectors: (N, dim) float32 벡터
+        index_type: INDEX_TYPES 중 하나
+        metric_type: 기존 인덱스와 동일한 거리 척도 (유사도 점수 호환)
+
+    Returns:
+        벡터가 추가된 faiss 인덱스
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index, _ = _train_index(vectors, index_type, metric_type)
+    index.add(vectors)
+    return index
+
+
+def build_tuned_index(
+    vectors: np.ndarray,
+    index_type: str,
+    metric_type: int = faiss.METRIC_L2,
+    num_queries: int = EVAL_QUERIES,
+    k: int = EVAL_K,
+    target_recall: float = TARGET_RECALL
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    인덱스 생성 + held-out 쿼리로 nprobe/efSearch 튜닝
+
+    인덱스에 들어 있는 벡터를 쿼리로 쓰면 자기 자신이 항상 1등으로 잡혀 recall이 부풀려지고
+    nprobe/efSearch가 작게 선택되므로, 일부 벡터를 쿼리로 떼어 두고 나머지로 만든 튜닝용 인덱스에서 측정합니다.
+    최종 인덱스는 같은 학습 결과에 전체 벡터를 추가해 만들고 선택된 값을 적용합니다.
+    (HNSW는 학습이 없어 그래프를 두 번 만듭니다)
+
+    Returns:
+        (벡터가 추가된 faiss 인덱스, tune_search_params 결과 + index_type(실제 사용) + eval_queries)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    indexed, queries = split_held_out(vectors, num_queries)
+
+    index, index_type = _train_index(indexed, index_type, metric_type)
+
+    tuning_index = faiss.clone_index(index)
+    tuning_index.add(indexed)
+    exact_index = faiss.IndexFlat(vectors.shape[1], metric_type)
+    exact_index.add(indexed)
+
+    tuning = tune_search_params(tuning_index, exact_index, queries, k, target_recall)
+    tuning["index_type"] = index_type
+    tuning["eval_queries"] = len(queries)
+    del tuning_index, exact_index
+
+    index.add(vectors)
+    if tuning["param"]:
+        faiss.ParameterSpace().set_index_parameter(index, tuning["param"], tuning["value"])
+
+    return index, tuning
+
+
+def _train_index(vectors: np.ndarray, index_type: str, metric_type: int) -> Tuple[Any, str]:
+    """
+    학습만 끝난 빈 인덱스 생성
+
+    학습 데이터가 부족하면 ivf_pq → ivf_sq8, 그래도 부족하면 flat으로 대체합니다.
+
+    Returns:
+        (인덱스, 실제 사용한 index_type)
+    """
+    num_vectors, dim = vectors.shape
+
+    if index_type == "ivf_pq" and num_vectors < _min_train_size(index_type, num_vectors):
+        print(f"⚠️ PQ 학습 데이터 부족 ({num_vectors}개 < {PQ_MIN_TRAIN}개) → ivf_pq 대신 ivf_sq8 인덱스 사용")
+        index_type = "ivf_sq8"
+
+    if index_type != "flat" and num_vectors < _min_train_size(index_type, num_vectors):
+        print(f"⚠️ 학습 데이터 부족 ({num_vectors}개) → {index_type} 대신 flat 인덱스 사용")
+        index_type = "flat"
+
+    index = faiss.index_factory(dim, index_factory_string(index_type, num_vectors, dim), metric_type)
+
+    if not index.is_trained:
+        started = time.time()
+        index.train(vectors)
+        print(f"🏋️ {index_type} 인덱스 학습 완료 ({time.time() - started:.1f}초)")
+
+    return index, index_type
+
+
+def _min_train_size(index_type: str, num_vectors: int) -> int:
+    if index_type == "hnsw":
+        return 1
+    if index_type == "ivf_pq":
+        return max(PQ_MIN_TRAIN, _nlist_for(num_vectors))
+    return max(2, _nlist_for(num_vectors))
+
+
+def apply_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """IVF nprobe / HNSW efSearch 설정 (해당 없는 인덱스는 무시)"""
+    params = faiss.ParameterSpace()
+
+    if nprobe is not None and _is_ivf(index):
+        params.set_index_parameter(index, "nprobe", int(nprobe))
+
+    if ef_search is not None and _is_hnsw(index):
+        params.set_index_parameter(index, "efSearch", int(ef_search))
+
+
+def _is_ivf(index) -> bool:
+    try:
+        return faiss.extract_index_ivf(index) is not None
+    except RuntimeError:
+        return False
+
+
+def _is_hnsw(index) -> bool:
+    return hasattr(faiss.downcast_index(index), "hnsw")
+
+
+def evaluate_recall(index, exact_index, queries: np.ndarray, k: int = EVAL_K) -> Dict[str, float]:
+    """
+    정확 검색(exact_index) 대비 recall@k 및 쿼리당 지연시간 측정
+
+    Returns:
+        {"recall_at_k": float, "latency_ms": float, "exact_latency_ms": float}
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, exact_index.ntotal)
+
+    started = time.perf_counter()
+    _, exact_ids = exact_index.search(queries, k)
+    exact_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, approx_ids = index.search(queries, k)
+    approx_elapsed = time.perf_counter() - started
+
+    hits = 0
+    for exact_row, approx_row in zip(exact_ids, approx_ids):
+        hits += len(set(exact_row[exact_row >= 0]) & set(approx_row[approx_row >= 0]))
+
+    return {
+        "recall_at_k": hits / max(1, len(queries) * k),
+        "latency_ms": approx_elapsed * 1000 / max(1, len(queries)),
+        "exact_latency_ms": exact_elapsed * 1000 / max(1, len(queries)),
+    }
+
+
+def tune_search_params(
+    index,
+    exact_index,
+    queries: np.ndarray,
+    k: int = EVAL_K,
+    target_recall: float = TARGET_RECALL
+) -> Dict[str, Any]:
+    """
+    nprobe / efSearch 후보를 모두 측정해 recall·지연시간 운영점 리포트 생성
+
+    모든 후보를 측정한 뒤 target_recall을 만족하는 가장 작은 값을 인덱스에 적용합니다.
+    (만족하는 값이 없으면 가장 큰 후보 적용, 다른 운영점은 apply_search_params로 선택)
+
+    Returns:
+        {"param": str | None, "value": int | None, "operating_points": [...]}
+    """
+    if _is_ivf(index):
+        param = "nprobe"
+        nlist = faiss.extract_index_ivf(index).nlist
+        candidates = [v for v in NPROBE_CANDIDATES if v <= nlist] or [nlist]
+    elif _is_hnsw(index):
+        param = "efSearch"
+        candidates = list(EF_SEARCH_CANDIDATES)
+    else:
+        return {"param": None, "value": None, "operating_points": [evaluate_recall(index, exact_index, queries, k)]}
+
+    operating_points: List[Dict[str, Any]] = []
+
+    for value in candidates:
+        faiss.ParameterSpace().set_index_parameter(index, param, value)
+        point = {param: value, **evaluate_recall(index, exact_index, queries, k)}
+        operating_points.append(point)
+        print(f"  - {param}={value}: recall@{k}={point['recall_at_k']:.3f}, {point['latency_ms']:.3f}ms/query")
+
+    reached = [point[param] for point in operating_points if point["recall_at_k"] >= target_recall]
+    chosen = min(reached) if reached else candidates[-1]
+
+    faiss.ParameterSpace().set_index_parameter(index, param, chosen)
+
+    return {"param": param, "value": chosen, "operating_points": operating_points}
+
+
+def split_held_out(
+    vectors: np.ndarray,
+    num_queries: int = EVAL_QUERIES,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    평가용 쿼리를 떼어 낸 (인덱스용 벡터, held-out 쿼리) 분할
+
+    쿼리는 전체의 10% 이하로 제한합니다. (벡터가 1개뿐이면 분할하지 않음)
+    """
+    if len(vectors) < 2:
+        return vectors, vectors
+
+    rng = np.random.default_rng(seed)
+    size = min(num_queries, max(1, len(vectors) // 10))
+    held_out = np.zeros(len(vectors), dtype=bool)
+    held_out[rng.choice(len(vectors), size=size, replace=False)] = True
+    return vectors[~held_out], vectors[held_out]
@@ -0,0 +1,217 @@
+"""
+SQLite 기반 docstore 모듈
+- index.pkl(InMemoryDocstore + index_to_docstore_id pickle) 대체
+- 텍스트/metadata를 SQLite에 저장하고 검색된 k개 문서만 조회
+- pickle 역직렬화가 없으므로 allow_dangerous_deserialization 불필요
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from langchain.schema import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+DOCSTORE_NAME = "docstore.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    page_content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_map (
+    position INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL
+);
+"""
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    SQLite 파일 하나에 문서와 FAISS position → 문서 ID 매핑을 저장하는 docstore
+
+    FAISS(langchain)의 docstore 인터페이스(search/add/delete)를 구현하며,
+    index_map 테이블은 SQLiteIndexMap으로 index_to_docstore_id를 대체합니다.
+    """
+
+    def __init__(self, db_path: str, reset: bool = False):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # MCP 서버의 스레드 풀에서 공유하므로 check_same_thread=False + 내부 lock 사용
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        with self._lock:
+            if reset:
+                self._conn.executescript("DROP TABLE IF EXISTS documents; DROP TABLE IF EXISTS index_map;")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """문서 ID로 조회 (없으면 langchain docstore와 동일하게 안내 문자열 반환)"""
+        docs = self.mget([search])
+        if search not in docs:
+            return f"ID {search} not found."
+        return docs[search]
+
+    def mget(self, ids: Iterable[str]) -> Dict[str, Document]:
+        """여러 문서 ID를 한 번의 쿼리로 조회"""
+        ids = list(ids)
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, page_content, metadata FROM documents WHERE id IN ({placeholders})",
+                ids
+            ).fetchall()
+
+        return {
+            doc_id: Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+            for doc_id, page_content, metadata in rows
+        }
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = [
+            (doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+            for doc_id, doc in texts.items()
+        ]
+        with self._lock:
+            overlapping = self._conn.execute(
+                f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(rows))})",
+                [row[0] for row in rows]
+            ).fetchall() if rows else []
+            if overlapping:
+                raise ValueError(f"Tried to add ids that already exist: {[row[0] for row in overlapping]}")
+
+            self._conn.executemany(
+                "INSERT INTO documents (id, page_content, metadata) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._conn.commit()
+
+    def iter_documents(self) -> Iterator[Tuple[int, Document]]:
+        """FAISS position 순서로 (position, Document) 순회 (BM25 등 부가 인덱스 생성용)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT m.position, d.id, d.page_content, d.metadata "
+                "FROM index_map m JOIN documents d ON d.id = m.doc_id ORDER BY m.position"
+            ).fetchall()
+
+        for position, doc_id, page_content, metadata in rows:
+            yield position, Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+    @property
+    def index_map(self) -> "SQLiteIndexMap":
+        return SQLiteIndexMap(self)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteIndexMap(MutableMapping):
+    """
+    FAISS position → 문서 ID 매핑 (FAISS.index_to_docstore_id 대체)
+
+    전체 dict를 메모리에 올리지 않고 조회 시점에 필요한 position만 읽습니다.
+    """
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self._docstore = docstore
+
+    def _execute(self, sql: str, params=()) -> List[Tuple]:
+        with self._docstore._lock:
+            rows = self._docstore._conn.execute(sql, params).fetchall()
+            self._docstore._conn.commit()
+        return rows
+
+    def __getitem__(self, position: int) -> str:
+        rows = self._execute("SELECT doc_id FROM index_map WHERE position = ?", (int(position),))
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def get_many(self, positions: Iterable[int]) -> Dict[int, str]:
+        """여러 position을 한 번의 쿼리로 조회"""
+        positions = [int(p) for p in positions]
+        if not positions:
+            return {}
+        rows = self._execute(
+            f"SELECT position, doc_id FROM index_map WHERE position IN ({','.join('?' * len(positions))})",
+            positions
+        )
+        return dict(rows)
+
+    def __setitem__(self, position: int, doc_id: str) -> None:
+        self.update({position: doc_id})
+
+    def update(self, other=(), **kwargs) -> None:
+        items = dict(other, **kwargs)
+        with self._docstore._lock:
+            self._docstore._conn.executemany(
+                "INSERT OR REPLACE INTO index_map (position, doc_id) VALUES (?, ?)",
+                [(int(position), doc_id) for position, doc_id in items.items()]
+            )
+            self._docstore._conn.commit()
+
+    def __delitem__(self, position: int) -> None:
+        self._execute("DELETE FROM index_map WHERE position = ?", (int(position),))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([row[0] for row in self._execute("SELECT position FROM index_map ORDER BY position")])
+
+    def __len__(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM index_map")[0][0]
+
+    def __contains__(self, position) -> bool:
+        return bool(self._execute("SELECT 1 FROM index_map WHERE position = ?", (int(position),)))
+
+
+def copy_documents(
+    target: SQLiteDocstore,
+    docstore: Docstore,
+    index_to_docstore_id,
+    batch_size: int = 500
+) -> int:
+    """
+    임의의 docstore(InMemoryDocstore 등)의 문서와 매핑을 SQLiteDocstore로 복사
+
+    Returns:
+        복사된 문서 개수
+    """
+    index_map = target.index_map
+    batch_docs: Dict[str, Document] = {}
+    batch_map: Dict[int, str] = {}
+    copied = 0
+
+    for position in sorted(index_to_docstore_id):
+        doc_id = index_to_docstore_id[position]
+        doc = docstore.search(doc_id)
+        if not isinstance(doc, Document):
+            raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+
+        batch_docs[doc_id] = doc
+        batch_map[position] = doc_id
+
+        if len(batch_docs) >= batch_size:
+            target.add(batch_docs)
+            index_map.update(batch_map)
+            copied += len(batch_docs)
+            batch_docs, batch_map = {}, {}
+
+    if batch_docs:
+        target.add(batch_docs)
+        index_map.update(batch_map)
+        copied += len(batch_docs)
+
+    return copied
+